@@ -0,0 +1,274 @@
+"""
+Benchmarks for the analysis pipeline on deterministic synthetic corpora (see
+synthetic_corpus.py). Times package import in fresh interpreters, both tokenizer
+backends, analyze_texts, calculate_slop_index_new, score_slop_batch,
+calculate_complexity_index, create_slop_lists, extract_and_save_slop_phrases and
+_build_hierarchical_tree across corpus sizes and worker counts, and writes the
+timings as JSON for comparing commits. Exits with status 1 if a module import exceeds
+--import-budget or eagerly loads one of LAZY_DEPENDENCIES (tests/test_imports.py
+runs the same check, with a looser time budget, in the test suite).
+
+Runs offline: no HF datasets or API key are needed (the NLTK data and wordfreq
+package the analysis itself uses must be installed).
+
+    python benchmarks/run_benchmarks.py --sizes 200,1000 --workers 1,2 --output bench.json
+"""
+import sys
+import os
+import json
+import time
+import platform
+import argparse
+import logging
+import statistics
+import subprocess
+import tempfile
+from typing import Any, Callable, Dict, List
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from slop_forensics import config, __version__
+from slop_forensics.analysis import analyze_texts, analyze_jsonl_file, word_counts_path
+from slop_forensics.metrics import calculate_slop_index_new, score_slop_batch, calculate_complexity_index
+from slop_forensics.slop_lists import create_slop_lists, extract_and_save_slop_phrases
+from slop_forensics.tokenization import sentence_word_tokenize, TOKENIZER_BACKENDS
+from slop_forensics.utils import setup_logging, save_json_file, sanitize_filename
+
+from synthetic_corpus import generate_texts, write_model_datasets, generate_model_features
+
+BENCHMARKS = ["import_time", "tokenize", "analyze_texts", "slop_index", "slop_batch", "complexity_index", "create_slop_lists", "slop_phrases", "hierarchical_tree"]
+
+# Modules the scripts import at startup
+IMPORT_MODULES = [
+    "slop_forensics", "slop_forensics.analysis", "slop_forensics.metrics", "slop_forensics.slop_lists",
+    "slop_forensics.phylogeny", "slop_forensics.dataset_generator", "slop_forensics.shortcuts",
+]
+# Heavy packages the pipeline imports on first use; importing IMPORT_MODULES must not load them
+LAZY_DEPENDENCIES = ["nltk", "scipy", "pandas", "ete3", "PyQt5", "datasets", "wordfreq"]
+
+_IMPORT_PROBE = (
+    "import sys, time, json; start = time.perf_counter(); import {module}; "
+    "print(json.dumps({{'seconds': time.perf_counter() - start, 'loaded': [m for m in {lazy!r} if m in sys.modules]}}))"
+)
+
+logger = logging.getLogger("benchmarks")
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Runs func repeat times; the first run includes cold caches (wordfreq, slop lists, NLTK data)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "times_s": [round(t, 4) for t in times],
+        "min_s": round(min(times), 4),
+        "median_s": round(statistics.median(times), 4),
+    }
+
+
+def record(results: List[Dict[str, Any]], benchmark: str, params: Dict[str, Any], timing: Dict[str, Any], items: int):
+    entry = {"benchmark": benchmark, "params": params, **timing, "items": items}
+    entry["items_per_s"] = round(items / timing["min_s"], 2) if timing["min_s"] > 0 else None
+    results.append(entry)
+    logger.info(f"{benchmark} {params}: min {timing['min_s']:.3f}s, median {timing['median_s']:.3f}s ({items} items)")
+
+
+def time_import(module: str, repeat: int) -> Dict[str, Any]:
+    """Imports module in repeat fresh interpreters; also reports which LAZY_DEPENDENCIES it loaded."""
+    probe = _IMPORT_PROBE.format(module=module, lazy=LAZY_DEPENDENCIES)
+    times, loaded = [], set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", probe], cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return {
+        "times_s": [round(t, 4) for t in times],
+        "min_s": round(min(times), 4),
+        "median_s": round(statistics.median(times), 4),
+        "eager_dependencies": sorted(loaded),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the slop forensics pipeline on synthetic corpora.")
+    parser.add_argument("--sizes", type=parse_int_list, default=[200, 1000], help="Corpus sizes (texts), comma-separated (default: 200,1000)")
+    parser.add_argument("--workers", type=parse_int_list, default=[1, 2], help="Worker counts, comma-separated (default: 1,2)")
+    parser.add_argument("--tokenizers", type=str, default=",".join(TOKENIZER_BACKENDS), help=f"Tokenizer backends for the tokenize benchmark (default: {','.join(TOKENIZER_BACKENDS)})")
+    parser.add_argument("--import-budget", type=float, default=0.5, help="Max seconds (min over --repeat runs) to import each of IMPORT_MODULES (default: 0.5)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; min and median are reported (default: 3)")
+    parser.add_argument("--vocab-size", type=int, default=5000, help="Synthetic vocabulary size (default: 5000)")
+    parser.add_argument("--words-per-text", type=int, default=300, help="Approximate words per text (default: 300)")
+    parser.add_argument("--prompts", type=int, default=50, help="Distinct prompt IDs per corpus (default: 50)")
+    parser.add_argument("--slop-rate", type=float, default=0.05, help="Chance that a sentence contains a slop phrase (default: 0.05)")
+    parser.add_argument("--models", type=int, default=4, help="Models in the slop list benchmarks (default: 4)")
+    parser.add_argument("--texts-per-model", type=int, default=200, help="Texts per model in the slop list benchmarks (default: 200)")
+    parser.add_argument("--tree-models", type=parse_int_list, default=[8, 32], help="Model counts for the tree benchmark (default: 8,32)")
+    parser.add_argument("--tree-features", type=int, default=3000, help="Distinct features in the tree benchmark (default: 3000)")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0)")
+    parser.add_argument("--only", type=str, default=",".join(BENCHMARKS), help=f"Benchmarks to run, comma-separated (default: all of {','.join(BENCHMARKS)})")
+    parser.add_argument("--output", type=str, default=None, help="JSON file to write results to (default: print to stdout)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's own INFO logging")
+    args = parser.parse_args()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    # Slop lists are loaded from data/ relative to the working directory
+    os.chdir(project_root)
+
+    setup_logging(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+    selected = set(args.only.split(","))
+    corpus_options = dict(
+        vocab_size=args.vocab_size, words_per_text=args.words_per_text,
+        slop_rate=args.slop_rate, seed=args.seed
+    )
+    results: List[Dict[str, Any]] = []
+    import_failures: List[str] = []
+
+    if "import_time" in selected:
+        for module in IMPORT_MODULES:
+            timing = time_import(module, args.repeat)
+            record(results, "import", {"module": module}, timing, 1)
+            if timing["min_s"] > args.import_budget:
+                import_failures.append(f"{module} took {timing['min_s']:.3f}s (budget {args.import_budget:.3f}s)")
+            if timing["eager_dependencies"]:
+                import_failures.append(f"{module} loaded {', '.join(timing['eager_dependencies'])} at import")
+
+    for size in args.sizes:
+        texts_with_ids = generate_texts(size, args.prompts, **corpus_options)
+        texts = [text for text, _ in texts_with_ids]
+        params = {"texts": size, **corpus_options, "prompts": args.prompts}
+
+        if "tokenize" in selected:
+            for backend in args.tokenizers.split(","):
+                timing = time_call(lambda: [sentence_word_tokenize(text, backend) for text in texts], args.repeat)
+                record(results, "sentence_word_tokenize", {**params, "backend": backend}, timing, size)
+        if "analyze_texts" in selected:
+            for workers in args.workers:
+                timing = time_call(lambda: analyze_texts("synthetic/model", texts_with_ids, num_workers=workers), args.repeat)
+                record(results, "analyze_texts", {**params, "workers": workers}, timing, size)
+        if "slop_index" in selected:
+            timing = time_call(lambda: [calculate_slop_index_new(text) for text in texts], args.repeat)
+            record(results, "calculate_slop_index_new", params, timing, size)
+        if "slop_batch" in selected:
+            for workers in args.workers:
+                timing = time_call(lambda: score_slop_batch(texts, num_workers=workers), args.repeat)
+                record(results, "score_slop_batch", {**params, "workers": workers}, timing, size)
+        if "complexity_index" in selected:
+            timing = time_call(lambda: [calculate_complexity_index(text) for text in texts], args.repeat)
+            record(results, "calculate_complexity_index", params, timing, size)
+
+    if selected & {"create_slop_lists", "slop_phrases"}:
+        with tempfile.TemporaryDirectory(prefix="slop_bench_") as temp_dir:
+            dataset_dir = os.path.join(temp_dir, "datasets")
+            analysis_dir = os.path.join(temp_dir, "analysis")
+            output_dir = os.path.join(temp_dir, "slop_lists")
+            os.makedirs(output_dir)
+            model_names = write_model_datasets(dataset_dir, args.models, args.texts_per_model, args.prompts, **corpus_options)
+            # create_slop_lists reloads each model's dataset from config.DATASET_OUTPUT_DIR
+            original_dataset_dir = config.DATASET_OUTPUT_DIR
+            original_max_processes = config.SLOP_PHRASES_MAX_PROCESSES
+            config.DATASET_OUTPUT_DIR = dataset_dir
+            try:
+                for model_name in model_names:
+                    dataset_file = os.path.join(dataset_dir, f"generated_{sanitize_filename(model_name)}.jsonl")
+                    analysis_file = os.path.join(analysis_dir, f"slop_profile__{sanitize_filename(model_name)}.json")
+                    save_json_file(
+                        analyze_jsonl_file(
+                            model_name, dataset_file, max_items=args.texts_per_model,
+                            word_counts_file=word_counts_path(analysis_file)
+                        ),
+                        analysis_file
+                    )
+                # Same texts create_slop_lists combines, for timing the phrase step on its own
+                phrase_texts = [
+                    text
+                    for model_index in range(args.models)
+                    for text, _ in generate_texts(args.texts_per_model, args.prompts, model_index=model_index, **corpus_options)
+                ]
+                params = {"models": args.models, "texts_per_model": args.texts_per_model, **corpus_options, "prompts": args.prompts}
+                for workers in args.workers:
+                    config.SLOP_PHRASES_MAX_PROCESSES = workers
+                    if "create_slop_lists" in selected:
+                        timing = time_call(
+                            lambda: create_slop_lists(analysis_dir, output_dir, max_items_per_model=args.texts_per_model),
+                            args.repeat
+                        )
+                        record(results, "create_slop_lists", {**params, "workers": workers}, timing, args.models * args.texts_per_model)
+                    if "slop_phrases" in selected:
+                        timing = time_call(
+                            lambda: extract_and_save_slop_phrases(
+                                phrase_texts, output_dir, n=config.SLOP_PHRASES_NGRAM_SIZE,
+                                top_k_ngrams=config.SLOP_PHRASES_TOP_NGRAMS,
+                                top_phrases_to_save=config.SLOP_PHRASES_TOP_PHRASES_TO_SAVE,
+                                chunksize=config.SLOP_PHRASES_CHUNKSIZE
+                            ),
+                            args.repeat
+                        )
+                        record(results, "extract_and_save_slop_phrases", {**params, "workers": workers}, timing, len(phrase_texts))
+            finally:
+                config.DATASET_OUTPUT_DIR = original_dataset_dir
+                config.SLOP_PHRASES_MAX_PROCESSES = original_max_processes
+
+    if "hierarchical_tree" in selected:
+        try:
+            import pandas, scipy, ete3 # Imported lazily by phylogeny; skip early if they are missing
+            from slop_forensics.phylogeny import _build_hierarchical_tree
+        except ImportError as e:
+            logger.warning(f"Skipping hierarchical_tree benchmark: {e}")
+            results.append({"benchmark": "_build_hierarchical_tree", "skipped": str(e)})
+        else:
+            with tempfile.TemporaryDirectory(prefix="slop_bench_") as temp_dir:
+                for num_models in args.tree_models:
+                    features = generate_model_features(num_models, args.tree_features, args.tree_features // 4, seed=args.seed)
+                    timing = time_call(lambda: _build_hierarchical_tree(features, output_dir=temp_dir, charts_dir=temp_dir), args.repeat)
+                    record(results, "_build_hierarchical_tree", {"models": num_models, "features": args.tree_features}, timing, num_models)
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "package_version": __version__,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    if args.output:
+        save_json_file(report, args.output)
+        logger.info(f"Wrote {len(results)} benchmark results to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+    if import_failures:
+        for failure in import_failures:
+            logger.error(f"Import check failed: {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
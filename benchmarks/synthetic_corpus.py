@@ -0,0 +1,157 @@
+"""
+Deterministic synthetic corpus generator for the benchmarks.
+
+Produces story-like texts from a Zipf-distributed pseudo-word vocabulary mixed
+with common English function words, with configurable slop phrases injected at
+a fixed per-sentence rate. The same arguments always give the same corpus, so
+timings are comparable across commits. Nothing is downloaded.
+"""
+import os
+import json
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+# Common English words (mostly stopwords) so texts look like prose to the tokenizers and filters
+FUNCTION_WORDS = [
+    "the", "and", "was", "her", "his", "she", "he", "that", "with", "had", "for", "they", "into",
+    "from", "but", "were", "them", "then", "what", "there", "their", "would", "could", "about",
+    "of", "to", "in", "a", "it", "on", "at", "as", "by", "an", "be", "this", "not", "all", "one",
+    "said", "like", "just", "over", "back", "down", "still", "again", "through", "before", "after",
+    "voice", "eyes", "hand", "room", "night", "light", "door", "time", "world", "heart", "moment",
+]
+
+DEFAULT_SLOP_PHRASES = [
+    "a testament to",
+    "shivers down her spine",
+    "barely above a whisper",
+    "the air was thick with",
+    "a mix of",
+    "couldn't help but",
+    "her heart pounding",
+    "a wave of",
+    "in the grand tapestry of",
+    "eyes sparkling with mischief",
+    "little did she know",
+    "the weight of the world",
+]
+
+_ONSETS = ["b", "br", "c", "ch", "d", "dr", "f", "g", "gl", "h", "j", "k", "l", "m", "n", "p", "pr",
+           "qu", "r", "s", "sh", "st", "t", "th", "tr", "v", "w", "z"]
+_VOWELS = ["a", "e", "i", "o", "u", "ai", "ea", "ou", "io"]
+_CODAS = ["", "", "n", "r", "l", "s", "th", "nd", "st", "ck"]
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """size distinct pseudo-words (2-4 syllables), most frequent first."""
+    rng = random.Random(seed)
+    vocabulary = []
+    seen = set(FUNCTION_WORDS)
+    while len(vocabulary) < size:
+        word = "".join(
+            rng.choice(_ONSETS) + rng.choice(_VOWELS) + rng.choice(_CODAS)
+            for _ in range(rng.randint(2, 4))
+        )
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+
+def _zipf_cum_weights(size: int, exponent: float) -> List[float]:
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, size + 1):
+        total += 1.0 / rank ** exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+def generate_texts(
+    num_texts: int,
+    num_prompts: int,
+    vocab_size: int = 5000,
+    words_per_text: int = 300,
+    slop_phrases: Optional[List[str]] = None,
+    slop_rate: float = 0.05,
+    zipf_exponent: float = 1.1,
+    function_word_rate: float = 0.45,
+    seed: int = 0,
+    model_index: int = 0
+) -> List[Tuple[str, str]]:
+    """
+    (text, prompt_id) pairs; texts cycle through num_prompts prompt IDs.
+    slop_rate is the chance that a sentence contains a slop phrase. model_index
+    gives each simulated model its own favourite words and slop phrases on top
+    of the shared vocabulary, so multi-model benchmarks have real differences.
+    """
+    phrases = DEFAULT_SLOP_PHRASES if slop_phrases is None else slop_phrases
+    vocabulary = make_vocabulary(vocab_size, seed)
+    rng = random.Random(f"{seed}:{model_index}")
+    # Per-model rank shuffle of a slice of the vocabulary: each model over-uses different words
+    favourites = rng.sample(range(vocab_size), min(vocab_size, 50))
+    for rank, word_index in enumerate(favourites):
+        vocabulary[rank], vocabulary[word_index] = vocabulary[word_index], vocabulary[rank]
+    cum_weights = _zipf_cum_weights(vocab_size, zipf_exponent)
+    phrase_weights = [1.0 + 4.0 * ((i + model_index) % 3 == 0) for i in range(len(phrases))]
+
+    texts = []
+    for text_index in range(num_texts):
+        sentences = []
+        num_words = 0
+        while num_words < words_per_text:
+            length = rng.randint(6, 24)
+            words = [
+                rng.choice(FUNCTION_WORDS) if rng.random() < function_word_rate else word
+                for word in rng.choices(vocabulary, cum_weights=cum_weights, k=length)
+            ]
+            if phrases and rng.random() < slop_rate:
+                position = rng.randint(0, len(words))
+                words[position:position] = rng.choices(phrases, weights=phrase_weights)[0].split()
+            if len(words) > 8 and rng.random() < 0.3:
+                words[rng.randint(2, len(words) - 3)] += ","
+            sentence = " ".join(words)
+            sentences.append(sentence[0].upper() + sentence[1:] + rng.choice(".....!?"))
+            num_words += len(words)
+        texts.append((" ".join(sentences), f"synthetic_{text_index % num_prompts}"))
+    return texts
+
+
+def generate_records(model_name: str, num_texts: int, num_prompts: int, model_index: int = 0, **kwargs) -> List[Dict]:
+    """Records in the generated_*.jsonl format written by dataset_generator."""
+    return [
+        {"model": model_name, "source": "synthetic", "id": int(prompt_id.rsplit("_", 1)[1]), "output": text}
+        for text, prompt_id in generate_texts(num_texts, num_prompts, model_index=model_index, **kwargs)
+    ]
+
+
+def write_model_datasets(output_dir: str, num_models: int, texts_per_model: int, num_prompts: int, **kwargs) -> List[str]:
+    """Writes generated_synthetic__model-<i>.jsonl files and returns the model names."""
+    os.makedirs(output_dir, exist_ok=True)
+    model_names = []
+    for model_index in range(num_models):
+        model_name = f"synthetic/model-{model_index}"
+        records = generate_records(model_name, texts_per_model, num_prompts, model_index=model_index, **kwargs)
+        filename = os.path.join(output_dir, f"generated_{model_name.replace('/', '__')}.jsonl")
+        with open(filename, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        model_names.append(model_name)
+    return model_names
+
+
+def generate_model_features(num_models: int, num_features: int, features_per_model: int, seed: int = 0) -> Dict[str, Set[str]]:
+    """
+    Slop feature sets per model for the phylogeny benchmarks: models are grouped
+    into families that share most of their features.
+    """
+    rng = random.Random(seed)
+    features = [f"feature_{i}" for i in range(num_features)]
+    num_families = max(1, num_models // 4)
+    family_features = [set(rng.sample(features, min(features_per_model, num_features))) for _ in range(num_families)]
+    model_features = {}
+    for model_index in range(num_models):
+        base = family_features[model_index % num_families]
+        own = set(rng.sample(features, min(features_per_model // 5, num_features)))
+        kept = set(rng.sample(sorted(base), int(len(base) * 0.8)))
+        model_features[f"synthetic/model-{model_index}"] = kept | own
+    return model_features
@@ -0,0 +1,38 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from slop_forensics import config
+from slop_forensics.syllables import build_syllable_table
+from slop_forensics.utils import setup_logging
+
+def main():
+    setup_logging()
+    logger = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(
+        description="Compile the CMU Pronouncing Dictionary into the compact syllable table used by the complexity metric."
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=config.SYLLABLE_TABLE_FILE,
+        help=f"Table file to write (default: {config.SYLLABLE_TABLE_FILE})"
+    )
+    args = parser.parse_args()
+
+    try:
+        table = build_syllable_table(args.output)
+    except LookupError:
+        logger.error("NLTK 'cmudict' not found. Run: python -c \"import nltk; nltk.download('cmudict')\"")
+        sys.exit(1)
+
+    logger.info(f"Syllable table ready: {len(table)} words in {args.output}")
+
+if __name__ == "__main__":
+    main()
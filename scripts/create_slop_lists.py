@@ -9,10 +9,12 @@ sys.path.insert(0, project_root)
 
 from slop_forensics import config
 from slop_forensics.slop_lists import create_slop_lists
+from slop_forensics.spill import parse_memory_size
 from slop_forensics.utils import setup_logging
 
 def main():
     setup_logging()
+    config.ensure_output_dirs()
     logger = logging.getLogger(__name__)
 
     parser = argparse.ArgumentParser(description="Combine model analyses to create slop lists (and slop phrases).")
@@ -34,6 +36,18 @@ def main():
         default=config.ANALYSIS_MAX_ITEMS_PER_MODEL, # Reuse analysis limit for reloading
         help=f"Maximum number of items to reload per model dataset (default: {config.ANALYSIS_MAX_ITEMS_PER_MODEL})"
     )
+    parser.add_argument(
+        "--memory-budget",
+        type=parse_memory_size,
+        default=None,
+        help="Memory for word and phrase n-gram counts, e.g. 8G or 512M; counts beyond it are spilled to disk (default: no limit)"
+    )
+    parser.add_argument(
+        "--approx-ngrams",
+        action="store_true",
+        default=config.APPROX_NGRAM_COUNTS,
+        help="Pick the top phrase n-grams from fixed-memory sketches (sized by SKETCH_* in config) instead of exact counts"
+    )
 
     args = parser.parse_args()
 
@@ -46,7 +60,9 @@ def main():
         create_slop_lists(
             analysis_files_dir=args.input_dir,
             output_dir=args.output_dir,
-            max_items_per_model=args.max_items
+            max_items_per_model=args.max_items,
+            memory_budget=args.memory_budget,
+            approximate_ngrams=args.approx_ngrams
         )
     except Exception as e:
         logger.error(f"Error during slop list creation: {e}", exc_info=True)
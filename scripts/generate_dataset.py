@@ -13,6 +13,7 @@ from slop_forensics.utils import setup_logging, sanitize_filename
 
 def main():
     setup_logging()
+    config.ensure_output_dirs()
     logger = logging.getLogger(__name__)
 
     parser = argparse.ArgumentParser(description="Generate story chapter datasets using LLMs.")
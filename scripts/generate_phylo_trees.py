@@ -13,6 +13,7 @@ from slop_forensics.utils import setup_logging
 
 def main():
     setup_logging()
+    config.ensure_output_dirs()
     logger = logging.getLogger(__name__)
 
     parser = argparse.ArgumentParser(description="Generate phylogenetic trees based on model features.")
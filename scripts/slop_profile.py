@@ -1,8 +1,10 @@
 import sys
 import os
+import json
+import hashlib
 import argparse
 import logging
-from collections import defaultdict
+from multiprocessing import Pool
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -10,13 +12,71 @@ sys.path.insert(0, project_root)
 
 from tqdm import tqdm
 
-from slop_forensics import config
-from slop_forensics.analysis import analyze_texts
+from slop_forensics import config, __version__
+from slop_forensics.analysis import analyze_jsonl_file, word_counts_path
+from slop_forensics.metrics import SLOP_LIST_FILES
+from slop_forensics.perf import PerfRecorder, StageStats, format_perf_summary
+from slop_forensics.syllables import syllable_table_fingerprint
+from slop_forensics.tokenization import NLTK_RULES_VERSION, _nltk_version
+from slop_forensics.wordfreq_cache import WORDFREQ_VERSION
 from slop_forensics.utils import (
-    setup_logging, load_jsonl_file, save_json_file,
-    sanitize_filename, load_json_file
+    setup_logging, iter_jsonl_file, save_json_file,
+    sanitize_filename, load_json_file, file_fingerprint
 )
 
+# Kept in the cache dir, not the analysis output dir, where create_slop_lists would read it as a model's analysis:
+# {absolute dataset path: {key, analysis_file (absolute path)}}
+RESULT_CACHE_INDEX = os.path.join(config.CACHE_DIR, "slop_profile_cache.json")
+
+def analysis_cache_key(filepath, args):
+    """
+    Hash of everything a slop profile depends on: the dataset (see file_fingerprint),
+    the analysis settings in config, the slop lists, the package/wordfreq/NLTK
+    versions, the NLTK rules the regex tokenizer mirrors, and the syllable table
+    behind the complexity scores.
+    """
+    settings = {
+        "package_version": __version__,
+        "wordfreq_version": WORDFREQ_VERSION,
+        "nltk_version": _nltk_version(),
+        "regex_rules_version": NLTK_RULES_VERSION,
+        "syllable_table": syllable_table_fingerprint(),
+        "max_items": args.max_items,
+        "approx_ngrams": args.approx_ngrams,
+        "per_text_metrics": args.per_text_metrics,
+        "config": {
+            name: getattr(config, name) for name in (
+                "WORD_MIN_LENGTH", "WORD_MIN_REPETITION_COUNT", "WORD_MIN_PROMPT_IDS", "NGRAM_MIN_PROMPT_IDS",
+                "TOP_N_WORDS_REPETITION", "TOP_N_BIGRAMS", "TOP_N_TRIGRAMS", "STOPWORD_LANG", "TOKENIZER_BACKEND",
+            )
+        },
+        "slop_lists": {
+            list_type: file_fingerprint(path) if os.path.exists(path) else None
+            for list_type, path in SLOP_LIST_FILES.items()
+        },
+    }
+    if args.approx_ngrams:
+        settings["sketch"] = [config.SKETCH_TOPK_CAPACITY, config.SKETCH_CMS_WIDTH, config.SKETCH_CMS_DEPTH, config.SKETCH_HLL_PRECISION]
+    digest = hashlib.blake2b(file_fingerprint(filepath).encode(), digest_size=16)
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def load_cached_analysis(cache_index, filepath, cache_key, analysis_output_dir, need_word_counts=False):
+    """
+    Returns the stored analysis results for the dataset at filepath if its cache key
+    still matches and its analysis file is in analysis_output_dir (and, with
+    need_word_counts, its word count table exists), else None.
+    """
+    entry = cache_index.get(os.path.abspath(filepath))
+    if not entry or entry.get("key") != cache_key:
+        return None
+    analysis_filename = entry["analysis_file"]
+    if os.path.dirname(analysis_filename) != os.path.abspath(analysis_output_dir) or not os.path.exists(analysis_filename):
+        return None
+    if need_word_counts and not os.path.exists(word_counts_path(analysis_filename)):
+        return None
+    return load_json_file(analysis_filename)
+
 def log_top_patterns(logger, analysis_results, top_n=5):
     """Log the top words, bigrams, and trigrams from analysis results concisely."""
     model_name = analysis_results.get('model_name', 'Unknown Model')
@@ -52,8 +112,69 @@ def log_top_patterns(logger, analysis_results, top_n=5):
     
     logger.info("---")
 
+def analyze_dataset_file(filepath, args):
+    """
+    Analyzes one generated_*.jsonl file and saves its slop_profile__*.json.
+    Returns (model_name, analysis_filename, analysis_results), with results None on failure.
+    """
+    logger = logging.getLogger(__name__)
+    filename = os.path.basename(filepath)
+    logger.info(f"Processing file: {filename}")
+
+    # Peek at the first record for the model name; the texts themselves are streamed during analysis
+    first_item = next(iter_jsonl_file(filepath), None)
+    if not first_item:
+        logger.warning(f"No data loaded from {filename}. Skipping.")
+        return None, None, None
+
+    # Infer model name from filename or data (prefer data if available)
+    model_name = first_item.get("model")
+    if not model_name:
+        # Fallback: try to parse from filename "generated_provider__model_name.jsonl"
+        try:
+            sanitized_name = filename.replace("generated_", "").replace(".jsonl", "")
+            model_name = sanitized_name.replace("__", "/") # Simple reverse sanitization
+            logger.warning(f"Model name not found in data, inferred from filename: {model_name}")
+        except Exception:
+             logger.error(f"Could not determine model name for {filename}. Skipping.")
+             return None, None, None
+
+    logger.info(f"Analyzing model: {model_name}")
+    analysis_filename = os.path.join(args.analysis_output_dir, f"slop_profile__{sanitize_filename(model_name)}.json")
+    state_file = f"{os.path.splitext(analysis_filename)[0]}.state.pkl" if args.incremental else None
+    word_counts_file = word_counts_path(analysis_filename) if args.save_word_counts else None
+
+    perf = PerfRecorder(trace_memory=args.perf_memory) if args.perf or args.perf_memory else None
+
+    # Perform analysis, streaming (text, prompt_id) records straight from the file
+    try:
+        analysis_results = analyze_jsonl_file(
+            model_name, filepath, max_items=args.max_items,
+            num_workers=args.workers, two_pass_ngrams=args.two_pass_ngrams,
+            approximate_ngrams=args.approx_ngrams, state_file=state_file, perf=perf,
+            word_counts_file=word_counts_file, per_text_metrics=args.per_text_metrics
+        )
+    except Exception as e:
+        logger.error(f"Error during analysis for {model_name}: {e}", exc_info=True)
+        return model_name, analysis_filename, None
+
+    if not analysis_results.get("num_texts_analyzed"):
+        logger.warning(f"No valid text entries found for {model_name}. Skipping analysis.")
+        return model_name, analysis_filename, None
+
+    logger.debug(f"Model {model_name}: {analysis_results['num_texts_analyzed']} texts from {analysis_results['num_unique_prompts']} unique prompts.")
+    # Save individual analysis file as soon as the model is done
+    save_json_file(analysis_results, analysis_filename)
+    return model_name, analysis_filename, analysis_results
+
+def analyze_dataset_task(task):
+    """Pool worker wrapper around analyze_dataset_file; also returns the dataset filename."""
+    filepath, args = task
+    return (os.path.basename(filepath), *analyze_dataset_file(filepath, args))
+
 def main():
     setup_logging()
+    config.ensure_output_dirs()
     logger = logging.getLogger(__name__)
 
     parser = argparse.ArgumentParser(description="Analyze generated model outputs for metrics and features.")
@@ -81,6 +202,79 @@ def main():
         default=config.ANALYSIS_MAX_ITEMS_PER_MODEL,
         help=f"Maximum number of items to load per model dataset for analysis (default: {config.ANALYSIS_MAX_ITEMS_PER_MODEL})"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.ANALYSIS_NUM_WORKERS,
+        help=f"Worker processes used to analyze each model's texts (default: {config.ANALYSIS_NUM_WORKERS})"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Number of model datasets to analyze in parallel, one process each (default: 1). "
+            "Peak memory is roughly jobs x the memory of one model, which --max-items caps."
+        )
+    )
+    parser.add_argument(
+        "--two-pass-ngrams",
+        action="store_true",
+        default=config.NGRAM_TWO_PASS,
+        help="Count n-grams first, then re-read the dataset to verify prompt coverage only for top candidates (less memory, same results)"
+    )
+    parser.add_argument(
+        "--approx-ngrams",
+        action="store_true",
+        default=config.APPROX_NGRAM_COUNTS,
+        help=(
+            "Count n-grams approximately in fixed memory (Count-Min sketch + heavy-hitter summary); "
+            f"sized by SKETCH_* in config (tracks {config.SKETCH_TOPK_CAPACITY} candidates per n). "
+            "Error bounds are saved under 'ngram_approximation'."
+        )
+    )
+    parser.add_argument(
+        "--per-text-metrics",
+        action="store_true",
+        default=config.PER_TEXT_METRICS,
+        help=(
+            "Also score complexity and slop per text (in the --workers processes) and save their "
+            "mean, median, p10, p90 and std under '*_distribution'; the corpus scores are unchanged"
+        )
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Save each model's analysis state next to its slop_profile__*.json and, on later runs, "
+            "only analyze lines appended to the dataset since"
+        )
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-analyze every dataset even if it and the analysis settings are unchanged since the last run"
+    )
+    parser.add_argument(
+        "--no-word-counts",
+        dest="save_word_counts",
+        action="store_false",
+        default=config.SAVE_WORD_COUNTS,
+        help=(
+            "Don't save each model's word counts next to its slop_profile__*.json "
+            "(create_slop_lists.py then re-counts words from the raw datasets)"
+        )
+    )
+    parser.add_argument(
+        "--perf",
+        action="store_true",
+        help="Record per-stage wall/CPU time and item counts, save them under '_perf' in each slop_profile__*.json and log a summary"
+    )
+    parser.add_argument(
+        "--perf-memory",
+        action="store_true",
+        help="Like --perf, and also trace peak memory per stage with tracemalloc (much slower)"
+    )
     parser.add_argument(
         "--top-n",
         type=int,
@@ -93,6 +287,8 @@ def main():
     logger.info(f"Analysis output directory: {args.analysis_output_dir}")
     logger.info(f"Combined metrics output file: {args.combined_output_file}")
     logger.info(f"Max items per model: {args.max_items}")
+    logger.info(f"Worker processes per model: {args.workers}")
+    logger.info(f"Parallel model jobs: {args.jobs}")
     logger.info(f"Will log top {args.top_n} patterns per model")
 
     os.makedirs(args.analysis_output_dir, exist_ok=True)
@@ -108,6 +304,15 @@ def main():
     all_models_metrics = {}
     all_models_analysis = {}  # Store analysis results for summary at the end
 
+    # --- Result cache: skip datasets that are unchanged since their profile was written ---
+    # The index is shared by every input/output dir, so it is loaded (and extended) even with --no-cache
+    cache_index = (load_json_file(RESULT_CACHE_INDEX) if os.path.exists(RESULT_CACHE_INDEX) else None) or {}
+    legacy_cache_index = os.path.join(args.analysis_output_dir, os.path.basename(RESULT_CACHE_INDEX))
+    if os.path.exists(legacy_cache_index):
+        # Older versions kept the index among the analysis files, where create_slop_lists trips over it
+        os.remove(legacy_cache_index)
+        logger.info(f"Removed old result cache index {legacy_cache_index}; datasets will be re-analyzed once.")
+
     # --- Load existing combined data (e.g., ELO scores) if it exists ---
     # This allows merging new metrics with previous results.
     existing_combined_data = load_json_file(args.combined_output_file) or {}
@@ -117,65 +322,13 @@ def main():
          all_models_metrics = existing_combined_data.copy()
 
 
-    # --- Process each dataset file ---
-    for filename in tqdm(dataset_files, desc="Analyzing Models"):
-        filepath = os.path.join(args.input_dir, filename)
-        logger.info(f"Processing file: {filename}")
-
-        # Load data for the model
-        model_data = load_jsonl_file(filepath, max_items=args.max_items)
-        if not model_data:
-            logger.warning(f"No data loaded from {filename}. Skipping.")
-            continue
-
-        # Infer model name from filename or data (prefer data if available)
-        model_name = model_data[0].get("model")
-        if not model_name:
-            # Fallback: try to parse from filename "generated_provider__model_name.jsonl"
-            try:
-                sanitized_name = filename.replace("generated_", "").replace(".jsonl", "")
-                model_name = sanitized_name.replace("__", "/") # Simple reverse sanitization
-                logger.warning(f"Model name not found in data, inferred from filename: {model_name}")
-            except Exception:
-                 logger.error(f"Could not determine model name for {filename}. Skipping.")
-                 continue
-
-        logger.info(f"Analyzing model: {model_name} ({len(model_data)} items)")
-
-        # Prepare data for analysis functions
-        # texts_with_ids: List[Tuple[str, str]] - (text, prompt_id)
-        # prompts_data: Dict[str, List[str]] - {prompt_id: [text1, text2]}
-        texts_with_ids = []
-        prompts_data = defaultdict(list)
-        unique_prompts = set()
-
-        for item in model_data:
-            text = item.get("output")
-            prompt_id = f"{item.get('source', 'unknown')}_{item.get('id', 'unknown')}" # Create unique prompt ID
-            if text and isinstance(text, str):
-                texts_with_ids.append((text, prompt_id))
-                prompts_data[prompt_id].append(text)
-                unique_prompts.add(prompt_id)
-
-        if not texts_with_ids:
-            logger.warning(f"No valid text entries found for {model_name}. Skipping analysis.")
-            continue
-
-        logger.debug(f"Model {model_name}: {len(texts_with_ids)} texts from {len(unique_prompts)} unique prompts.")
-
-        # Perform analysis
-        try:
-            analysis_results = analyze_texts(model_name, texts_with_ids, prompts_data)
-            # Store analysis results for summary
-            all_models_analysis[model_name] = analysis_results
-        except Exception as e:
-            logger.error(f"Error during analysis for {model_name}: {e}", exc_info=True)
-            continue # Skip to next model on error
-
-        # Save individual analysis file
-        analysis_filename = os.path.join(args.analysis_output_dir, f"slop_profile__{sanitize_filename(model_name)}.json")
-        save_json_file(analysis_results, analysis_filename)
+    models_perf = {}  # _perf of models analyzed in this run (not cached ones)
 
+    def record_results(model_name, analysis_results):
+        # Store analysis results for summary
+        all_models_analysis[model_name] = analysis_results
+        # Timings stay in the per-model file only
+        analysis_results = {k: v for k, v in analysis_results.items() if k != "_perf"}
         # Merge results into the combined dictionary
         # If model already exists (from loaded ELO), update its dict, otherwise add it
         if model_name in all_models_metrics:
@@ -183,6 +336,53 @@ def main():
         else:
             all_models_metrics[model_name] = analysis_results
 
+    # --- Use cached results where possible; collect the datasets that need analysis ---
+    pending_files = []
+    for filename in dataset_files:
+        filepath = os.path.join(args.input_dir, filename)
+        cache_key = analysis_cache_key(filepath, args)
+        analysis_results = None if args.no_cache else load_cached_analysis(
+            cache_index, filepath, cache_key, args.analysis_output_dir, need_word_counts=args.save_word_counts
+        )
+        if analysis_results:
+            model_name = analysis_results.get("model_name", filename)
+            logger.info(f"Unchanged since last run, using cached analysis for model: {model_name}")
+            record_results(model_name, analysis_results)
+        else:
+            pending_files.append((filename, cache_key))
+
+    # --- Process each remaining dataset file ---
+    tasks = [(os.path.join(args.input_dir, filename), args) for filename, _ in pending_files]
+    cache_keys = dict(pending_files)
+    jobs = max(1, min(args.jobs, len(tasks), os.cpu_count() or 1))
+    if jobs > 1:
+        if args.workers > 1:
+            logger.warning(f"--jobs {jobs} analyzes each model in a single process; ignoring --workers {args.workers}.")
+            args.workers = 1
+        logger.info(f"Analyzing {len(tasks)} models in {jobs} parallel jobs...")
+        # One model per worker process, so each model's memory is released when it finishes
+        pool = Pool(processes=jobs, maxtasksperchild=1)
+        results_iter = pool.imap_unordered(analyze_dataset_task, tasks)
+    else:
+        pool = None
+        results_iter = (analyze_dataset_task(task) for task in tasks)
+
+    try:
+        for filename, model_name, analysis_filename, analysis_results in tqdm(results_iter, total=len(tasks), desc="Analyzing Models"):
+            if analysis_results is None:
+                continue
+            record_results(model_name, analysis_results)
+            if "_perf" in analysis_results:
+                models_perf[model_name] = analysis_results["_perf"]
+            cache_index[os.path.abspath(os.path.join(args.input_dir, filename))] = {
+                "key": cache_keys[filename], "analysis_file": os.path.abspath(analysis_filename)
+            }
+            save_json_file(cache_index, RESULT_CACHE_INDEX)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
     # --- Save the final combined metrics file ---
     if all_models_metrics:
         logger.info(f"Saving combined metrics for {len(all_models_metrics)} models to {args.combined_output_file}")
@@ -196,6 +396,19 @@ def main():
         log_top_patterns(logger, analysis_results, top_n=args.top_n)
     logger.info("============== END SUMMARY ===============")
 
+    # --- Log per-stage timings ---
+    if models_perf:
+        logger.info("\n========== PER-STAGE PERFORMANCE ==========")
+        total_perf = PerfRecorder(trace_memory=args.perf_memory)
+        for model_name, perf in models_perf.items():
+            logger.info(f"MODEL: {model_name}\n{format_perf_summary(perf)}")
+            for name, stats in perf["stages"].items():
+                total = total_perf.stages.setdefault(name, StageStats())
+                total.add(StageStats.from_dict(stats))
+        if len(models_perf) > 1:
+            logger.info(f"ALL {len(models_perf)} MODELS:\n{format_perf_summary(total_perf.as_dict())}")
+        logger.info("============== END PERFORMANCE ===============")
+
     logger.info("Analysis script finished.")
     
     # Display file locations for reference
@@ -0,0 +1,75 @@
+import sys
+import os
+import json
+import argparse
+import logging
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from slop_forensics import config
+from slop_forensics.analysis import iter_texts_with_ids
+from slop_forensics.tokenization import compare_tokenizers
+from slop_forensics.utils import setup_logging, iter_jsonl_file, save_json_file
+
+def main():
+    setup_logging()
+    config.ensure_output_dirs()
+    logger = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(
+        description="Diff the fast 'regex' tokenizer backend against NLTK on a sample of generated texts."
+    )
+    parser.add_argument(
+        "--input-dir",
+        type=str,
+        default=config.DATASET_OUTPUT_DIR,
+        help=f"Directory containing generated .jsonl datasets (default: {config.DATASET_OUTPUT_DIR})"
+    )
+    parser.add_argument(
+        "--max-items",
+        type=int,
+        default=config.ANALYSIS_MAX_ITEMS_PER_MODEL,
+        help=f"Maximum number of items to load per dataset (default: {config.ANALYSIS_MAX_ITEMS_PER_MODEL})"
+    )
+    parser.add_argument("--sample", type=int, default=1000, help="Texts to compare, sampled across all datasets (default: 1000)")
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed (default: 0)")
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="Compare on normalize_text output, as analyze_texts tokenizes (default: raw text, as the slop list and metric code does)"
+    )
+    parser.add_argument("--examples", type=int, default=10, help="Differences to include as examples (default: 10)")
+    parser.add_argument("--output", type=str, default=None, help="JSON file to write the report to (default: print to stdout)")
+    args = parser.parse_args()
+
+    dataset_files = sorted(f for f in os.listdir(args.input_dir) if f.startswith("generated_") and f.endswith(".jsonl"))
+    if not dataset_files:
+        logger.error(f"No dataset files found in {args.input_dir}. Exiting.")
+        sys.exit(1)
+
+    texts = [
+        text
+        for filename in dataset_files
+        for text, _ in iter_texts_with_ids(iter_jsonl_file(os.path.join(args.input_dir, filename), args.max_items))
+    ]
+    logger.info(f"Loaded {len(texts)} texts from {len(dataset_files)} datasets; comparing up to {args.sample}.")
+
+    report = compare_tokenizers(
+        texts, sample_size=args.sample, seed=args.seed,
+        normalize=args.normalize, max_examples=args.examples
+    )
+    logger.info(
+        f"{report['texts_with_token_diffs']} of {report['texts_compared']} texts differ in word tokens "
+        f"(token agreement {report['token_agreement']:.4%}); "
+        f"{report['texts_with_sentence_count_diffs']} differ in sentence count."
+    )
+    if args.output:
+        save_json_file(report, args.output)
+        logger.info(f"Wrote tokenizer comparison to {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
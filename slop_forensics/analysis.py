@@ -1,34 +1,48 @@
+import os
 import re
 import json
+import pickle
+import hashlib
 import logging
-from collections import Counter, defaultdict
-from typing import List, Tuple, Dict, Set, Counter as TypingCounter, Optional, Union, Any
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
+from itertools import islice
+from collections.abc import Sequence
+from multiprocessing import Pool
+from typing import List, Tuple, Dict, Set, FrozenSet, Counter as TypingCounter, Optional, Union, Any, Iterable, Iterator, Callable
 
 import numpy as np
 from tqdm import tqdm
-from wordfreq import word_frequency
-import nltk
-from nltk.corpus import stopwords
-from scipy.stats import spearmanr
 
 from . import config
 from .constants import KNOWN_CONTRACTIONS_S, FORBIDDEN_SUBSTRINGS
-from .utils import normalize_text, extract_words
+from .utils import normalize_text, extract_words, iter_jsonl_file, JsonlTailReader
+from .tokenization import tokenize_text, tokenize_ngrams, word_tokenize
+from .wordfreq_cache import get_word_frequencies
+from .sketches import NgramHeavyHitters
+from .perf import PerfRecorder, perf_stage
+from .vocabulary import (
+    Vocabulary, DenseCounter, ArrayCounter, DocumentFrequency, UngroupedDocumentsError, MAX_NGRAM_VOCAB,
+    pack_ngrams, pack_known_ngrams, unpack_ngrams, remap_ngram_keys
+)
 
 logger = logging.getLogger(__name__)
 
 # --- NLTK Setup ---
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-    STOP_WORDS = set(stopwords.words(config.STOPWORD_LANG))
-    logger.info(f"Loaded {len(STOP_WORDS)} NLTK stopwords for '{config.STOPWORD_LANG}'.")
-except LookupError:
-    logger.warning(f"NLTK 'punkt' or 'stopwords' not found. Run nltk.download('punkt') and nltk.download('stopwords').")
-    STOP_WORDS = set()
-except ImportError:
-    logger.warning("NLTK not installed. Stopword filtering will be skipped.")
-    STOP_WORDS = set()
+@lru_cache(maxsize=None)
+def get_stop_words() -> FrozenSet[str]:
+    """NLTK stopwords for config.STOPWORD_LANG, loaded on first use; empty if unavailable."""
+    try:
+        from nltk.corpus import stopwords
+        stop_words = frozenset(stopwords.words(config.STOPWORD_LANG))
+    except LookupError:
+        logger.warning(f"NLTK 'stopwords' not found. Run nltk.download('stopwords').")
+        return frozenset()
+    except ImportError:
+        logger.warning("NLTK not installed. Stopword filtering will be skipped.")
+        return frozenset()
+    logger.info(f"Loaded {len(stop_words)} NLTK stopwords for '{config.STOPWORD_LANG}'.")
+    return stop_words
 
 
 # --- Core Word Counting and Filtering ---
@@ -94,12 +108,18 @@ def filter_by_minimum_count(word_counts: TypingCounter[str], min_count: int) ->
 
 def filter_stopwords(word_counts: TypingCounter[str]) -> TypingCounter[str]:
     """Filters out common English stopwords."""
-    if not STOP_WORDS:
+    stop_words = get_stop_words()
+    if not stop_words:
         return word_counts
-    return Counter({word: count for word, count in word_counts.items() if word not in STOP_WORDS})
+    return Counter({word: count for word, count in word_counts.items() if word not in stop_words})
 
-def filter_common_words(word_counts: TypingCounter[str], wordfreq_freqs: Dict[str, float], threshold: float) -> TypingCounter[str]:
-    """Filters out words whose general frequency (wordfreq) is above a threshold."""
+def filter_common_words(word_counts: TypingCounter[str], wordfreq_freqs: Optional[Dict[str, float]], threshold: float) -> TypingCounter[str]:
+    """
+    Filters out words whose general frequency (wordfreq) is above a threshold.
+    If wordfreq_freqs is None, frequencies are looked up through the wordfreq cache.
+    """
+    if wordfreq_freqs is None:
+        wordfreq_freqs = get_word_frequencies(word_counts.keys())
     return Counter({
         word: count for word, count in word_counts.items()
         if wordfreq_freqs.get(word, 0) <= threshold
@@ -109,7 +129,10 @@ def filter_common_words(word_counts: TypingCounter[str], wordfreq_freqs: Dict[st
 # --- Rarity Analysis ---
 
 def analyze_word_rarity(word_counts: TypingCounter[str]) -> Tuple[Dict[str, float], Dict[str, float], float, float, float]:
-    """Analyzes word rarity based on corpus and wordfreq frequencies."""
+    """
+    Analyzes word rarity based on corpus and wordfreq frequencies.
+    Computed on aligned NumPy arrays (vocab order = word_counts order).
+    """
     corpus_frequencies = {}
     wordfreq_frequencies = {}
     avg_corpus_rarity = np.nan
@@ -119,38 +142,38 @@ def analyze_word_rarity(word_counts: TypingCounter[str]) -> Tuple[Dict[str, floa
     if not word_counts:
         return corpus_frequencies, wordfreq_frequencies, avg_corpus_rarity, avg_wordfreq_rarity, correlation
 
-    total_words = sum(word_counts.values())
+    vocab = list(word_counts.keys())
+    counts = np.fromiter(word_counts.values(), dtype=np.int64, count=len(vocab))
+    total_words = int(counts.sum())
     if total_words == 0:
         return corpus_frequencies, wordfreq_frequencies, avg_corpus_rarity, avg_wordfreq_rarity, correlation
 
-    corpus_frequencies = {word: count / total_words for word, count in word_counts.items()}
+    corpus_freq_arr = counts / total_words
 
-    # Fetch wordfreq data (can be slow for large vocabularies)
-    logger.debug(f"Fetching wordfreq data for {len(word_counts)} unique words...")
-    for word in word_counts.keys():
-        try:
-            wordfreq_frequencies[word] = word_frequency(word, 'en')
-        except Exception as e:
-            logger.warning(f"Error fetching word frequency for '{word}': {e}")
-            wordfreq_frequencies[word] = 0.0 # Assign 0 if error
-
-    # Calculate rarity metrics
-    valid_words = [word for word, freq in wordfreq_frequencies.items() if freq > 0]
-    if valid_words:
-        corpus_freq_list = [corpus_frequencies[word] for word in valid_words]
-        wordfreq_freq_list = [wordfreq_frequencies[word] for word in valid_words]
-
-        # Use np.log10, handle potential log(0) with small epsilon or filter zeros
-        epsilon = 1e-12 # Small value to avoid log10(0)
-        safe_corpus_freqs = [max(f, epsilon) for f in corpus_freq_list]
-        safe_wordfreq_freqs = [max(f, epsilon) for f in wordfreq_freq_list]
+    # Fetch wordfreq data (bulk lookup through the persistent cache; only misses hit wordfreq)
+    logger.debug(f"Fetching wordfreq data for {len(vocab)} unique words...")
+    frequencies = get_word_frequencies(vocab)
+    wordfreq_arr = np.fromiter((frequencies[word] for word in vocab), dtype=np.float64, count=len(vocab))
+
+    corpus_frequencies = dict(zip(vocab, corpus_freq_arr.tolist()))
+    wordfreq_frequencies = dict(zip(vocab, wordfreq_arr.tolist()))
 
-        avg_corpus_rarity = np.mean([-np.log10(f) for f in safe_corpus_freqs])
-        avg_wordfreq_rarity = np.mean([-np.log10(f) for f in safe_wordfreq_freqs])
+    # Calculate rarity metrics over words known to wordfreq
+    valid = wordfreq_arr > 0
+    num_valid = int(np.count_nonzero(valid))
+    if num_valid:
+        corpus_freq_valid = corpus_freq_arr[valid]
+        wordfreq_freq_valid = wordfreq_arr[valid]
 
-        if len(valid_words) >= 2:
+        # Use np.log10, handle potential log(0) with small epsilon
+        epsilon = 1e-12 # Small value to avoid log10(0)
+        avg_corpus_rarity = np.mean(-np.log10(np.maximum(corpus_freq_valid, epsilon)))
+        avg_wordfreq_rarity = np.mean(-np.log10(np.maximum(wordfreq_freq_valid, epsilon)))
+
+        if num_valid >= 2:
+            from scipy.stats import spearmanr # Imported on first use; scipy is slow to import
             try:
-                correlation, _ = spearmanr(corpus_freq_list, wordfreq_freq_list)
+                correlation, _ = spearmanr(corpus_freq_valid, wordfreq_freq_valid)
                 if np.isnan(correlation): correlation = 0.0 # Handle NaN result from spearmanr
             except Exception as e:
                  logger.warning(f"Could not calculate correlation: {e}")
@@ -161,6 +184,31 @@ def analyze_word_rarity(word_counts: TypingCounter[str]) -> Tuple[Dict[str, floa
 
 # --- Finding Specific Word/N-gram Lists ---
 
+def _top_n_candidates(scores: np.ndarray, top_n: int) -> np.ndarray:
+    """
+    Indices of every score that could make the top_n: the top_n highest plus any
+    ties at the cutoff. Found with a partition rather than a full sort.
+    """
+    if top_n <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_n >= scores.size:
+        return np.arange(scores.size)
+    kth = scores.size - top_n
+    threshold = np.partition(scores, kth)[kth]
+    return np.flatnonzero(scores >= threshold)
+
+
+def _top_n_indices(scores: np.ndarray, labels: List[str], top_n: int) -> List[int]:
+    """
+    Indices of the top_n highest scores, ordered by score descending then label.
+    Only the candidates from _top_n_candidates are fully sorted.
+    """
+    candidates = _top_n_candidates(scores, top_n)
+    candidate_scores = scores[candidates].tolist()
+    order = sorted(range(len(candidates)), key=lambda i: (-candidate_scores[i], labels[candidates[i]]))
+    return [int(candidates[i]) for i in order[:top_n]]
+
+
 def find_over_represented_words(
     corpus_frequencies: Dict[str, float],
     wordfreq_frequencies: Dict[str, float],
@@ -169,38 +217,37 @@ def find_over_represented_words(
     """
     Finds words most over-represented compared to wordfreq.
     Returns list of (word, ratio, corpus_freq, wordfreq_freq).
-    Sorts by ratio descending.
+    Sorts by ratio descending, ties broken alphabetically so results don't depend on input order.
     """
-    over_representation = {}
+    vocab = list(corpus_frequencies.keys())
+    corpus_freq_arr = np.fromiter(corpus_frequencies.values(), dtype=np.float64, count=len(vocab))
+    wordfreq_arr = np.fromiter((wordfreq_frequencies.get(word, 0) for word in vocab), dtype=np.float64, count=len(vocab))
+
     epsilon = 1e-12 # Avoid division by zero for wordfreq
-    for word, corpus_freq in corpus_frequencies.items():
-        wordfreq_freq = wordfreq_frequencies.get(word, 0)
-        ratio = corpus_freq / max(wordfreq_freq, epsilon)
-        over_representation[word] = (ratio, corpus_freq, wordfreq_freq)
-
-    # Sort by ratio (descending)
-    sorted_words = sorted(
-        over_representation.items(),
-        key=lambda item: item[1][0], # Sort by ratio
-        reverse=True
-    )
+    ratios = corpus_freq_arr / np.maximum(wordfreq_arr, epsilon)
 
-    # Return top_n with full info: (word, (ratio, corpus_freq, wordfreq_freq)) -> (word, ratio, corpus_freq, wordfreq_freq)
-    return [(word, data[0], data[1], data[2]) for word, data in sorted_words[:top_n]]
+    top_indices = _top_n_indices(ratios, vocab, top_n)
+    return [
+        (vocab[i], float(ratios[i]), float(corpus_freq_arr[i]), float(wordfreq_arr[i]))
+        for i in top_indices
+    ]
 
 
 def find_zero_frequency_words(
     word_counts: TypingCounter[str],
-    wordfreq_frequencies: Dict[str, float],
+    wordfreq_frequencies: Optional[Dict[str, float]] = None,
     top_n: int = 20000
 ) -> List[Tuple[str, int]]:
-    """Finds most frequent words with zero wordfreq frequency."""
-    zero_freq_words = {
-        word: count for word, count in word_counts.items()
-        if wordfreq_frequencies.get(word, -1) == 0 # Check if wordfreq is exactly 0
-    }
-    # Sort by count (descending)
-    return sorted(zero_freq_words.items(), key=lambda item: item[1], reverse=True)[:top_n]
+    """
+    Finds most frequent words with zero wordfreq frequency.
+    If wordfreq_frequencies is None, frequencies are looked up through the wordfreq cache.
+    """
+    if wordfreq_frequencies is None:
+        wordfreq_frequencies = get_word_frequencies(word_counts.keys())
+    vocab = [word for word in word_counts if wordfreq_frequencies.get(word, -1) == 0] # Check if wordfreq is exactly 0
+    counts = np.fromiter((word_counts[word] for word in vocab), dtype=np.int64, count=len(vocab))
+    # Sort by count (descending), ties broken alphabetically
+    return [(vocab[i], int(counts[i])) for i in _top_n_indices(counts, vocab, top_n)]
 
 
 def get_ngrams(
@@ -219,6 +266,8 @@ def get_ngrams(
     if len(prompts_data) < min_prompt_ids:
         return []
 
+    from nltk import ngrams
+    stop_words = get_stop_words()
     logger.debug(f"Extracting {n}-grams (min prompts: {min_prompt_ids})...")
     total_texts_processed = 0
     for prompt_id, texts in prompts_data.items():
@@ -228,19 +277,19 @@ def get_ngrams(
             try:
                 # Tokenize, remove punctuation/stopwords
                 tokens = [
-                    word for word in nltk.word_tokenize(normalized_text)
-                    if word.isalpha() and word not in STOP_WORDS
+                    word for word in word_tokenize(normalized_text)
+                    if word.isalpha() and word not in stop_words
                 ]
             except LookupError:
                  logger.warning("NLTK 'punkt' tokenizer not found. Using basic split for ngrams.")
-                 tokens = [w for w in normalized_text.split() if w.isalpha() and w not in STOP_WORDS]
+                 tokens = [w for w in normalized_text.split() if w.isalpha() and w not in stop_words]
 
 
             if len(tokens) < n:
                 continue
 
             try:
-                current_ngrams = nltk.ngrams(tokens, n)
+                current_ngrams = ngrams(tokens, n)
                 for ngram_tuple in current_ngrams:
                     ngram_counts[ngram_tuple] += 1
                     ngram_prompt_map[ngram_tuple].add(prompt_id)
@@ -249,7 +298,20 @@ def get_ngrams(
 
 
     logger.debug(f"Processed {total_texts_processed} texts for {n}-grams.")
+    return select_top_ngrams(ngram_counts, ngram_prompt_map, n, top_k, min_prompt_ids)
+
 
+def select_top_ngrams(
+    ngram_counts: TypingCounter[Tuple[str, ...]],
+    ngram_prompt_map: Dict[Tuple[str, ...], Set[str]],
+    n: int,
+    top_k: int,
+    min_prompt_ids: int
+) -> List[Dict[str, Union[str, int]]]:
+    """
+    Filters counted N-grams by min_prompt_ids and formats the top_k by frequency.
+    Ties are broken by the N-gram itself so the output doesn't depend on input order.
+    """
     # Filter by min_prompt_ids
     filtered_ngrams = {
         ngram: count for ngram, count in ngram_counts.items()
@@ -261,7 +323,7 @@ def get_ngrams(
         return []
 
     # Sort by frequency and format output
-    sorted_filtered = sorted(filtered_ngrams.items(), key=lambda item: item[1], reverse=True)
+    sorted_filtered = sorted(filtered_ngrams.items(), key=lambda item: (-item[1], item[0]))
 
     # Format as list of dictionaries
     formatted_output = [
@@ -274,19 +336,819 @@ def get_ngrams(
 
 # --- Main Analysis Orchestration ---
 
+class AnalysisState:
+    """
+    Running totals for analyze_texts, fed one text at a time.
+    Each text goes through tokenize_text once and every metric is updated from
+    the token streams it returns: word counts, word -> prompt IDs, bi/trigram
+    counts and prompt IDs, and the sums behind the complexity and slop indices.
+    Words, n-gram tokens and prompt IDs are interned to dense ints; n-grams are
+    packed into int64 keys and counted in bulk. Prompt coverage is kept as a
+    DocumentFrequency table rather than a set per key. Strings are only decoded
+    for results.
+
+    With prompts_grouped=True, each prompt's texts must be contiguous (as in the
+    generated datasets, where every record has its own prompt), and the prompt
+    tables only keep a count and last-seen prompt per key; a prompt that
+    reappears after another raises UngroupedDocumentsError. With False, any
+    order works and the tables keep every distinct (key, prompt) pair.
+
+    With two_pass_ngrams=True, n-gram prompt coverage is not tracked while
+    counting. Nothing per text is kept either: top_ngrams re-reads the texts
+    from text_source and verifies coverage only for candidates that can reach
+    the top-k. That costs a second tokenization of every text (of the n-gram
+    tokens only), in exchange for not holding the prompt tables of all n-grams. text_source is a callable returning a fresh iterable of the same
+    (text, prompt_id) pairs, set by whoever built the state; it is not pickled.
+
+    With approximate_ngrams=True, n-grams go into fixed-size sketches instead
+    (see sketches.NgramHeavyHitters): frequencies and prompt counts are
+    estimates, with error bounds reported by ngram_error_bounds. This takes
+    precedence over two_pass_ngrams. Word counts stay exact either way, since
+    they are bounded by the vocabulary.
+
+    With per_text_metrics=True, each text's own complexity and slop index are
+    kept as well (in input order, also across merges) for the distributions in
+    the results. The corpus values still come from the pooled counts.
+    """
+
+    NGRAM_SIZES = (2, 3)
+
+    def __init__(
+        self,
+        min_length: int = config.WORD_MIN_LENGTH,
+        two_pass_ngrams: bool = config.NGRAM_TWO_PASS,
+        approximate_ngrams: bool = config.APPROX_NGRAM_COUNTS,
+        perf: Optional[PerfRecorder] = None,
+        per_text_metrics: bool = config.PER_TEXT_METRICS,
+        prompts_grouped: bool = True
+    ):
+        self.min_length = min_length
+        self.perf = perf # Per-stage timings (see perf.PerfRecorder); None disables them
+        self.approximate_ngrams = approximate_ngrams
+        self.two_pass_ngrams = two_pass_ngrams and not approximate_ngrams
+        self.prompts_grouped = prompts_grouped
+        self.num_texts = 0
+        self.total_chars = 0
+        self.prompt_vocab = Vocabulary()
+
+        self.word_vocab = Vocabulary()
+        self.word_counter = DenseCounter()
+        self.word_prompts = DocumentFrequency(grouped=prompts_grouped)
+
+        self.token_vocab = Vocabulary()
+        self.ngram_counts: Dict[int, ArrayCounter] = {n: ArrayCounter() for n in self.NGRAM_SIZES}
+        self.ngram_prompts: Dict[int, DocumentFrequency] = {
+            n: DocumentFrequency(grouped=prompts_grouped) for n in self.NGRAM_SIZES
+        }
+        # Two-pass mode only: re-reads the texts for the verify pass, and its results per (top_k, min_prompt_ids)
+        self.text_source: Optional[Callable[[], Iterable[Tuple[str, str]]]] = None
+        self._verified_ngrams: Dict[Tuple[int, int], Dict[int, Tuple[np.ndarray, np.ndarray]]] = {}
+        # Approximate mode only
+        self.ngram_sketches: Dict[int, NgramHeavyHitters] = {}
+        if approximate_ngrams:
+            self.ngram_sketches = {
+                n: NgramHeavyHitters(
+                    n, config.SKETCH_TOPK_CAPACITY, config.SKETCH_CMS_WIDTH, config.SKETCH_CMS_DEPTH,
+                    config.SKETCH_HLL_PRECISION, batch_size=config.SKETCH_BATCH_SIZE
+                )
+                for n in self.NGRAM_SIZES
+            }
+
+        # Complexity index inputs
+        self.sentence_count = 0
+        self.metric_word_count = 0
+        self.syllable_count = 0
+        self.complex_word_count = 0
+
+        # Slop index inputs
+        self.slop_word_count = 0
+        self.slop_word_hits = 0
+        self.slop_bigram_hits = 0
+        self.slop_trigram_hits = 0
+
+        # Per-text metrics mode only: each text's complexity and slop index
+        self.per_text_metrics = per_text_metrics
+        self.text_complexity: List[float] = []
+        self.text_slop: List[float] = []
+
+    @property
+    def num_prompts(self) -> int:
+        return len(self.prompt_vocab)
+
+    @property
+    def word_counts(self) -> TypingCounter[str]:
+        """Decoded word counts, in first-seen order."""
+        ids, counts = self.word_counter.items()
+        return Counter(dict(zip(self.word_vocab.decode(ids.tolist()), counts.tolist())))
+
+    def add_text(self, text: str, prompt_id: str):
+        """Tokenizes a single text and folds it into the running totals."""
+        from .metrics import syllable_count, count_slop_hits, complexity_from_counts, slop_index_from_hits
+
+        if self.prompts_grouped and self.prompt_vocab.get(prompt_id) not in (-1, len(self.prompt_vocab) - 1):
+            raise UngroupedDocumentsError(f"Texts of prompt {prompt_id!r} are not contiguous; use prompts_grouped=False.")
+        perf = self.perf
+        with perf_stage(perf, "tokenize", items=1):
+            tokenized = tokenize_text(text, get_stop_words(), self.min_length)
+        self.num_texts += 1
+        self.total_chars += tokenized.char_count
+        prompt = self.prompt_vocab.intern(prompt_id)
+
+        with perf_stage(perf, "word_counting", items=len(tokenized.words)):
+            word_ids = self.word_vocab.encode(tokenized.words)
+            self.word_counter.add(word_ids)
+            self.word_prompts.add(np.unique(word_ids), prompt)
+
+        with perf_stage(perf, "ngram_counting", items=len(tokenized.ngram_tokens)):
+            if self.approximate_ngrams:
+                for sketch in self.ngram_sketches.values():
+                    sketch.add_tokens(tokenized.ngram_tokens, prompt_id)
+            else:
+                self._add_ngrams(tokenized.ngram_tokens, prompt)
+
+        metric_tokens = tokenized.metric_tokens
+        self.sentence_count += tokenized.sentence_count
+        self.metric_word_count += len(metric_tokens)
+        with perf_stage(perf, "complexity", items=len(metric_tokens)):
+            text_syllables = 0
+            text_complex_words = 0
+            for token in metric_tokens:
+                syllables = syllable_count(token)
+                text_syllables += syllables
+                if syllables >= 3:
+                    text_complex_words += 1
+        self.syllable_count += text_syllables
+        self.complex_word_count += text_complex_words
+
+        slop_tokens = tokenized.slop_tokens
+        self.slop_word_count += len(slop_tokens)
+        with perf_stage(perf, "slop_scoring", items=len(slop_tokens)):
+            word_hits, bigram_hits, trigram_hits = count_slop_hits(slop_tokens)
+        self.slop_word_hits += word_hits
+        self.slop_bigram_hits += bigram_hits
+        self.slop_trigram_hits += trigram_hits
+
+        if self.per_text_metrics:
+            self.text_complexity.append(
+                complexity_from_counts(tokenized.sentence_count, len(metric_tokens), text_syllables, text_complex_words)
+                if metric_tokens else 0.0
+            )
+            self.text_slop.append(slop_index_from_hits(word_hits, bigram_hits, trigram_hits, len(slop_tokens)))
+
+    def _add_ngrams(self, ngram_tokens: List[str], prompt: int):
+        token_ids = self.token_vocab.encode(ngram_tokens)
+        if len(self.token_vocab) > MAX_NGRAM_VOCAB:
+            raise ValueError(f"N-gram vocabulary exceeds {MAX_NGRAM_VOCAB} tokens; cannot pack n-gram keys.")
+        self._verified_ngrams = {}
+        for n in self.NGRAM_SIZES:
+            if len(token_ids) < n:
+                continue
+            keys = pack_ngrams(token_ids, n)
+            self.ngram_counts[n].add(keys)
+            if not self.two_pass_ngrams:
+                self.ngram_prompts[n].add(np.unique(keys), prompt)
+
+    def merge(self, other: "AnalysisState"):
+        """
+        Folds another state into this one. Merging is exact: counts are summed and
+        prompt sets unioned. Other's IDs are remapped into this state's vocabularies,
+        so merging contiguous shards in order reproduces the serial state, including
+        the first-seen order of IDs.
+        """
+        # Checked before anything is folded in, so a failed merge leaves self untouched
+        if self.approximate_ngrams != other.approximate_ngrams:
+            raise ValueError("Cannot merge exact and approximate n-gram states.")
+        if self.two_pass_ngrams != other.two_pass_ngrams:
+            raise ValueError("Cannot merge single-pass and two-pass n-gram states.")
+        if self.per_text_metrics != other.per_text_metrics:
+            raise ValueError("Cannot merge states with and without per-text metrics.")
+        if self.prompts_grouped != other.prompts_grouped:
+            raise ValueError("Cannot merge states with grouped and ungrouped prompts.")
+        if self.prompts_grouped and len(self.prompt_vocab):
+            # Other must continue this state's input: only its first prompt may be one seen here, and only our last
+            shared = [i for i, prompt_id in enumerate(other.prompt_vocab.tokens) if prompt_id in self.prompt_vocab]
+            if shared and (shared != [0] or other.prompt_vocab.tokens[0] != self.prompt_vocab.tokens[-1]):
+                raise UngroupedDocumentsError("Merged state repeats prompts from before this state's last prompt.")
+        new_tokens = sum(1 for token in other.token_vocab.tokens if token not in self.token_vocab)
+        if len(self.token_vocab) + new_tokens > MAX_NGRAM_VOCAB:
+            raise ValueError(f"N-gram vocabulary exceeds {MAX_NGRAM_VOCAB} tokens; cannot pack n-gram keys.")
+        self.num_texts += other.num_texts
+        self.total_chars += other.total_chars
+        if self.perf is not None:
+            self.perf.merge(other.perf)
+        prompt_map = self.prompt_vocab.remap_from(other.prompt_vocab)
+
+        word_map = self.word_vocab.remap_from(other.word_vocab)
+        other_word_ids, other_word_counts = other.word_counter.items()
+        self.word_counter.add(word_map[other_word_ids], other_word_counts)
+        self.word_prompts.merge(other.word_prompts, map_keys=lambda keys: word_map[keys], doc_map=prompt_map)
+
+        token_map = self.token_vocab.remap_from(other.token_vocab)
+        for n in self.NGRAM_SIZES:
+            other_keys, other_counts = other.ngram_counts[n].items()
+            self.ngram_counts[n].add(remap_ngram_keys(other_keys, n, token_map), other_counts)
+            self.ngram_prompts[n].merge(
+                other.ngram_prompts[n], map_keys=lambda keys: remap_ngram_keys(keys, n, token_map), doc_map=prompt_map
+            )
+        self._verified_ngrams = {}
+        for n, sketch in self.ngram_sketches.items():
+            sketch.merge(other.ngram_sketches[n])
+
+        self.sentence_count += other.sentence_count
+        self.metric_word_count += other.metric_word_count
+        self.syllable_count += other.syllable_count
+        self.complex_word_count += other.complex_word_count
+
+        self.slop_word_count += other.slop_word_count
+        self.slop_word_hits += other.slop_word_hits
+        self.slop_bigram_hits += other.slop_bigram_hits
+        self.slop_trigram_hits += other.slop_trigram_hits
+
+        self.text_complexity.extend(other.text_complexity)
+        self.text_slop.extend(other.text_slop)
+        return self
+
+    def words_in_min_prompts(self, min_prompt_ids: int) -> Set[str]:
+        """Words that appear in at least min_prompt_ids distinct prompts."""
+        word_ids, prompt_counts = self.word_prompts.counts()
+        return set(self.word_vocab.decode(word_ids[prompt_counts >= min_prompt_ids].tolist()))
+
+    def _verify_ngram_prompts(self, candidates: Dict[int, np.ndarray]) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Second pass of two-pass mode: re-reads the texts from text_source and
+        tokenizes each one again (n-gram tokens only, see tokenize_ngrams),
+        counting prompts only for the candidate keys of each n. Tokens missing from
+        token_vocab (the source changed since counting) are looked up without being
+        interned, and the n-grams that contain them are skipped.
+        Returns {n: (prompt_counts, keys)}, with keys sorted.
+        """
+        if self.text_source is None:
+            raise ValueError("Two-pass n-gram selection needs text_source to re-read the texts.")
+        candidates = {n: np.sort(keys) for n, keys in candidates.items()}
+        doc_freqs = {n: DocumentFrequency(grouped=self.prompts_grouped) for n in candidates}
+        chunk_keys = {n: [] for n in candidates}
+        chunk_prompts = {n: [] for n in candidates}
+        chunk_size = 0
+
+        def flush():
+            for n, doc_freq in doc_freqs.items():
+                if not chunk_keys[n]:
+                    continue
+                keys = np.concatenate(chunk_keys[n])
+                prompts = np.concatenate(chunk_prompts[n])
+                hits = np.isin(keys, candidates[n])
+                doc_freq.add_pairs(keys[hits], prompts[hits])
+                chunk_keys[n], chunk_prompts[n] = [], []
+
+        stop_words = get_stop_words()
+        texts_read = 0
+        # Only the first num_texts texts went into this state, even if the source has grown since
+        for text, prompt_id in islice(self.text_source(), self.num_texts):
+            texts_read += 1
+            token_ids = self.token_vocab.lookup(tokenize_ngrams(text, stop_words))
+            prompt = self.prompt_vocab.get(prompt_id)
+            for n in candidates:
+                keys = pack_known_ngrams(token_ids, n)
+                if not len(keys):
+                    continue
+                chunk_keys[n].append(keys)
+                chunk_prompts[n].append(np.full(len(keys), prompt, dtype=np.int32))
+                chunk_size += len(keys)
+            if chunk_size >= (1 << 20):
+                flush()
+                chunk_size = 0
+        flush()
+        if texts_read != self.num_texts:
+            logger.warning(f"Two-pass verification re-read {texts_read} texts, expected {self.num_texts}; prompt counts may be off.")
+        return {n: (doc_freqs[n].get(keys), keys) for n, keys in candidates.items()}
+
+    def _verified_candidates(self, top_k: int, min_prompt_ids: int) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Two-pass mode: {n: (keys, counts)} of the n-grams seen in >= min_prompt_ids
+        prompts among those that can make the top_k. Candidates are the
+        highest-count n-grams (ties at the cutoff included); every size is verified
+        in the same re-read, and a size with fewer than top_k passing candidates is
+        re-verified with a larger candidate set. Every non-candidate has a strictly
+        lower count than every candidate, so the reported top_k is exact.
+        """
+        cache_key = (top_k, min_prompt_ids)
+        if cache_key in self._verified_ngrams:
+            return self._verified_ngrams[cache_key]
+
+        pending = {}
+        for n in self.NGRAM_SIZES:
+            keys, counts = self.ngram_counts[n].items()
+            # An n-gram can't appear in more prompts than its count
+            floor = counts >= min_prompt_ids
+            pending[n] = (keys[floor], counts[floor], max(top_k, 1) * config.NGRAM_CANDIDATE_FACTOR)
+        verified = {}
+        while pending:
+            candidates = {n: _top_n_candidates(counts, budget) for n, (_, counts, budget) in pending.items()}
+            results = self._verify_ngram_prompts({n: pending[n][0][candidates[n]] for n in pending})
+            for n, (prompt_counts, sorted_keys) in results.items():
+                keys, counts, budget = pending.pop(n)
+                eligible = prompt_counts >= min_prompt_ids
+                if np.count_nonzero(eligible) < top_k and len(candidates[n]) < len(keys):
+                    pending[n] = (keys, counts, budget * 4)
+                    continue
+                logger.debug(f"Two-pass {n}-grams: verified {len(candidates[n])} of {len(keys)} candidates.")
+                # keys are sorted, so the sorted candidate keys line up with counts via searchsorted
+                verified[n] = (sorted_keys[eligible], counts[np.searchsorted(keys, sorted_keys[eligible])])
+        self._verified_ngrams[cache_key] = verified
+        return verified
+
+    def _eligible_ngrams(self, n: int, top_k: int, min_prompt_ids: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (keys, counts) of n-grams seen in >= min_prompt_ids prompts, restricted in
+        two-pass mode to those that can make the top_k (see _verified_candidates).
+        """
+        if self.two_pass_ngrams:
+            return self._verified_candidates(top_k, min_prompt_ids)[n]
+        keys, counts = self.ngram_counts[n].items()
+        eligible = self.ngram_prompts[n].get(keys) >= min_prompt_ids
+        return keys[eligible], counts[eligible]
+
+    def top_ngrams(self, n: int, top_k: int, min_prompt_ids: int) -> List[Dict[str, Union[str, int]]]:
+        """
+        Top_k n-grams (appearing in >= min_prompt_ids prompts) by frequency, formatted as
+        in select_top_ngrams. Only the surviving keys are decoded back to strings.
+        In approximate mode, frequencies and prompt counts are sketch estimates.
+        """
+        if self.approximate_ngrams:
+            return [
+                {"ngram": " ".join(ngram_tuple), "frequency": count}
+                for ngram_tuple, count in self.ngram_sketches[n].top(top_k, min_prompt_ids)
+            ]
+
+        keys, counts = self._eligible_ngrams(n, top_k, min_prompt_ids)
+        if not len(keys):
+            logger.debug(f"No {n}-grams found meeting the minimum prompt ID criterion ({min_prompt_ids}).")
+            return []
+
+        candidates = _top_n_candidates(counts, top_k)
+        decoded = [tuple(self.token_vocab.decode(row)) for row in unpack_ngrams(keys[candidates], n).tolist()]
+        candidate_counts = counts[candidates].tolist()
+        ranked = sorted(zip(decoded, candidate_counts), key=lambda item: (-item[1], item[0]))
+
+        formatted_output = [
+            {"ngram": " ".join(ngram_tuple), "frequency": count}
+            for ngram_tuple, count in ranked[:top_k]
+        ]
+        logger.debug(f"Found {len(formatted_output)} top {n}-grams meeting criteria.")
+        return formatted_output
+
+    def ngram_error_bounds(self) -> Dict[str, Dict[str, float]]:
+        """Approximate mode: error bounds of the bigram/trigram sketches, keyed like the results."""
+        names = {2: "top_bigrams", 3: "top_trigrams"}
+        return {names[n]: sketch.error_bounds() for n, sketch in self.ngram_sketches.items()}
+
+    def complexity_index(self) -> float:
+        from .metrics import complexity_from_counts
+        if self.metric_word_count == 0:
+            return 0.0
+        return complexity_from_counts(
+            self.sentence_count, self.metric_word_count, self.syllable_count, self.complex_word_count
+        )
+
+    def slop_index(self) -> float:
+        from .metrics import slop_index_from_hits, slop_lists_loaded
+        if not slop_lists_loaded():
+            logger.warning("No slop lists loaded. Returning slop index 0.")
+            return 0.0
+        return slop_index_from_hits(
+            self.slop_word_hits, self.slop_bigram_hits, self.slop_trigram_hits, self.slop_word_count
+        )
+
+
+def _analyze_shard(
+    texts_with_ids: List[Tuple[str, str]],
+    two_pass_ngrams: bool = config.NGRAM_TWO_PASS,
+    approximate_ngrams: bool = config.APPROX_NGRAM_COUNTS,
+    perf: Optional[PerfRecorder] = None,
+    per_text_metrics: bool = config.PER_TEXT_METRICS,
+    prompts_grouped: bool = True
+) -> AnalysisState:
+    """Worker function for parallel analysis: builds the partial state of one shard."""
+    state = AnalysisState(
+        two_pass_ngrams=two_pass_ngrams, approximate_ngrams=approximate_ngrams, perf=perf,
+        per_text_metrics=per_text_metrics, prompts_grouped=prompts_grouped
+    )
+    for text, prompt_id in texts_with_ids:
+        state.add_text(text, prompt_id)
+    return state
+
+
+def _iter_batches(items: Iterable[Any], batch_size: int) -> Iterator[List[Any]]:
+    """Yields consecutive lists of up to batch_size items without materializing the input."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def prompts_are_grouped(texts_with_ids: Iterable[Tuple[str, str]]) -> bool:
+    """Whether the texts of each prompt are contiguous in texts_with_ids."""
+    seen = set()
+    previous = None
+    for _, prompt_id in texts_with_ids:
+        if prompt_id != previous:
+            if prompt_id in seen:
+                return False
+            seen.add(prompt_id)
+            previous = prompt_id
+    return True
+
+
+def build_analysis_state(
+    texts_with_ids: Iterable[Tuple[str, str]],
+    num_workers: int = 1,
+    batch_size: Optional[int] = None,
+    two_pass_ngrams: bool = config.NGRAM_TWO_PASS,
+    approximate_ngrams: bool = config.APPROX_NGRAM_COUNTS,
+    perf: Optional[PerfRecorder] = None,
+    per_text_metrics: bool = config.PER_TEXT_METRICS,
+    prompts_grouped: Optional[bool] = None
+) -> AnalysisState:
+    """
+    Accumulates AnalysisState over (text, prompt_id) pairs.
+    texts_with_ids may be any iterable (e.g. a generator over a JSONL file); it is
+    consumed once and never materialized.
+    With num_workers > 1 the texts are split into contiguous batches that are
+    analyzed in a process pool and merged in order, giving the same state as
+    the serial path. At most 2 * num_workers batches are in flight at a time.
+    prompts_grouped is passed to AnalysisState; None checks a list or tuple
+    with prompts_are_grouped and assumes any other iterable is not grouped.
+    """
+    if prompts_grouped is None:
+        prompts_grouped = isinstance(texts_with_ids, Sequence) and prompts_are_grouped(texts_with_ids)
+    num_workers = max(1, min(num_workers, os.cpu_count() or 1))
+    if num_workers == 1:
+        return _analyze_shard(texts_with_ids, two_pass_ngrams, approximate_ngrams, perf, per_text_metrics, prompts_grouped)
+
+    if batch_size is None:
+        if hasattr(texts_with_ids, "__len__"):
+            # A few batches per worker keeps the pool balanced without merging too many partial states
+            batch_size = max(1, -(-len(texts_with_ids) // (num_workers * 4)))
+        else:
+            batch_size = config.ANALYSIS_BATCH_SIZE
+    logger.info(f"Analyzing texts in batches of {batch_size} across {num_workers} processes...")
+
+    state = AnalysisState(
+        two_pass_ngrams=two_pass_ngrams, approximate_ngrams=approximate_ngrams, perf=perf,
+        per_text_metrics=per_text_metrics, prompts_grouped=prompts_grouped
+    )
+    pending = deque()
+    with Pool(processes=num_workers) as p:
+        for batch in _iter_batches(texts_with_ids, batch_size):
+            shard_perf = perf.spawn() if perf is not None else None
+            pending.append(p.apply_async(
+                _analyze_shard, (batch, two_pass_ngrams, approximate_ngrams, shard_perf, per_text_metrics, prompts_grouped)
+            ))
+            if len(pending) >= 2 * num_workers:
+                # Merge the oldest batch first so partial states are folded in input order
+                state.merge(pending.popleft().get())
+        while pending:
+            state.merge(pending.popleft().get())
+    return state
+
+
 def analyze_texts(
     model_name: str,
-    texts_with_ids: List[Tuple[str, str]], # List of (text_content, prompt_id)
-    prompts_data: Dict[str, List[str]] # Dict of {prompt_id: [text1, text2]} for ngram analysis
+    texts_with_ids: Iterable[Tuple[str, str]], # (text_content, prompt_id) pairs; any iterable
+    prompts_data: Optional[Dict[str, List[str]]] = None, # Unused; n-grams are now counted from texts_with_ids. Kept for compatibility.
+    num_workers: int = config.ANALYSIS_NUM_WORKERS,
+    two_pass_ngrams: bool = config.NGRAM_TWO_PASS,
+    approximate_ngrams: bool = config.APPROX_NGRAM_COUNTS,
+    perf: Optional[PerfRecorder] = None,
+    word_counts_file: Optional[str] = None,
+    per_text_metrics: bool = config.PER_TEXT_METRICS,
+    prompts_grouped: Optional[bool] = None
 ) -> Dict[str, Any]:
     """
     Performs comprehensive analysis on a list of texts for a single model.
     Calculates metrics, finds repetitive words and n-grams.
+    Every text is normalized and tokenized once; all metrics share that pass.
+    num_workers > 1 shards the texts across processes (results are identical).
+    two_pass_ngrams verifies n-gram prompt coverage only for top-k candidates, re-reading
+    and re-tokenizing every text to do so (results are identical); it needs a list,
+    and falls back to single-pass, with a warning, for iterables that can only be
+    read once.
+    approximate_ngrams counts n-grams in fixed memory; the top n-grams become estimates
+    and their error bounds are stored under "ngram_approximation".
+    With perf, per-stage timings are recorded there and stored under "_perf".
+    With word_counts_file, the unfiltered word counts are also saved there (see save_word_counts).
+    per_text_metrics also stores the distribution of per-text complexity and slop
+    scores, computed in the workers alongside the pooled counts, under
+    "vocab_complexity_distribution" and "slop_score_distribution".
+    prompts_grouped says whether each prompt's texts are contiguous (see
+    AnalysisState); by default a list is checked and other iterables are assumed
+    not to be.
     """
     logger.info(f"Starting analysis for model: {model_name}")
+    if two_pass_ngrams and not approximate_ngrams and not isinstance(texts_with_ids, Sequence):
+        logger.warning("Two-pass n-gram selection re-reads the texts, which needs a list; tracking prompt coverage in one pass instead.")
+        two_pass_ngrams = False
+    with perf_stage(perf, "accumulate") as stage:
+        state = build_analysis_state(
+            texts_with_ids, num_workers=num_workers, two_pass_ngrams=two_pass_ngrams,
+            approximate_ngrams=approximate_ngrams, perf=perf, per_text_metrics=per_text_metrics,
+            prompts_grouped=prompts_grouped
+        )
+        if stage is not None:
+            stage.items = state.num_texts
+    state.text_source = lambda: texts_with_ids
+    results = _derive_results(model_name, state, perf, word_counts_file)
+    logger.info(f"Analysis complete for model: {model_name}")
+    return results
+
+
+def _derive_results(
+    model_name: str,
+    state: AnalysisState,
+    perf: Optional[PerfRecorder],
+    word_counts_file: Optional[str] = None,
+    max_items: int = -1
+) -> Dict[str, Any]:
+    with perf_stage(perf, "results"):
+        results = build_analysis_results(model_name, state)
+    if word_counts_file is not None:
+        save_word_counts(word_counts_file, state, max_items)
+    if perf is not None:
+        results["_perf"] = perf.as_dict()
+    return results
+
+
+# Per-model word count tables are stored next to the analysis file: slop_profile__X.json -> slop_profile__X.word_counts.npz
+WORD_COUNTS_SUFFIX = ".word_counts.npz"
+
+
+def word_counts_path(analysis_filename: str) -> str:
+    return f"{os.path.splitext(analysis_filename)[0]}{WORD_COUNTS_SUFFIX}"
+
+
+def save_word_counts(filename: str, state: AnalysisState, max_items: int = -1):
+    """
+    Saves the state's word counts, before any filtering, as a compressed table:
+    the words newline-joined into one UTF-8 byte array, plus their counts, in
+    first-seen order. create_slop_lists sums these tables instead of re-counting
+    the raw datasets. The minimum word length, number of texts and the max_items
+    the dataset was read with (-1: all or unknown) are stored alongside, so a table
+    from a different sample is not reused.
+    """
+    ids, counts = state.word_counter.items()
+    words = "\n".join(state.word_vocab.decode(ids.tolist())).encode("utf-8")
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    tmp_file = f"{filename}.tmp"
+    with open(tmp_file, 'wb') as f:
+        np.savez_compressed(
+            f, words=np.frombuffer(words, dtype=np.uint8), counts=counts,
+            min_length=np.int64(state.min_length), num_texts=np.int64(state.num_texts),
+            max_items=np.int64(max_items if max_items > 0 else -1)
+        )
+    os.replace(tmp_file, filename)
+    logger.debug(f"Saved {len(counts)} word counts to {filename}")
+
+
+def load_word_counts(
+    filename: str,
+    min_length: int = config.WORD_MIN_LENGTH,
+    num_texts: Optional[int] = None,
+    max_items: Optional[int] = None
+) -> Optional[TypingCounter[str]]:
+    """
+    Loads a table written by save_word_counts as a Counter, or returns None if it is
+    missing, unreadable, or was counted with a different minimum word length, or
+    (where given) from a different number of texts or a different max_items.
+    """
+    if not os.path.exists(filename):
+        return None
+    expected = {"min_length": min_length}
+    if num_texts is not None:
+        expected["num_texts"] = num_texts
+    if max_items is not None:
+        expected["max_items"] = max_items if max_items > 0 else -1
+    try:
+        with np.load(filename, allow_pickle=False) as table:
+            for field, value in expected.items():
+                saved = int(table[field]) if field in table.files else None
+                if saved != value:
+                    logger.info(f"Word counts in {filename} have {field} {saved}, not {value}; ignoring them.")
+                    return None
+            words = table["words"].tobytes().decode("utf-8")
+            counts = table["counts"].tolist()
+    except Exception as e:
+        logger.warning(f"Could not load word counts {filename}: {e}")
+        return None
+    return Counter(dict(zip(words.split("\n"), counts))) if counts else Counter()
+
+
+def iter_texts_with_ids(records: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (text, prompt_id) pairs from generated dataset records (as written by
+    dataset_generator), skipping records without a string 'output'.
+    """
+    for item in records:
+        text = item.get("output")
+        prompt_id = f"{item.get('source', 'unknown')}_{item.get('id', 'unknown')}" # Create unique prompt ID
+        if text and isinstance(text, str):
+            yield text, prompt_id
+
+
+# Bump when AnalysisState's layout changes so stale resume files are ignored
+RESUME_STATE_FORMAT = 5
+# Bytes at the start of the dataset hashed to detect a rewritten (not appended) file
+_RESUME_FINGERPRINT_BYTES = 65536
+
+
+def _dataset_fingerprint(filepath: str, length: int) -> str:
+    with open(filepath, 'rb') as f:
+        return hashlib.blake2b(f.read(min(length, _RESUME_FINGERPRINT_BYTES)), digest_size=16).hexdigest()
+
+
+def _resume_options(min_length: int, two_pass_ngrams: bool, approximate_ngrams: bool, per_text_metrics: bool) -> Dict[str, Any]:
+    """Settings baked into an AnalysisState; a saved state is only reused if they match."""
+    return {
+        "min_length": min_length,
+        "two_pass_ngrams": two_pass_ngrams and not approximate_ngrams,
+        "approximate_ngrams": approximate_ngrams,
+        "per_text_metrics": per_text_metrics,
+        "stopword_lang": config.STOPWORD_LANG,
+        "tokenizer_backend": config.TOKENIZER_BACKEND,
+    }
+
+
+def save_resume_state(state_file: str, filepath: str, offset: int, lines_read: int, state: AnalysisState):
+    """
+    Pickles state together with how far into filepath it has read, so a later
+    analyze_jsonl_file(..., state_file=...) only has to fold in appended records.
+    Written to a temporary file first so an interrupted run never leaves a truncated state.
+    """
+    payload = {
+        "format": RESUME_STATE_FORMAT,
+        "dataset": os.path.abspath(filepath),
+        "offset": offset,
+        "lines_read": lines_read,
+        "fingerprint": _dataset_fingerprint(filepath, offset),
+        "options": _resume_options(state.min_length, state.two_pass_ngrams, state.approximate_ngrams, state.per_text_metrics),
+        "state": state,
+    }
+    os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+    tmp_file = f"{state_file}.tmp"
+    # Timings belong to the run, not the saved state, and the text source is set again on load
+    perf, state.perf = state.perf, None
+    text_source, state.text_source = state.text_source, None
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        state.perf = perf
+        state.text_source = text_source
+    os.replace(tmp_file, state_file)
+    logger.debug(f"Saved resumable analysis state ({lines_read} lines, {offset} bytes) to {state_file}")
+
+
+def load_resume_state(state_file: str, filepath: str, options: Dict[str, Any]) -> Optional[Tuple[AnalysisState, int, int]]:
+    """
+    Returns (state, offset, lines_read) from a file written by save_resume_state, or None
+    if there is none or it cannot be resumed: different format or settings, or a dataset
+    that shrank or was rewritten since. State files are pickles; only load your own.
+    """
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Could not load analysis state {state_file}: {e}. Re-analyzing from scratch.")
+        return None
+
+    if payload.get("format") != RESUME_STATE_FORMAT or payload.get("options") != options:
+        logger.info(f"Analysis state {state_file} was built with different settings. Re-analyzing from scratch.")
+        return None
+    offset = payload["offset"]
+    if os.path.getsize(filepath) < offset or _dataset_fingerprint(filepath, offset) != payload["fingerprint"]:
+        logger.info(f"{filepath} changed other than by appending since {state_file} was saved. Re-analyzing from scratch.")
+        return None
+    return payload["state"], offset, payload["lines_read"]
+
+
+def analyze_jsonl_file(
+    model_name: str,
+    filepath: str,
+    max_items: int = config.ANALYSIS_MAX_ITEMS_PER_MODEL,
+    num_workers: int = config.ANALYSIS_NUM_WORKERS,
+    two_pass_ngrams: bool = config.NGRAM_TWO_PASS,
+    approximate_ngrams: bool = config.APPROX_NGRAM_COUNTS,
+    state_file: Optional[str] = None,
+    perf: Optional[PerfRecorder] = None,
+    word_counts_file: Optional[str] = None,
+    per_text_metrics: bool = config.PER_TEXT_METRICS
+) -> Dict[str, Any]:
+    """
+    Streaming variant of analyze_texts that reads (text, prompt_id) records
+    straight from a generated_*.jsonl file. Texts are tokenized as they are read
+    and then dropped, so peak memory is bounded by the vocabulary rather than
+    the corpus size.
+
+    Prompts are assumed to be grouped (see AnalysisState), as they are in the
+    generated datasets; if a prompt turns out to recur out of order, the file is
+    read again without that assumption.
+
+    With state_file, the accumulated state and the byte offset read up to are
+    saved there, and a later call folds only the lines appended since into the
+    saved state before re-deriving the results (identical to a full re-run).
+    In this mode an unterminated last line is left for the next run.
+    perf, word_counts_file and per_text_metrics work as in analyze_texts.
+    """
+    def accumulate(records: Iterable[Dict[str, Any]], prompts_grouped: bool, state_perf: Optional[PerfRecorder]) -> AnalysisState:
+        return build_analysis_state(
+            iter_texts_with_ids(records), num_workers=num_workers,
+            two_pass_ngrams=two_pass_ngrams, approximate_ngrams=approximate_ngrams, perf=state_perf,
+            per_text_metrics=per_text_metrics, prompts_grouped=prompts_grouped
+        )
+
+    def text_source() -> Iterator[Tuple[str, str]]:
+        # For the two-pass verify pass; the state only reads back as many texts as it holds
+        return iter_texts_with_ids(iter_jsonl_file(filepath))
+
+    def log_ungrouped():
+        logger.info(f"Prompts in {filepath} are not contiguous; re-reading it with order-independent prompt counts.")
+
+    if state_file is None:
+        logger.info(f"Starting streaming analysis for model: {model_name} ({filepath})")
+        with perf_stage(perf, "accumulate") as stage:
+            try:
+                state = accumulate(iter_jsonl_file(filepath, max_items=max_items), True, perf)
+            except UngroupedDocumentsError:
+                log_ungrouped()
+                state = accumulate(iter_jsonl_file(filepath, max_items=max_items), False, perf)
+            if stage is not None:
+                stage.items = state.num_texts
+        state.text_source = text_source
+        results = _derive_results(model_name, state, perf, word_counts_file, max_items)
+        logger.info(f"Analysis complete for model: {model_name}")
+        return results
+
+    options = _resume_options(config.WORD_MIN_LENGTH, two_pass_ngrams, approximate_ngrams, per_text_metrics)
+    resumed = load_resume_state(state_file, filepath, options)
+    previous_state, offset, lines_read = resumed if resumed else (None, 0, 0)
+    if previous_state is not None:
+        previous_state.perf = perf
+        logger.info(f"Resuming analysis for model: {model_name} from line {lines_read} (byte {offset}) of {filepath}")
+    else:
+        logger.info(f"Starting streaming analysis for model: {model_name} ({filepath})")
+
+    def read_from(start_offset: int, start_line: int) -> JsonlTailReader:
+        max_lines = max(max_items - start_line, 0) if max_items > 0 else -1
+        return JsonlTailReader(filepath, start_offset=start_offset, max_lines=max_lines)
+
+    reader = read_from(offset, lines_read)
+    prompts_grouped = previous_state.prompts_grouped if previous_state is not None else True
+    with perf_stage(perf, "accumulate") as stage:
+        try:
+            new_state = accumulate(reader, prompts_grouped, perf.spawn() if perf is not None and previous_state is not None else perf)
+            # Merge checks run before anything is folded in, so previous_state is intact if this raises
+            state = previous_state.merge(new_state) if previous_state is not None else new_state
+        except UngroupedDocumentsError:
+            if not prompts_grouped:
+                raise
+            log_ungrouped()
+            previous_state, offset, lines_read = None, 0, 0
+            reader = read_from(0, 0)
+            state = new_state = accumulate(reader, False, perf)
+        if stage is not None:
+            stage.items = new_state.num_texts
+    logger.info(f"Read {reader.lines_read} new lines ({new_state.num_texts} texts) for model: {model_name}")
+    state.text_source = text_source
+    if previous_state is None or reader.lines_read:
+        save_resume_state(state_file, filepath, reader.offset, lines_read + reader.lines_read, state)
+
+    results = _derive_results(model_name, state, perf, word_counts_file, max_items)
+    logger.info(f"Analysis complete for model: {model_name}")
+    return results
+
+
+def distribution_summary(values: List[float]) -> Dict[str, float]:
+    """Mean, median, 10th/90th percentiles and standard deviation of per-text scores."""
+    scores = np.asarray(values, dtype=np.float64)
+    p10, median, p90 = np.percentile(scores, [10, 50, 90])
+    return {
+        "mean": round(float(scores.mean()), 4),
+        "median": round(float(median), 4),
+        "p10": round(float(p10), 4),
+        "p90": round(float(p90), 4),
+        "std": round(float(scores.std()), 4),
+    }
+
+
+def build_analysis_results(model_name: str, state: AnalysisState) -> Dict[str, Any]:
+    """Derives the analysis results dict (as saved to slop_profile__*.json) from accumulated state."""
     analysis_results = {"model_name": model_name}
-    num_texts = len(texts_with_ids)
-    num_prompts = len(prompts_data)
+    perf = state.perf
+    num_texts = state.num_texts
+    num_prompts = state.num_prompts
     analysis_results["num_texts_analyzed"] = num_texts
     analysis_results["num_unique_prompts"] = num_prompts
 
@@ -294,70 +1156,67 @@ def analyze_texts(
         logger.warning(f"No texts provided for analysis of {model_name}. Returning empty results.")
         return analysis_results
 
-    all_texts_flat = [text for text, _ in texts_with_ids]
-    all_text_combined = "\n\n".join(all_texts_flat)
-
     # --- Calculate Basic Metrics ---
     logger.debug("Calculating basic metrics (length, complexity, slop)...")
-    total_chars = sum(len(text) for text in all_texts_flat)
-    analysis_results["avg_length"] = round(total_chars / num_texts, 2) if num_texts > 0 else 0.0
+    analysis_results["avg_length"] = round(state.total_chars / num_texts, 2)
 
-    # Import metrics functions here to avoid circular dependency at module level
-    from .metrics import calculate_complexity_index, calculate_slop_index_new # Use new slop index
     try:
-        analysis_results["vocab_complexity"] = calculate_complexity_index(all_text_combined)
+        analysis_results["vocab_complexity"] = state.complexity_index()
     except Exception as e:
         logger.error(f"Error calculating complexity for {model_name}: {e}", exc_info=True)
         analysis_results["vocab_complexity"] = "Error"
     try:
-        analysis_results["slop_score"] = calculate_slop_index_new(all_text_combined)
+        analysis_results["slop_score"] = state.slop_index()
     except Exception as e:
         logger.error(f"Error calculating slop score for {model_name}: {e}", exc_info=True)
         analysis_results["slop_score"] = "Error"
+    if state.per_text_metrics:
+        analysis_results["vocab_complexity_distribution"] = distribution_summary(state.text_complexity)
+        analysis_results["slop_score_distribution"] = distribution_summary(state.text_slop)
 
     # --- Word Frequency and Repetition Analysis ---
     logger.debug("Performing word frequency and repetition analysis...")
     # 1. Initial counts and filtering
-    raw_word_counts = get_word_counts(all_texts_flat)
-    filtered_numeric = filter_mostly_numeric(raw_word_counts)
-
-    # We merge all incidence of trailing 's with the base word, except for common contractions like "it's"
-    merged_possessive = merge_plural_possessive_s(filtered_numeric)
-
-
-    # 2. Multi-prompt filtering (if applicable)
-    if num_prompts >= config.WORD_MIN_PROMPT_IDS:
-        logger.debug(f"Filtering words by minimum prompt IDs ({config.WORD_MIN_PROMPT_IDS})...")
-        word_prompt_map = get_word_prompt_map(texts_with_ids)
-        words = {
-            word for word, prompt_ids in word_prompt_map.items()
-            if len(prompt_ids) >= config.WORD_MIN_PROMPT_IDS
-        }
-        filtered_multi_prompt = Counter({
-            word: count for word, count in merged_possessive.items()
-            if word in words
-        })
-        logger.debug(f"Kept {len(filtered_multi_prompt)} words appearing in >= {config.WORD_MIN_PROMPT_IDS} prompts.")
-    else:
-        logger.debug(f"Skipping multi-prompt word filtering (only {num_prompts} prompts found).")
-        filtered_multi_prompt = merged_possessive # Use all words if not enough prompts
+    with perf_stage(perf, "word_filtering", items=len(state.word_vocab)):
+        filtered_numeric = filter_mostly_numeric(state.word_counts)
+
+        # We merge all incidence of trailing 's with the base word, except for common contractions like "it's"
+        merged_possessive = merge_plural_possessive_s(filtered_numeric)
+
+
+        # 2. Multi-prompt filtering (if applicable)
+        if num_prompts >= config.WORD_MIN_PROMPT_IDS:
+            logger.debug(f"Filtering words by minimum prompt IDs ({config.WORD_MIN_PROMPT_IDS})...")
+            words = state.words_in_min_prompts(config.WORD_MIN_PROMPT_IDS)
+            filtered_multi_prompt = Counter({
+                word: count for word, count in merged_possessive.items()
+                if word in words
+            })
+            logger.debug(f"Kept {len(filtered_multi_prompt)} words appearing in >= {config.WORD_MIN_PROMPT_IDS} prompts.")
+        else:
+            logger.debug(f"Skipping multi-prompt word filtering (only {num_prompts} prompts found).")
+            filtered_multi_prompt = merged_possessive # Use all words if not enough prompts
 
-    # 3. Filter forbidden words and by minimum count
-    filtered_forbidden = filter_forbidden_words(filtered_multi_prompt)
-    final_word_counts = filter_by_minimum_count(filtered_forbidden, config.WORD_MIN_REPETITION_COUNT)
-    logger.debug(f"Final word count after all filters: {len(final_word_counts)}")
+        # 3. Filter forbidden words and by minimum count
+        filtered_forbidden = filter_forbidden_words(filtered_multi_prompt)
+        final_word_counts = filter_by_minimum_count(filtered_forbidden, config.WORD_MIN_REPETITION_COUNT)
+        logger.debug(f"Final word count after all filters: {len(final_word_counts)}")
 
     analysis_results["total_unique_words_after_filters"] = len(final_word_counts)
 
     # 4. Rarity analysis on final counts
     if final_word_counts:
-        corpus_freqs, wordfreq_freqs, avg_corp_rarity, avg_wf_rarity, corr = analyze_word_rarity(final_word_counts)
+        # Fetched up front (into the in-process cache) so lookup cost is reported apart from scoring
+        with perf_stage(perf, "wordfreq_lookup", items=len(final_word_counts)):
+            get_word_frequencies(final_word_counts)
+        with perf_stage(perf, "rarity_scoring", items=len(final_word_counts)):
+            corpus_freqs, wordfreq_freqs, avg_corp_rarity, avg_wf_rarity, corr = analyze_word_rarity(final_word_counts)
+            # 5. Find top over-represented words from the final filtered set
+            over_rep_words = find_over_represented_words(corpus_freqs, wordfreq_freqs, top_n=config.TOP_N_WORDS_REPETITION)
         analysis_results["avg_corpus_rarity"] = round(avg_corp_rarity, 4) if not np.isnan(avg_corp_rarity) else None
         analysis_results["avg_wordfreq_rarity"] = round(avg_wf_rarity, 4) if not np.isnan(avg_wf_rarity) else None
         analysis_results["rarity_correlation"] = round(corr, 4) if not np.isnan(corr) else None
 
-        # 5. Find top over-represented words from the final filtered set
-        over_rep_words = find_over_represented_words(corpus_freqs, wordfreq_freqs, top_n=config.TOP_N_WORDS_REPETITION)
         # Format for saving: list of dicts
         analysis_results["top_repetitive_words"] = [
             {"word": word, "score": score, "corpus_freq": cf, "wordfreq_freq": wf}
@@ -382,23 +1241,19 @@ def analyze_texts(
     # --- N-gram Analysis (Multi-prompt only) ---
     if num_prompts >= config.NGRAM_MIN_PROMPT_IDS:
         logger.debug("Performing multi-prompt N-gram analysis...")
-        try:
-            top_bigrams = get_ngrams(prompts_data, n=2, top_k=config.TOP_N_BIGRAMS, min_prompt_ids=config.NGRAM_MIN_PROMPT_IDS)
-            analysis_results["top_bigrams"] = top_bigrams
-        except Exception as e:
-            logger.error(f"Error calculating bigrams for {model_name}: {e}", exc_info=True)
-            analysis_results["top_bigrams"] = []
-
-        try:
-            top_trigrams = get_ngrams(prompts_data, n=3, top_k=config.TOP_N_TRIGRAMS, min_prompt_ids=config.NGRAM_MIN_PROMPT_IDS)
-            analysis_results["top_trigrams"] = top_trigrams
-        except Exception as e:
-            logger.error(f"Error calculating trigrams for {model_name}: {e}", exc_info=True)
-            analysis_results["top_trigrams"] = []
+        for n, key, top_k in ((2, "top_bigrams", config.TOP_N_BIGRAMS), (3, "top_trigrams", config.TOP_N_TRIGRAMS)):
+            try:
+                with perf_stage(perf, "ngram_selection", items=top_k):
+                    analysis_results[key] = state.top_ngrams(n, top_k=top_k, min_prompt_ids=config.NGRAM_MIN_PROMPT_IDS)
+            except Exception as e:
+                logger.error(f"Error calculating {n}-grams for {model_name}: {e}", exc_info=True)
+                analysis_results[key] = []
     else:
         logger.debug(f"Skipping multi-prompt N-gram analysis (only {num_prompts} prompts found).")
         analysis_results["top_bigrams"] = []
         analysis_results["top_trigrams"] = []
 
-    logger.info(f"Analysis complete for model: {model_name}")
+    if state.approximate_ngrams:
+        analysis_results["ngram_approximation"] = state.ngram_error_bounds()
+
     return analysis_results
@@ -19,6 +19,7 @@ ANALYSIS_OUTPUT_DIR = os.path.join(RESULTS_DIR, "analysis")
 SLOP_LIST_OUTPUT_DIR = os.path.join(RESULTS_DIR, "slop_lists")
 PHYLOGENY_OUTPUT_DIR = os.path.join(RESULTS_DIR, "phylogeny")
 PHYLOGENY_CHARTS_DIR = os.path.join(PHYLOGENY_OUTPUT_DIR, "charts")
+CACHE_DIR = os.path.join(RESULTS_DIR, "cache")
 
 # --- Output Files ---
 COMBINED_METRICS_FILE = os.path.join(RESULTS_DIR, "slop_profile_results.json") # Output of analysis script
@@ -49,6 +50,10 @@ TARGET_RECORDS_PER_MODEL = 1000 # Target number of records to generate per model
 # --- Analysis Settings ---
 # For slop list generation and repetition metrics
 ANALYSIS_MAX_ITEMS_PER_MODEL = 10000 # Max items to load from dataset for analysis
+ANALYSIS_NUM_WORKERS = 1 # Processes used by analyze_texts; >1 shards texts across a process pool
+ANALYSIS_BATCH_SIZE = 500 # Texts per worker batch when streaming texts of unknown length
+PER_TEXT_METRICS = False # Also store per-text complexity/slop distributions (mean, median, p10, p90, std) in the analysis JSON
+SLOP_SCORE_BATCH_SIZE = 256 # Texts per worker task in metrics.score_slop_batch
 WORD_MIN_LENGTH = 4 # Min length for word counting (unless it has an apostrophe)
 WORD_MIN_REPETITION_COUNT = 5 # Min times a word must appear overall to be considered repetitive
 WORD_MIN_PROMPT_IDS = 2 # Min unique prompts a word must appear in to be considered repetitive
@@ -56,8 +61,20 @@ NGRAM_MIN_PROMPT_IDS = 2 # Min unique prompts an N-gram must appear in
 TOP_N_WORDS_REPETITION = 1000 # How many top repetitive words to store in analysis file
 TOP_N_BIGRAMS = 200
 TOP_N_TRIGRAMS = 200
+NGRAM_TWO_PASS = False # Count n-grams first, then re-read and re-tokenize every text to check prompt coverage only for top candidates (less memory, same results, but a full extra tokenizing pass)
+NGRAM_CANDIDATE_FACTOR = 4 # Two-pass mode: initial candidates verified per reported n-gram
+APPROX_NGRAM_COUNTS = False # Fixed-memory approximate n-gram counting (Count-Min + Misra-Gries + HyperLogLog); for huge corpora
+SKETCH_TOPK_CAPACITY = 20000 # Approximate mode: candidate n-grams tracked per n (must exceed TOP_N_BIGRAMS/TRIGRAMS)
+SKETCH_CMS_WIDTH = 1 << 18 # Approximate mode: Count-Min counters per row (8 bytes each); overcount <= e/width * total
+SKETCH_CMS_DEPTH = 4 # Approximate mode: Count-Min rows; bound holds with probability 1 - e**-depth
+SKETCH_HLL_PRECISION = 6 # Approximate mode: 2**p HyperLogLog registers (bytes) per tracked n-gram for prompt counts
+SKETCH_BATCH_SIZE = 200000 # Approximate mode: n-gram occurrences buffered before folding into the sketch
 COMMON_WORD_THRESHOLD = 1.2e-5 # Wordfreq threshold to filter common words in slop lists
 STOPWORD_LANG = 'english'
+TOKENIZER_BACKEND = 'nltk' # 'nltk' or 'regex' (much faster; mirrors the NLTK 3.10.3 word rules but only approximates Punkt sentence splitting, see scripts/verify_tokenizer.py)
+SAVE_WORD_COUNTS = True # slop_profile.py saves per-model word count tables (*.word_counts.npz) that create_slop_lists sums instead of re-counting raw texts
+WORDFREQ_CACHE_FILE = os.path.join(CACHE_DIR, "wordfreq.sqlite") # Persistent wordfreq lookup cache; None disables it
+SYLLABLE_TABLE_FILE = os.path.join(CACHE_DIR, "syllables.npz") # cmudict compiled to {word: syllables}; built on first use (scripts/build_syllable_table.py); None disables it
 
 # --- Slop List Creation Settings ---
 SLOP_LIST_TOP_N_OVERREP = 1500 # Number of over-represented words for final slop list
@@ -105,12 +122,7 @@ def get_model_family(model_name):
     return "Other"
 
 # --- Ensure Output Directories Exist ---
-os.makedirs(DATASET_OUTPUT_DIR, exist_ok=True)
-os.makedirs(ANALYSIS_OUTPUT_DIR, exist_ok=True)
-os.makedirs(SLOP_LIST_OUTPUT_DIR, exist_ok=True)
-os.makedirs(PHYLOGENY_OUTPUT_DIR, exist_ok=True)
-os.makedirs(PHYLOGENY_CHARTS_DIR, exist_ok=True)
-
-# --- Validation ---
-if not OPENAI_API_KEY:
-    print("Warning: OPENAI_API_KEY not found in environment variables or .env file.")
\ No newline at end of file
+# Called by the scripts at startup; importing config touches no files.
+def ensure_output_dirs():
+    for directory in (DATASET_OUTPUT_DIR, ANALYSIS_OUTPUT_DIR, SLOP_LIST_OUTPUT_DIR, PHYLOGENY_OUTPUT_DIR, PHYLOGENY_CHARTS_DIR):
+        os.makedirs(directory, exist_ok=True)
\ No newline at end of file
@@ -7,7 +7,6 @@ import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Set, Tuple, Optional
 
-from datasets import load_dataset
 from tqdm import tqdm # Use standard tqdm here
 
 from . import config
@@ -36,6 +35,8 @@ def _load_processed_ids(output_filename: str) -> Set[Tuple[str, int]]:
 
 def load_and_prepare_prompts(output_filename: str) -> Tuple[List[Dict], Set[Tuple[str, int]]]:
     """Loads datasets and extracts prompts, handling resume logic."""
+    from datasets import load_dataset # Heavy; only needed when generating
+
     all_prompts = []
     processed_ids = _load_processed_ids(output_filename)
     total_loaded = 0
@@ -235,6 +236,8 @@ def generate_for_model(model_name: str, output_dir: str = config.DATASET_OUTPUT_
         max_workers: Number of worker threads to use
     """
     logger.info(f"Starting generation process for model: {model_name}")
+    if not config.OPENAI_API_KEY:
+        logger.warning("OPENAI_API_KEY not found in environment variables or .env file.")
     sanitized_model_name = sanitize_filename(model_name)
     output_filename = os.path.join(output_dir, f"generated_{sanitized_model_name}.jsonl")
 
@@ -1,41 +1,31 @@
-import nltk
-from nltk.corpus import cmudict
 import string
 import logging
 import json
 import re
 import os
-from typing import  Set
-
-# Attempt to load NLTK resources, warn if missing
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/cmudict')
-    pronunciation_dict = nltk.corpus.cmudict.dict()
-    NLTK_AVAILABLE = True
-except LookupError:
-    logging.warning("NLTK resources ('punkt', 'cmudict') not found. Complexity calculation will be basic.")
-    logging.warning("Run: nltk.download('punkt'); nltk.download('cmudict')")
-    pronunciation_dict = {}
-    NLTK_AVAILABLE = False
-except ImportError:
-     logging.warning("NLTK not installed. Complexity calculation will be basic.")
-     pronunciation_dict = {}
-     NLTK_AVAILABLE = False
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from . import config
+from .tokenization import word_tokenize, sentence_word_tokenize
+from .syllables import get_syllable_table
+from .slop_matcher import SlopMatcher
+from .utils import iter_jsonl_file
 
 logger = logging.getLogger(__name__)
 
 # --- Vocabulary Complexity ---
 
-# Load CMU Pronouncing Dictionary
-pronunciation_dict = cmudict.dict()
+# Raw tokens memoized by syllable_count; covers the working vocabulary of a corpus
+SYLLABLE_CACHE_SIZE = 1 << 17
 
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
 def syllable_count(word):
-    """Determine the number of syllables in a word."""
-    word = word.lower()
-    if word in pronunciation_dict:
-        return max([len([phoneme for phoneme in phonetic if phoneme[-1].isdigit()]) for phonetic in pronunciation_dict[word]])
-    return 1  # Assume one syllable if the word isn't found
+    """Determine the number of syllables in a word (CMU Pronouncing Dictionary, see syllables.py)."""
+    return get_syllable_table().get(word.lower(), 1)  # Assume one syllable if the word isn't found
 
 def is_polysyllabic(word):
     """Identify if a word is polysyllabic (i.e., has 3 or more syllables)."""
@@ -47,20 +37,26 @@ def calculate_complexity_index(text: str) -> float:
         return 0.0
 
     try:
-        sentences = nltk.sent_tokenize(text)
-        tokens = [word for word in nltk.word_tokenize(text) if word.isalnum()] # Keep only alphanumeric
+        sentence_count, tokens = sentence_word_tokenize(text)
+        tokens = [word for word in tokens if word.isalnum()] # Keep only alphanumeric
     except LookupError:
          logger.warning("NLTK 'punkt' tokenizer not found. Using basic splitting for complexity.")
-         sentences = [s for s in text.split('.') if s] # Very basic sentence split
+         sentence_count = len([s for s in text.split('.') if s]) # Very basic sentence split
          tokens = [w.strip(string.punctuation) for w in text.split() if w.strip(string.punctuation)]
 
-    sentence_count = max(1, len(sentences))
-    word_count = max(1, len(tokens))
+    return complexity_from_counts(
+        sentence_count=sentence_count,
+        word_count=len(tokens),
+        total_syllables=sum(syllable_count(token) for token in tokens),
+        complex_word_count=sum(1 for token in tokens if is_polysyllabic(token))
+    )
 
-    # Flesch-Kincaid Grade Level
-    total_syllables = sum(syllable_count(token) for token in tokens)
-    if word_count == 0: return 0.0 # Avoid division by zero
+def complexity_from_counts(sentence_count: int, word_count: int, total_syllables: int, complex_word_count: int) -> float:
+    """Complexity index (0-100) from pre-aggregated sentence, word and syllable counts."""
+    sentence_count = max(1, sentence_count)
+    word_count = max(1, word_count)
 
+    # Flesch-Kincaid Grade Level
     try:
         fk_grade_level = (0.39 * (word_count / sentence_count) +
                           11.8 * (total_syllables / word_count) - 15.59)
@@ -68,8 +64,7 @@ def calculate_complexity_index(text: str) -> float:
         fk_grade_level = 0.0
 
     # Percentage of complex words
-    complex_word_count = sum(1 for token in tokens if is_polysyllabic(token))
-    percent_complex_words = (complex_word_count / word_count) * 100 if word_count > 0 else 0
+    percent_complex_words = (complex_word_count / word_count) * 100
 
     # Normalize and combine (cap values)
     fk_capped = min(max(0, fk_grade_level), 14) # Cap between 0 and 14
@@ -84,18 +79,26 @@ def calculate_complexity_index(text: str) -> float:
 # Global cache for slop lists to avoid reloading repeatedly within a script run
 _slop_list_cache = {}
 
+SLOP_LIST_FILES = {
+    'word': 'data/slop_list.json',
+    'bigram': 'data/slop_list_bigrams.json',
+    'trigram': 'data/slop_list_trigrams.json',
+}
+# Tokens per item of each slop list; only items of exactly this length can match
+SLOP_LIST_NGRAM_SIZES = {'word': 1, 'bigram': 2, 'trigram': 3}
+# Matcher category for extra phrases of any length (e.g. slop_list_phrases.jsonl)
+PHRASE_CATEGORY = 'phrase'
+
+# Default matcher compiled from the slop lists, built on first use
+_slop_matcher: Optional[SlopMatcher] = None
+
 def _load_slop_list_to_set(list_type: str) -> Set[str]:
     """Loads a specific slop list (word, bigram, trigram) into a set, using cache."""
     global _slop_list_cache
     if list_type in _slop_list_cache:
         return _slop_list_cache[list_type]
 
-    filename_map = {
-        'word': 'data/slop_list.json',
-        'bigram': 'data/slop_list_bigrams.json',
-        'trigram': 'data/slop_list_trigrams.json',
-    }
-    filename = filename_map.get(list_type)
+    filename = SLOP_LIST_FILES.get(list_type)
     if not filename or not os.path.exists(filename):
         logger.warning(f"Slop file for type '{list_type}' not found at {filename}. Returning empty set.")
         _slop_list_cache[list_type] = set()
@@ -118,14 +121,75 @@ def _load_slop_list_to_set(list_type: str) -> Set[str]:
         _slop_list_cache[list_type] = set()
         return set()
 
-def calculate_slop_index_new(text: str, debug: bool = False) -> float:
-    """Calculates the 'new' slop index based on hits in word, bigram, and trigram lists."""
-    # 1. Load Slop Lists (uses cache)
-    slop_words_set = _load_slop_list_to_set('word')
-    slop_bigrams_set = _load_slop_list_to_set('bigram')
-    slop_trigrams_set = _load_slop_list_to_set('trigram')
+def slop_tokens(text: str) -> List[str]:
+    """Lowercased alphanumeric word tokens of text, as the slop index scores them."""
+    lower_text = text.lower()
+    try:
+        # Keep only alphanumeric tokens
+        return [token for token in word_tokenize(lower_text) if token.isalnum()]
+    except LookupError:
+        logger.warning("NLTK 'punkt' tokenizer not found. Using basic regex split for slop index.")
+        return re.findall(r'\b\w+\b', lower_text)
+
+def load_slop_phrases(filename: str) -> List[str]:
+    """Phrases from a slop_list_phrases.jsonl file (lines of [phrase, frequency])."""
+    return [
+        item[0] for item in iter_jsonl_file(filename)
+        if isinstance(item, list) and item and isinstance(item[0], str)
+    ]
+
+def build_slop_matcher(phrases: Iterable[str] = ()) -> SlopMatcher:
+    """
+    Compiles the word, bigram and trigram slop lists, plus any extra phrases
+    (tokenized like the scored text, see slop_tokens), into one SlopMatcher with
+    categories 'word', 'bigram', 'trigram' and 'phrase', in that order.
+    """
+    matcher = SlopMatcher(list(SLOP_LIST_NGRAM_SIZES) + [PHRASE_CATEGORY])
+    for list_type, size in SLOP_LIST_NGRAM_SIZES.items():
+        for item in _load_slop_list_to_set(list_type):
+            tokens = item.split(' ')
+            if len(tokens) == size and all(tokens):
+                matcher.add(tokens, list_type)
+    for phrase in phrases:
+        matcher.add(slop_tokens(phrase), PHRASE_CATEGORY)
+    return matcher
+
+def get_slop_matcher() -> SlopMatcher:
+    """The matcher for the default slop lists (see build_slop_matcher), compiled once."""
+    global _slop_matcher
+    if _slop_matcher is None:
+        _slop_matcher = build_slop_matcher()
+        logger.debug(f"Compiled {len(_slop_matcher)} slop list items (longest: {_slop_matcher.max_length} tokens)")
+    return _slop_matcher
+
+def count_slop_hits(tokens: List[str], matcher: Optional[SlopMatcher] = None) -> Tuple[int, int, int]:
+    """Counts (word, bigram, trigram) slop-list hits in a lowercased token sequence."""
+    word_hits, bigram_hits, trigram_hits = (matcher or get_slop_matcher()).count_hits(tokens)[:3]
+    return word_hits, bigram_hits, trigram_hits
+
+def slop_index_from_hits(word_hits: int, bigram_hits: int, trigram_hits: int, total_words: int, phrase_hits: int = 0) -> float:
+    """Slop index from pre-aggregated hit counts (weights: 1 for word, 2 for bigram, 8 for trigram or extra phrase)."""
+    # Weights are chosen based on the original snippet's implied logic, adjust if needed
+    total_slop_score = word_hits + (2 * bigram_hits) + (8 * trigram_hits) + (8 * phrase_hits)
+    slop_index = (total_slop_score / total_words) * 1000 if total_words > 0 else 0.0
+    return round(slop_index, 4)
 
-    if not slop_words_set and not slop_bigrams_set and not slop_trigrams_set:
+def slop_lists_loaded() -> bool:
+    """True if at least one of the word/bigram/trigram slop lists is non-empty."""
+    return bool(
+        _load_slop_list_to_set('word')
+        or _load_slop_list_to_set('bigram')
+        or _load_slop_list_to_set('trigram')
+    )
+
+def calculate_slop_index_new(text: str, debug: bool = False, matcher: Optional[SlopMatcher] = None) -> float:
+    """
+    Calculates the 'new' slop index based on hits in word, bigram, and trigram lists.
+    Pass a matcher from build_slop_matcher to also score extra phrases.
+    """
+    # 1. Load Slop Lists (uses cache)
+    matcher = matcher or get_slop_matcher()
+    if not len(matcher):
         logger.warning("No slop lists loaded. Returning slop index 0.")
         return 0.0
 
@@ -134,59 +198,109 @@ def calculate_slop_index_new(text: str, debug: bool = False) -> float:
         return 0.0
 
     # 2. Preprocess Text and Tokenize
-    lower_text = text.lower()
-    try:
-        # Keep only alphanumeric tokens
-        tokens = [token for token in nltk.word_tokenize(lower_text) if token.isalnum()]
-    except LookupError:
-        logger.warning("NLTK 'punkt' tokenizer not found. Using basic regex split for slop index.")
-        tokens = re.findall(r'\b\w+\b', lower_text)
+    tokens = slop_tokens(text)
 
     total_words = len(tokens)
     if total_words == 0:
         if debug: logger.debug("Slop Index New: No valid words found after tokenization.")
         return 0.0
 
-    # 3. Count Hits
-    word_hits = 0
-    bigram_hits = 0
-    trigram_hits = 0
-
-    if slop_words_set:
-        word_hits = sum(1 for token in tokens if token in slop_words_set)
-
-    if slop_bigrams_set and len(tokens) >= 2:
-        try:
-            text_bigrams = nltk.ngrams(tokens, 2)
-            for bigram_tuple in text_bigrams:
-                if ' '.join(bigram_tuple) in slop_bigrams_set:
-                    bigram_hits += 1
-        except Exception as e:
-             logger.warning(f"Error generating bigrams: {e}")
-
-
-    if slop_trigrams_set and len(tokens) >= 3:
-        try:
-            text_trigrams = nltk.ngrams(tokens, 3)
-            for trigram_tuple in text_trigrams:
-                if ' '.join(trigram_tuple) in slop_trigrams_set:
-                    trigram_hits += 1
-        except Exception as e:
-             logger.warning(f"Error generating trigrams: {e}")
-
-    # 4. Calculate Final Score (Weights: 1 for word, 2 for bigram, 8 for trigram)
-    # Weights are chosen based on the original snippet's implied logic, adjust if needed
-    total_slop_score = word_hits + (2 * bigram_hits) + (8 * trigram_hits)
-    slop_index = (total_slop_score / total_words) * 1000 if total_words > 0 else 0.0
+    # 3. Count Hits (one pass over the tokens for all lists)
+    word_hits, bigram_hits, trigram_hits, phrase_hits = matcher.count_hits(tokens)
+
+    # 4. Calculate Final Score
+    slop_index = slop_index_from_hits(word_hits, bigram_hits, trigram_hits, total_words, phrase_hits)
 
     if debug:
         logger.debug(f"--- Slop Index New Debug ---")
         logger.debug(f"Total Words Analyzed: {total_words}")
-        logger.debug(f"Word Hits: {word_hits} (using {len(slop_words_set)} slop words)")
-        logger.debug(f"Bigram Hits: {bigram_hits} (using {len(slop_bigrams_set)} slop bigrams)")
-        logger.debug(f"Trigram Hits: {trigram_hits} (using {len(slop_trigrams_set)} slop trigrams)")
-        logger.debug(f"Weighted Hit Score: {total_slop_score}")
+        logger.debug(f"Word Hits: {word_hits} (using {len(_load_slop_list_to_set('word'))} slop words)")
+        logger.debug(f"Bigram Hits: {bigram_hits} (using {len(_load_slop_list_to_set('bigram'))} slop bigrams)")
+        logger.debug(f"Trigram Hits: {trigram_hits} (using {len(_load_slop_list_to_set('trigram'))} slop trigrams)")
+        logger.debug(f"Phrase Hits: {phrase_hits}")
+        logger.debug(f"Weighted Hit Score: {word_hits + (2 * bigram_hits) + (8 * trigram_hits) + (8 * phrase_hits)}")
         logger.debug(f"Calculated Slop Index: {slop_index:.4f}")
         logger.debug("------------------------")
 
-    return round(slop_index, 4)
+    return slop_index
+
+# --- Batch Slop Scoring ---
+
+# Per-text counts returned by score_slop_batch, in matcher category order plus the token count
+SLOP_SCORE_FIELDS = ("word_hits", "bigram_hits", "trigram_hits", "phrase_hits", "total_words")
+# Weights of the hit fields in the slop index (see slop_index_from_hits)
+_SLOP_HIT_WEIGHTS = np.array([1, 2, 8, 8], dtype=np.int64)
+
+# Matcher of a score_slop_batch worker process, set by _init_slop_worker
+_worker_slop_matcher: Optional[SlopMatcher] = None
+
+def _init_slop_worker(matcher: SlopMatcher):
+    global _worker_slop_matcher
+    _worker_slop_matcher = matcher
+
+def _score_slop_texts(texts: Sequence[str], matcher: Optional[SlopMatcher] = None) -> np.ndarray:
+    """(len(texts), len(SLOP_SCORE_FIELDS)) int64 counts, tokenizing each text like calculate_slop_index_new."""
+    matcher = matcher or _worker_slop_matcher
+    counts = np.zeros((len(texts), len(SLOP_SCORE_FIELDS)), dtype=np.int64)
+    for row, text in enumerate(texts):
+        if not text or not isinstance(text, str) or not text.strip():
+            continue
+        tokens = slop_tokens(text)
+        if tokens:
+            counts[row, :4] = matcher.count_hits(tokens)[:4]
+            counts[row, 4] = len(tokens)
+    return counts
+
+def score_slop_batch(
+    texts: Iterable[str],
+    matcher: Optional[SlopMatcher] = None,
+    num_workers: int = 1,
+    batch_size: int = config.SLOP_SCORE_BATCH_SIZE,
+    percentiles: Sequence[float] = (10, 25, 50, 75, 90)
+) -> Dict[str, Any]:
+    """
+    Slop index of every text at once. Returns one numpy array per field of
+    SLOP_SCORE_FIELDS plus "slop_index", each with one entry per text in input
+    order; per-text indices equal calculate_slop_index_new(text, matcher=matcher).
+    "corpus" holds the aggregates: the pooled index over all tokens (as
+    analyze_texts reports it), the summed counts, and the mean, standard
+    deviation and percentiles of the per-text indices.
+    num_workers > 1 scores batches of batch_size texts in a process pool.
+    """
+    texts = list(texts)
+    matcher = matcher or get_slop_matcher()
+    if not len(matcher):
+        logger.warning("No slop lists loaded. Returning slop index 0.")
+        counts = np.zeros((len(texts), len(SLOP_SCORE_FIELDS)), dtype=np.int64)
+    else:
+        num_workers = max(1, min(num_workers, os.cpu_count() or 1, -(-len(texts) // batch_size)))
+        if num_workers == 1:
+            counts = _score_slop_texts(texts, matcher)
+        else:
+            batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+            with Pool(processes=num_workers, initializer=_init_slop_worker, initargs=(matcher,)) as pool:
+                counts = np.concatenate(pool.map(_score_slop_texts, batches))
+
+    total_words = counts[:, 4]
+    weighted_hits = counts[:, :4] @ _SLOP_HIT_WEIGHTS
+    slop_index = np.round(
+        np.divide(weighted_hits * 1000.0, total_words, out=np.zeros(len(texts)), where=total_words > 0), 4
+    )
+
+    totals = counts.sum(axis=0).tolist()
+    word_hits, bigram_hits, trigram_hits, phrase_hits, all_words = totals
+    corpus = dict(zip(SLOP_SCORE_FIELDS, totals))
+    corpus["num_texts"] = len(texts)
+    corpus["slop_index"] = slop_index_from_hits(word_hits, bigram_hits, trigram_hits, all_words, phrase_hits)
+    if len(texts):
+        corpus["mean"] = round(float(slop_index.mean()), 4)
+        corpus["std"] = round(float(slop_index.std()), 4)
+        corpus["percentiles"] = {
+            f"p{p:g}": round(float(value), 4) for p, value in zip(percentiles, np.percentile(slop_index, percentiles))
+        }
+
+    result: Dict[str, Any] = {field: counts[:, i] for i, field in enumerate(SLOP_SCORE_FIELDS)}
+    result["slop_index"] = slop_index
+    result["corpus"] = corpus
+    return result
+
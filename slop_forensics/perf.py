@@ -0,0 +1,141 @@
+import time
+import logging
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Called with (stage_name, stats_of_this_call) every time a stage finishes
+PerfCallback = Callable[[str, Dict[str, Any]], None]
+
+_NULL_STAGE = nullcontext()
+
+
+class StageStats:
+    """Accumulated cost of one named stage over all of its calls."""
+
+    __slots__ = ("calls", "items", "wall", "cpu", "peak_traced_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_traced_bytes = 0
+
+    def add(self, other: "StageStats"):
+        self.calls += other.calls
+        self.items += other.items
+        self.wall += other.wall
+        self.cpu += other.cpu
+        self.peak_traced_bytes = max(self.peak_traced_bytes, other.peak_traced_bytes)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StageStats":
+        """Inverse of as_dict (times are rounded)."""
+        stats = cls()
+        stats.calls = data["calls"]
+        stats.items = data["items"]
+        stats.wall = data["wall_s"]
+        stats.cpu = data["cpu_s"]
+        stats.peak_traced_bytes = data["peak_traced_bytes"]
+        return stats
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "wall_s": round(self.wall, 4),
+            "cpu_s": round(self.cpu, 4),
+            "peak_traced_bytes": self.peak_traced_bytes,
+        }
+
+
+class PerfRecorder:
+    """
+    Per-stage wall time, CPU time, item counts and (with trace_memory=True) peak
+    traced memory, collected with `with recorder.stage("name", items=n): ...`.
+
+    Peak memory comes from tracemalloc, which is started on first use and slows
+    allocation-heavy code noticeably; it is the highest traced memory (in bytes,
+    including what was allocated before the stage) seen while the stage ran.
+    CPU time is process time, so nested stages also count towards their parent.
+    Recorders from worker processes are folded in with merge: times and counts
+    add up (so they can exceed wall-clock time), peaks take the maximum.
+
+    callbacks are called after every finished stage in the process that ran it;
+    they are not pickled, so recorders sent to worker processes have none.
+    """
+
+    def __init__(self, trace_memory: bool = False, callbacks: Optional[List[PerfCallback]] = None):
+        self.trace_memory = trace_memory
+        self.callbacks: List[PerfCallback] = list(callbacks or [])
+        self.stages: Dict[str, StageStats] = {}
+        self._peak_stack: List[int] = []
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["callbacks"] = []
+        state["_peak_stack"] = []
+        return state
+
+    def spawn(self) -> "PerfRecorder":
+        """An empty recorder with the same settings, e.g. for a worker process."""
+        return PerfRecorder(trace_memory=self.trace_memory)
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0) -> Iterator[StageStats]:
+        """Times the with-block; the yielded stats' items may be set inside it if unknown up front."""
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self._peak_stack.append(0)
+            tracemalloc.reset_peak()
+        call = StageStats()
+        call.calls = 1
+        call.items = items
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield call
+        finally:
+            call.wall = time.perf_counter() - start_wall
+            call.cpu = time.process_time() - start_cpu
+            if self.trace_memory:
+                # reset_peak in nested stages hides their peaks from us, so they report them upwards
+                call.peak_traced_bytes = max(tracemalloc.get_traced_memory()[1], self._peak_stack.pop())
+                if self._peak_stack:
+                    self._peak_stack[-1] = max(self._peak_stack[-1], call.peak_traced_bytes)
+            self.stages.setdefault(name, StageStats()).add(call)
+            for callback in self.callbacks:
+                callback(name, call.as_dict())
+
+    def merge(self, other: Optional["PerfRecorder"]):
+        if other is None:
+            return
+        for name, stats in other.stages.items():
+            self.stages.setdefault(name, StageStats()).add(stats)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Stage stats in first-recorded order, as stored under the analysis JSON's _perf key."""
+        return {
+            "trace_memory": self.trace_memory,
+            "stages": {name: stats.as_dict() for name, stats in self.stages.items()},
+        }
+
+
+def perf_stage(recorder: Optional[PerfRecorder], name: str, items: int = 0):
+    """recorder.stage(name, items), or a no-op context when recorder is None."""
+    return recorder.stage(name, items) if recorder is not None else _NULL_STAGE
+
+
+def format_perf_summary(perf: Dict[str, Any]) -> str:
+    """One line per stage from a _perf dict, for logs."""
+    lines = []
+    for name, stats in perf.get("stages", {}).items():
+        line = f"{name:<18} wall {stats['wall_s']:>9.3f}s  cpu {stats['cpu_s']:>9.3f}s  items {stats['items']:>10}"
+        if perf.get("trace_memory"):
+            line += f"  peak {stats['peak_traced_bytes'] / 2**20:>8.1f} MiB"
+        lines.append(line)
+    return "\n".join(lines)
@@ -4,22 +4,22 @@ import subprocess
 import tempfile
 import shutil
 import logging
-from typing import Dict, Optional, List, Tuple, Set
+from typing import Dict, Optional, List, Tuple, Set, TYPE_CHECKING
 
 import os
 # set this env var so we can render images without a screen
 os.environ["QT_QPA_PLATFORM"] = "offscreen"
 
-import pandas as pd
-from scipy.spatial.distance import pdist, squareform
-from scipy.cluster.hierarchy import linkage, to_tree
-from ete3 import Tree, TreeStyle, NodeStyle, TextFace, faces
+# pandas, scipy and ete3 (which loads PyQt) are imported inside the functions that use them
 import numpy as np
 from tqdm import tqdm
 
 from . import config
 from .utils import load_json_file, save_json_file, sanitize_filename
 
+if TYPE_CHECKING:
+    from ete3 import Tree
+
 logger = logging.getLogger(__name__)
 
 # --- Helper Functions ---
@@ -30,6 +30,7 @@ def _get_updated_model_name(original: str) -> str:
 
 def _layout_fn_with_highlight(node, focus_model_name: Optional[str] = None, highlight_color: str = "#FF0000"):
     """ETE3 layout function for coloring nodes by family and highlighting."""
+    from ete3 import NodeStyle, TextFace, faces
     if not node.is_leaf():
         # Internal node style
         style = NodeStyle(size=0, hz_line_width=1, vt_line_width=1) # Thinner lines
@@ -60,8 +61,9 @@ def _layout_fn_with_highlight(node, focus_model_name: Optional[str] = None, high
     node.set_style(style)
 
 
-def _render_ete_tree_focus(ete_tree: Tree, focus_model_name: str, output_image: str, layout: str = "c"):
+def _render_ete_tree_focus(ete_tree: "Tree", focus_model_name: str, output_image: str, layout: str = "c"):
     """Renders ETE3 tree with highlighting."""
+    from ete3 import TreeStyle
     ts = TreeStyle()
     ts.mode = layout
     ts.show_leaf_name = False # Labels are added by layout function
@@ -142,8 +144,9 @@ def _build_parsimony_tree(
     charts_dir: str = config.PHYLOGENY_CHARTS_DIR,
     phylip_path: Optional[str] = config.PHYLIP_PATH,
     run_consense: bool = config.PHYLO_RUN_CONSENSE
-) -> Optional[Tree]:
+) -> Optional["Tree"]:
     """Attempts to build a tree using PHYLIP parsimony."""
+    from ete3 import Tree
     logger.info("Attempting parsimony tree construction using PHYLIP...")
 
     all_models = sorted(model_features.keys())
@@ -315,8 +318,12 @@ def _build_hierarchical_tree(
     model_features: Dict[str, Set[str]],
     output_dir: str = config.PHYLOGENY_OUTPUT_DIR,
     charts_dir: str = config.PHYLOGENY_CHARTS_DIR
-) -> Optional[Tree]:
+) -> Optional["Tree"]:
     """Builds a tree using hierarchical clustering as a fallback."""
+    import pandas as pd
+    from scipy.spatial.distance import pdist
+    from scipy.cluster.hierarchy import linkage, to_tree
+    from ete3 import Tree
     logger.info("Building tree using fallback hierarchical clustering (SciPy)...")
 
     all_models = sorted(model_features.keys())
@@ -496,6 +503,7 @@ def generate_phylogenetic_trees(
 
         # Save basic tree overview
         basic_tree_path = os.path.join(output_dir, f"{tree_type}_tree_basic.png")
+        from ete3 import TreeStyle
         ts_basic = TreeStyle()
         ts_basic.mode = "r"
         ts_basic.show_leaf_name = False
@@ -0,0 +1,384 @@
+import hashlib
+import logging
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_U64 = np.uint64
+_GOLDEN = _U64(0x9E3779B97F4A7C15)
+
+
+# --- Hashing ---
+
+def hash_strings(strings: Iterable[str]) -> np.ndarray:
+    """Stable 64-bit hashes of strings (same value in every process and run)."""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'little') for s in strings),
+        dtype=np.uint64
+    )
+
+
+def mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer: spreads the bits of 64-bit keys."""
+    x = np.asarray(x, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        x = (x ^ (x >> _U64(30))) * _U64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> _U64(27))) * _U64(0x94D049BB133111EB)
+    return x ^ (x >> _U64(31))
+
+
+def combine_window_hashes(token_hashes: np.ndarray, n: int) -> np.ndarray:
+    """One 64-bit key per length-n window of a sequence of token hashes."""
+    num_windows = len(token_hashes) - n + 1
+    if num_windows <= 0:
+        return np.empty(0, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        keys = token_hashes[:num_windows].copy()
+        for offset in range(1, n):
+            keys = keys * _GOLDEN + token_hashes[offset:offset + num_windows]
+    return mix64(keys)
+
+
+# --- Count-Min Sketch ---
+
+class CountMinSketch:
+    """
+    Count-Min sketch over uint64 keys. Estimates never undercount; with probability
+    1 - delta they overcount by at most epsilon * total, where epsilon = e / width
+    and delta = e ** -depth.
+    """
+
+    def __init__(self, width: int, depth: int, seed: int = 0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.total = 0
+        self._table = np.zeros((depth, width), dtype=np.int64)
+        rng = np.random.default_rng(seed)
+        self._multipliers = rng.integers(1, 2**63, size=depth, dtype=np.uint64) | _U64(1)
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _rows(self, keys: np.ndarray) -> np.ndarray:
+        with np.errstate(over='ignore'):
+            hashed = keys[None, :] * self._multipliers[:, None]
+        return ((hashed >> _U64(32)) % _U64(self.width)).astype(np.int64)
+
+    def add(self, keys: np.ndarray, counts: np.ndarray):
+        if not len(keys):
+            return
+        columns = self._rows(keys)
+        for row in range(self.depth):
+            np.add.at(self._table[row], columns[row], counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        if not len(keys):
+            return np.empty(0, dtype=np.int64)
+        columns = self._rows(keys)
+        return self._table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def merge(self, other: "CountMinSketch"):
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("Cannot merge Count-Min sketches with different parameters.")
+        self._table += other._table
+        self.total += other.total
+
+
+# --- HyperLogLog helpers (registers are stored per tracked key) ---
+
+def _hll_positions(doc_hashes: np.ndarray, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(register index, rank) for each hash; rank uses the 32 bits above the index."""
+    doc_hashes = mix64(doc_hashes)
+    index = (doc_hashes & _U64((1 << precision) - 1)).astype(np.int64)
+    remaining = ((doc_hashes >> _U64(precision)) & _U64(0xFFFFFFFF)).astype(np.float64)
+    _, bit_length = np.frexp(remaining)
+    return index, (33 - bit_length).astype(np.uint8)
+
+
+def hll_estimate(registers: np.ndarray) -> np.ndarray:
+    """HyperLogLog cardinality estimate for each row of a (rows, 2**p) register matrix."""
+    num_registers = registers.shape[1]
+    if num_registers >= 128:
+        alpha = 0.7213 / (1 + 1.079 / num_registers)
+    else:
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(num_registers, 0.7213 / (1 + 1.079 / num_registers))
+    raw = alpha * num_registers ** 2 / np.power(2.0, -registers.astype(np.float64)).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    # Small-range correction (linear counting)
+    with np.errstate(divide='ignore'):
+        linear = num_registers * np.log(num_registers / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * num_registers) & (zeros > 0), linear, raw)
+
+
+# --- Heavy hitters ---
+
+class HeavyHitters:
+    """
+    Fixed-memory top-k tracker for a stream of uint64 keys:
+      - Misra-Gries summary (capacity counters) picks the candidate heavy hitters;
+        its counts undercount by at most `undercount_bound` (<= total / (capacity + 1)).
+      - Count-Min sketch supplies the reported frequencies (see CountMinSketch).
+      - Optionally, a HyperLogLog per tracked key estimates how many distinct
+        documents (prompts) it appears in. Registers only see documents after the
+        key was last admitted to the summary, so late arrivals are undercounted:
+        each key also records its admission offset, the Count-Min estimate of its
+        occurrences before admission, which bounds the documents it can have missed.
+    Summaries with the same parameters merge exactly as Misra-Gries/CMS/HLL merge.
+    """
+
+    def __init__(self, capacity: int, cms_width: int, cms_depth: int, hll_precision: int = 0, seed: int = 0):
+        self.capacity = capacity
+        self.hll_precision = hll_precision
+        self.cms = CountMinSketch(cms_width, cms_depth, seed=seed)
+        self.undercount_bound = 0
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._labels = np.empty(0, dtype=object)
+        self._admission_offsets = np.empty(0, dtype=np.int64)
+        self._registers = np.zeros((0, 1 << hll_precision if hll_precision else 0), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _absorb(
+        self,
+        keys: np.ndarray,
+        counts: np.ndarray,
+        labels: np.ndarray,
+        registers: np.ndarray,
+        admission_offsets: np.ndarray
+    ):
+        """
+        Misra-Gries merge of (keys, counts) into the summary; registers are max-merged
+        and admission offsets (occurrences each side's registers missed) are summed.
+        """
+        all_keys = np.concatenate([self._keys, keys])
+        merged_keys, inverse = np.unique(all_keys, return_inverse=True)
+        merged_counts = np.bincount(
+            inverse, weights=np.concatenate([self._counts, counts]), minlength=len(merged_keys)
+        ).astype(np.int64)
+        merged_labels = np.empty(len(merged_keys), dtype=object)
+        # Later assignments win, so existing labels take precedence over incoming ones
+        merged_labels[inverse[len(self._keys):]] = labels
+        merged_labels[inverse[:len(self._keys)]] = self._labels
+        merged_offsets = np.bincount(
+            inverse, weights=np.concatenate([self._admission_offsets, admission_offsets]), minlength=len(merged_keys)
+        ).astype(np.int64)
+        merged_registers = np.zeros((len(merged_keys), self._registers.shape[1]), dtype=np.uint8)
+        if self.hll_precision:
+            np.maximum.at(merged_registers, inverse, np.concatenate([self._registers, registers]))
+
+        if len(merged_keys) > self.capacity:
+            cutoff = np.partition(merged_counts, len(merged_counts) - self.capacity - 1)[len(merged_counts) - self.capacity - 1]
+            merged_counts = merged_counts - cutoff
+            self.undercount_bound += int(cutoff)
+            keep = merged_counts > 0
+            merged_keys, merged_counts = merged_keys[keep], merged_counts[keep]
+            merged_labels, merged_registers = merged_labels[keep], merged_registers[keep]
+            merged_offsets = merged_offsets[keep]
+
+        self._keys, self._counts, self._labels, self._registers = merged_keys, merged_counts, merged_labels, merged_registers
+        self._admission_offsets = merged_offsets
+
+    def update(
+        self,
+        keys: np.ndarray,
+        label_for: Callable[[np.ndarray], List],
+        doc_hashes: Optional[np.ndarray] = None,
+        doc_mask: Optional[np.ndarray] = None
+    ):
+        """
+        Adds a batch of key occurrences. label_for(occurrence_indices) must return
+        the label of each indexed occurrence; it is only called for one occurrence
+        per distinct key. doc_hashes (one per occurrence) feed the HyperLogLogs;
+        with doc_mask, only the occurrences where it is True do.
+        """
+        if not len(keys):
+            return
+        unique_keys, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        unique_counts = np.bincount(inverse, minlength=len(unique_keys)).astype(np.int64)
+        is_new = ~np.isin(unique_keys, self._keys, assume_unique=True)
+        # Occurrences of newly admitted keys seen before this batch never reached their registers
+        admission_offsets = np.zeros(len(unique_keys), dtype=np.int64)
+        if self.hll_precision:
+            admission_offsets[is_new] = self.cms.estimate(unique_keys[is_new])
+        self.cms.add(unique_keys, unique_counts)
+
+        labels = np.empty(len(unique_keys), dtype=object)
+        new_positions = np.flatnonzero(is_new)
+        for position, label in zip(new_positions.tolist(), label_for(first_index[new_positions])):
+            labels[position] = label
+        registers = np.zeros((len(unique_keys), self._registers.shape[1]), dtype=np.uint8)
+        self._absorb(unique_keys, unique_counts, labels, registers, admission_offsets)
+
+        if self.hll_precision and doc_hashes is not None and len(self._keys):
+            positions = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            tracked = self._keys[positions] == keys
+            if doc_mask is not None:
+                tracked &= doc_mask
+            index, rank = _hll_positions(doc_hashes[tracked], self.hll_precision)
+            np.maximum.at(self._registers, (positions[tracked], index), rank)
+
+    def merge(self, other: "HeavyHitters"):
+        other_offsets = other._admission_offsets
+        if self.hll_precision:
+            # A key tracked on one side only has no registers for the other side's occurrences
+            self._admission_offsets = self._admission_offsets + np.where(
+                np.isin(self._keys, other._keys, assume_unique=True), 0, other.cms.estimate(self._keys)
+            )
+            other_offsets = other_offsets + np.where(
+                np.isin(other._keys, self._keys, assume_unique=True), 0, self.cms.estimate(other._keys)
+            )
+        self.cms.merge(other.cms)
+        self.undercount_bound += other.undercount_bound
+        self._absorb(other._keys, other._counts, other._labels, other._registers, other_offsets)
+
+    def top(self, top_k: int, min_docs: int = 0) -> List[Tuple[object, int]]:
+        """
+        Top_k tracked labels by Count-Min frequency estimate (ties broken by label),
+        optionally keeping only keys whose estimated document count is >= min_docs.
+        """
+        if not len(self._keys):
+            return []
+        estimates = self.cms.estimate(self._keys)
+        eligible = np.ones(len(self._keys), dtype=bool)
+        if self.hll_precision and min_docs > 0:
+            eligible = np.rint(hll_estimate(self._registers)) >= min_docs
+        ranked = sorted(
+            zip(self._labels[eligible].tolist(), estimates[eligible].tolist()),
+            key=lambda item: (-item[1], item[0])
+        )
+        return ranked[:top_k]
+
+    def error_bounds(self) -> Dict[str, float]:
+        """Error bounds for the analysis JSON."""
+        bounds = {
+            "total_items": self.cms.total,
+            "tracked_keys": len(self._keys),
+            "capacity": self.capacity,
+            "cms_width": self.cms.width,
+            "cms_depth": self.cms.depth,
+            "frequency_overcount_bound": round(self.cms.epsilon * self.cms.total, 2),
+            "frequency_bound_confidence": round(1 - self.cms.delta, 6),
+            "topk_undercount_bound": self.undercount_bound,
+        }
+        if self.hll_precision:
+            bounds["prompt_count_relative_std_error"] = round(1.04 / math.sqrt(1 << self.hll_precision), 4)
+            # Prompt counts are biased low by at most a key's admission offset (see class docstring)
+            bounds["prompt_count_undercount_bound"] = int(self._admission_offsets.max()) if len(self._keys) else 0
+            bounds["late_admitted_keys"] = int(np.count_nonzero(self._admission_offsets))
+        return bounds
+
+
+class NgramHeavyHitters:
+    """
+    Approximate top-k n-gram counter over token-string streams, in fixed memory
+    (including the token -> hash cache, which is cleared once it holds
+    token_cache_size tokens).
+    N-gram keys are 64-bit hashes built from stable per-token hashes, so summaries
+    built in different processes merge. Occurrences are buffered and folded into
+    the HeavyHitters summary in batches of batch_size.
+    """
+
+    def __init__(
+        self,
+        n: int,
+        capacity: int,
+        cms_width: int,
+        cms_depth: int,
+        hll_precision: int = 0,
+        batch_size: int = 200000,
+        token_cache_size: int = 1 << 20
+    ):
+        self.n = n
+        self.batch_size = batch_size
+        self.token_cache_size = token_cache_size
+        self.summary = HeavyHitters(capacity, cms_width, cms_depth, hll_precision)
+        self._token_hashes: Dict[str, int] = {}
+        self._pending_tokens: List[List[str]] = []
+        self._pending_keys: List[np.ndarray] = []
+        self._pending_docs: List[np.ndarray] = []
+        self._pending_size = 0
+
+    def __getstate__(self):
+        self.flush()
+        # The token hash cache is rebuilt on demand rather than pickled
+        return {**self.__dict__, "_token_hashes": {}}
+
+    def _hash_tokens(self, tokens: List[str]) -> np.ndarray:
+        cache = self._token_hashes
+        missing = [token for token in set(tokens) if token not in cache]
+        if missing:
+            if len(cache) + len(missing) > self.token_cache_size:
+                cache.clear()
+            cache.update(zip(missing, hash_strings(missing).tolist()))
+        return np.fromiter((cache[token] for token in tokens), dtype=np.uint64, count=len(tokens))
+
+    def add_tokens(self, tokens: List[str], doc_id: Optional[str] = None):
+        """Adds every length-n window of tokens; doc_id (e.g. a prompt ID) feeds the document counts."""
+        if len(tokens) < self.n:
+            return
+        keys = combine_window_hashes(self._hash_tokens(tokens), self.n)
+        self._pending_tokens.append(tokens)
+        self._pending_keys.append(keys)
+        if self.summary.hll_precision:
+            # None marks a text without a doc_id; only its document counts are skipped
+            self._pending_docs.append(
+                np.full(len(keys), hash_strings([doc_id])[0], dtype=np.uint64) if doc_id is not None else None
+            )
+        self._pending_size += len(keys)
+        if self._pending_size >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending_keys:
+            return
+        texts = self._pending_tokens
+        keys = np.concatenate(self._pending_keys)
+        # Window start offsets of each buffered text, to map occurrence index -> (text, position)
+        offsets = np.cumsum([0] + [len(k) for k in self._pending_keys])
+        n = self.n
+
+        def label_for(occurrences: np.ndarray) -> List[Tuple[str, ...]]:
+            text_index = np.searchsorted(offsets, occurrences, side='right') - 1
+            positions = occurrences - offsets[text_index]
+            return [tuple(texts[t][p:p + n]) for t, p in zip(text_index.tolist(), positions.tolist())]
+
+        doc_hashes = doc_mask = None
+        has_doc = [docs is not None for docs in self._pending_docs]
+        if any(has_doc):
+            doc_hashes = np.concatenate([
+                docs if docs is not None else np.zeros(len(text_keys), dtype=np.uint64)
+                for docs, text_keys in zip(self._pending_docs, self._pending_keys)
+            ])
+            if not all(has_doc):
+                doc_mask = np.repeat(has_doc, [len(text_keys) for text_keys in self._pending_keys])
+        self.summary.update(keys, label_for, doc_hashes, doc_mask)
+        self._pending_tokens = []
+        self._pending_keys = []
+        self._pending_docs = []
+        self._pending_size = 0
+
+    def merge(self, other: "NgramHeavyHitters"):
+        self.flush()
+        other.flush()
+        self.summary.merge(other.summary)
+
+    def top(self, top_k: int, min_docs: int = 0) -> List[Tuple[Tuple[str, ...], int]]:
+        """Top_k (ngram_tuple, estimated_frequency), see HeavyHitters.top."""
+        self.flush()
+        return self.summary.top(top_k, min_docs)
+
+    def error_bounds(self) -> Dict[str, float]:
+        self.flush()
+        return self.summary.error_bounds()
@@ -2,20 +2,15 @@ import os
 import json
 import logging
 import string
-from collections import Counter, defaultdict
-from typing import List, Dict, Tuple, Any
+from collections import Counter, defaultdict, deque
+from collections.abc import Sized
+from typing import List, Dict, Tuple, Any, Optional, Iterable, Iterator
 
 import numpy as np
 from tqdm import tqdm
-from wordfreq import word_frequency
 
-# For phrase extraction:
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk import ngrams
-from nltk.corpus import stopwords
 from collections import Counter
-from functools import partial
+from functools import lru_cache, partial
 from multiprocessing import Pool
 
 # Local imports from your package:
@@ -27,9 +22,12 @@ from .utils import (
     sanitize_filename,
     normalize_text,
     extract_words,
-    load_jsonl_file,
+    iter_jsonl_file,
     setup_logging,
 )
+from .tokenization import word_tokenize, span_tokenize
+from .spill import SpillingCounter
+from .sketches import NgramHeavyHitters
 from .analysis import (
     filter_mostly_numeric,
     merge_plural_possessive_s,
@@ -38,7 +36,9 @@ from .analysis import (
     analyze_word_rarity,
     find_over_represented_words,
     find_zero_frequency_words,
-    STOP_WORDS
+    word_counts_path,
+    load_word_counts,
+    _iter_batches
 )
 
 logger = logging.getLogger(__name__)
@@ -47,7 +47,11 @@ logger = logging.getLogger(__name__)
 #   nltk.download("punkt")
 #   nltk.download("stopwords")
 
-stop_words_nltk = set(stopwords.words('english'))
+@lru_cache(maxsize=None)
+def _phrase_stop_words() -> frozenset:
+    """English NLTK stopwords dropped from phrase n-grams, loaded on first use."""
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
 
 ###############################################################################
 # Additional Functions for Phrase Extraction
@@ -83,7 +87,58 @@ def save_list_jsonl(items, filename: str):
         logger.error(f"Error saving phrases file {filename}: {e}")
 
 
-def extract_ngrams_cleaned(texts_list: List[str], n: int, top_k: int) -> List[Tuple[Tuple[str, ...], int]]:
+def _cleaned_tokens(text: str, stop_words: frozenset) -> List[str]:
+    """Lowercased alphabetic non-stopword tokens of text, as counted by extract_ngrams_cleaned."""
+    return [
+        w.lower()
+        for w in word_tokenize(text)
+        if w.isalpha() and w.lower() not in stop_words
+    ]
+
+
+def _ngram_counts_for_batch(texts: List[str], n: int) -> Counter:
+    """Worker function: the cleaned n-gram counts of a batch of texts, in order of first occurrence."""
+    stop_words = _phrase_stop_words()
+    batch_counter = Counter()
+    for text in texts:
+        if not isinstance(text, str) or not text.strip():
+            continue
+        tokens = _cleaned_tokens(text, stop_words)
+        if len(tokens) >= n:
+            batch_counter.update(zip(*(tokens[i:] for i in range(n))))
+    return batch_counter
+
+
+def _map_batches(func, batches: Iterable[List[str]], num_procs: int, initializer=None, initargs=()) -> Iterator[Any]:
+    """
+    Yields func(batch) for each batch, in input order, from a pool of num_procs
+    processes. At most 2 * num_procs batches are in flight at a time, so batches
+    can be a lazy iterator that is never read ahead in full.
+    """
+    pending = deque()
+    with Pool(processes=num_procs, initializer=initializer, initargs=initargs) as p:
+        for batch in batches:
+            pending.append(p.apply_async(func, (batch,)))
+            if len(pending) >= 2 * num_procs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def _num_batches(texts: Iterable[str], chunksize: int) -> Optional[int]:
+    """Number of chunksize batches in texts, for progress bars; None if texts has no length."""
+    return -(-len(texts) // chunksize) if isinstance(texts, Sized) else None
+
+
+def extract_ngrams_cleaned(
+    texts_list: Iterable[str],
+    n: int,
+    top_k: int,
+    memory_budget: Optional[int] = None,
+    approximate: bool = False,
+    num_procs: int = 1,
+    chunksize: int = config.SLOP_PHRASES_CHUNKSIZE
+) -> List[Tuple[Tuple[str, ...], int]]:
     """
     Extract the top_k most frequent n-grams from a corpus after a "cleaning" step:
        - Tokenize
@@ -91,24 +146,57 @@ def extract_ngrams_cleaned(texts_list: List[str], n: int, top_k: int) -> List[Tu
        - Exclude stopwords
        - Lowercase
     Returns a list of (ngram_tuple, frequency).
+    With num_procs > 1, batches of chunksize texts are counted in a process pool
+    and merged in input order, so the results (ties included) equal the serial count.
+    With memory_budget (bytes), counts beyond it are spilled to disk (see SpillingCounter).
+    With approximate=True, counts go into a fixed-size sketch sized by the SKETCH_*
+    config values instead (see sketches.NgramHeavyHitters), and frequencies are
+    Count-Min estimates; memory_budget and num_procs are then ignored.
     """
-    ngram_counts = Counter()
-    logger.info(f"Extracting cleaned {n}-grams from {len(texts_list)} combined texts...")
-
-    for text in tqdm(texts_list, desc=f"Extracting {n}-grams", leave=False):
-        if not isinstance(text, str) or not text.strip():
-            continue
+    stop_words = _phrase_stop_words()
+    logger.info(f"Extracting cleaned {n}-grams from the combined texts...")
 
-        tokens = [
-            w.lower()
-            for w in word_tokenize(text)
-            if w.isalpha() and w.lower() not in stop_words_nltk
-        ]
-        if len(tokens) >= n:
-            ngram_counts.update(ngrams(tokens, n))
+    if approximate:
+        ngram_counts = NgramHeavyHitters(
+            n, max(config.SKETCH_TOPK_CAPACITY, 2 * top_k), config.SKETCH_CMS_WIDTH, config.SKETCH_CMS_DEPTH,
+            batch_size=config.SKETCH_BATCH_SIZE
+        )
+        for text in tqdm(texts_list, desc=f"Extracting {n}-grams", leave=False):
+            if isinstance(text, str) and text.strip():
+                ngram_counts.add_tokens(_cleaned_tokens(text, stop_words))
+        logger.info(f"Approximate {n}-gram counts: {ngram_counts.error_bounds()}")
+        return ngram_counts.top(top_k)
+
+    ngram_counts = SpillingCounter(memory_budget) if memory_budget else Counter()
+    batches = _iter_batches(texts_list, chunksize)
+    if num_procs > 1:
+        results = _map_batches(partial(_ngram_counts_for_batch, n=n), batches, num_procs)
+    else:
+        results = map(partial(_ngram_counts_for_batch, n=n), batches)
+    for batch_counter in tqdm(results, desc=f"Extracting {n}-grams", total=_num_batches(texts_list, chunksize), leave=False):
+        ngram_counts.update(batch_counter)
 
     # Return the top_k most common ngrams
-    return ngram_counts.most_common(top_k)
+    top_ngrams = ngram_counts.most_common(top_k)
+    if memory_budget:
+        ngram_counts.close()
+    return top_ngrams
+
+
+def _cleaned_token_spans(text: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Tokenizes text into (token, start, end) spans (see span_tokenize) and keeps the
+    lowercased alphabetic non-stopword tokens, together with their character offsets.
+    """
+    stop_words = _phrase_stop_words()
+    cleaned_tokens = []
+    char_index_map = []
+    for (tk, st, en) in span_tokenize(text):
+        lower_tk = tk.lower()
+        if lower_tk.isalpha() and (lower_tk not in stop_words):
+            cleaned_tokens.append(lower_tk)
+            char_index_map.append((st, en))
+    return cleaned_tokens, char_index_map
 
 
 def process_one_text_for_substrings(
@@ -118,40 +206,17 @@ def process_one_text_for_substrings(
 ) -> Counter:
     """
     Worker function for multiprocessing. For each text:
-      1) Tokenize text with naive offsets.
-      2) Build a list of cleaned tokens + map to the offsets in the original text.
-      3) For each n-length window in cleaned_tokens, if it matches something
+      1) Build a list of cleaned tokens + map to the offsets in the original text.
+      2) For each n-length window in cleaned_tokens, if it matches something
          in top_ngrams_set, retrieve the exact substring from the original text.
-      4) Return a Counter of substring -> frequency for this single text.
+      3) Return a Counter of substring -> frequency for this single text.
     """
     local_counter = Counter()
 
     if not isinstance(text, str) or not text.strip():
         return local_counter
 
-    # Naive tokenization with offsets:
-    tokens_with_spans = []
-    offset = 0
-    raw_tokens = word_tokenize(text)
-
-    for tk in raw_tokens:
-        idx = text.find(tk, offset)
-        if idx == -1:
-            continue
-        start_idx = idx
-        end_idx = idx + len(tk)
-        tokens_with_spans.append((tk, start_idx, end_idx))
-        offset = end_idx
-
-    # Build cleaned_tokens + offset map
-    cleaned_tokens = []
-    char_index_map = []
-    for (tk, st, en) in tokens_with_spans:
-        lower_tk = tk.lower()
-        if lower_tk.isalpha() and (lower_tk not in stop_words_nltk):
-            cleaned_tokens.append(lower_tk)
-            char_index_map.append((st, en))
-
+    cleaned_tokens, char_index_map = _cleaned_token_spans(text)
     if len(cleaned_tokens) < n:
         return local_counter
 
@@ -169,58 +234,122 @@ def process_one_text_for_substrings(
     return local_counter
 
 
+# Set once per phrase-extraction worker by _init_substring_worker instead of being pickled with every task
+_worker_top_ngrams_set: set = set()
+
+
+def _init_substring_worker(top_ngrams_set: set):
+    global _worker_top_ngrams_set
+    _worker_top_ngrams_set = top_ngrams_set
+
+
+def _substrings_for_batch(texts: List[str], n: int, top_ngrams_set: Optional[set] = None) -> Counter:
+    """
+    Worker function: process_one_text_for_substrings over a batch, summed into one
+    Counter. top_ngrams_set=None uses the set installed by _init_substring_worker.
+    """
+    if top_ngrams_set is None:
+        top_ngrams_set = _worker_top_ngrams_set
+    batch_counter = Counter()
+    for text in texts:
+        batch_counter.update(process_one_text_for_substrings(text, top_ngrams_set, n))
+    return batch_counter
+
+
+def _count_substrings(
+    texts: Iterable[str],
+    top_ngrams_set: set,
+    n: int,
+    chunksize: int,
+    num_procs: int
+) -> Counter:
+    """
+    Second pass that re-tokenizes every text to count the substrings of the n-grams
+    in top_ngrams_set, per batch of chunksize texts. With num_procs > 1 the batches
+    go to a process pool whose workers receive the set once, at startup. Batches
+    are merged in input order, so equal counts keep their order of first occurrence.
+    """
+    batches = _iter_batches(texts, chunksize)
+    if num_procs > 1:
+        results = _map_batches(
+            partial(_substrings_for_batch, n=n), batches, num_procs,
+            initializer=_init_substring_worker, initargs=(top_ngrams_set,)
+        )
+    else:
+        results = map(partial(_substrings_for_batch, n=n, top_ngrams_set=top_ngrams_set), batches)
+    combined_substring_counter = Counter()
+    for batch_counter in tqdm(results, desc="MP substring extraction", total=_num_batches(texts, chunksize)):
+        combined_substring_counter.update(batch_counter)
+    return combined_substring_counter
+
+
+def _count_phrases_two_pass(
+    texts: Iterable[str],
+    n: int,
+    top_k_ngrams: int,
+    chunksize: int,
+    num_procs: int,
+    memory_budget: Optional[int] = None,
+    approximate: bool = False
+) -> Tuple[List[Tuple[Tuple[str, ...], int]], Counter]:
+    """
+    Exact two-pass phrase count: extract_ngrams_cleaned counts the n-grams of all
+    texts, then _count_substrings re-tokenizes every text and tallies surface forms
+    for the top n-grams only. Both passes are spread over num_procs processes.
+    With approximate=True the top n-grams are picked from sketch estimates; the
+    phrase counts of the picked n-grams stay exact.
+    """
+    # Step 1: get top n-grams from the cleaned perspective
+    top_ngrams = extract_ngrams_cleaned(
+        texts, n=n, top_k=top_k_ngrams, memory_budget=memory_budget, approximate=approximate,
+        num_procs=num_procs, chunksize=chunksize
+    )
+    if not top_ngrams:
+        return top_ngrams, Counter()
+
+    # Convert that list to a set of n-gram tuples for quick membership checks
+    top_ngrams_set = set(ng for ng, _freq in top_ngrams)
+    logger.info(f"Created set of {len(top_ngrams_set)} top n-gram tuples.")
+
+    # Step 2: Use multiprocessing to process texts
+    return top_ngrams, _count_substrings(texts, top_ngrams_set, n, chunksize, num_procs)
+
+
 def extract_and_save_slop_phrases(
     texts: List[str],
     output_dir: str,
     n: int = 3,
     top_k_ngrams: int = 1000,
     top_phrases_to_save: int = 10000,
-    chunksize: int = 50
+    chunksize: int = 50,
+    memory_budget: Optional[int] = None,
+    approximate: bool = False
 ):
     """
     1) Extract top-k n-grams from the combined texts (cleaned).
-    2) Use multiprocessing to find exact substring occurrences in the original text.
+    2) Find the exact substring occurrences of those n-grams in the original text.
     3) Filter out phrases with mid-phrase punctuation.
     4) Save the top phrases to a JSONL file in output_dir.
+    Steps 1 and 2 each spread batches of chunksize texts over the process pool
+    (see _count_phrases_two_pass).
+    memory_budget (bytes) caps the in-memory n-gram counts; the rest spills to disk.
+    approximate=True picks the top n-grams from fixed-size sketches instead (see
+    extract_ngrams_cleaned).
     """
     logger.info(f"Extracting top {top_k_ngrams} {n}-grams, then retrieving phrases...")
 
-    # Step 1: get top n-grams from the cleaned perspective
-    top_ngrams = extract_ngrams_cleaned(texts, n=n, top_k=top_k_ngrams)
+    num_procs = min(os.cpu_count() or 1, config.SLOP_PHRASES_MAX_PROCESSES)
+    logger.info(f"Using up to {num_procs} worker processes for phrase extraction...")
+
+    top_ngrams, combined_substring_counter = _count_phrases_two_pass(
+        texts, n, top_k_ngrams, chunksize, num_procs, memory_budget, approximate
+    )
     logger.info(f"Found {len(top_ngrams)} unique {n}-grams after cleaning.")
 
     if not top_ngrams:
         logger.warning("No n-grams found; skipping phrase extraction.")
         return
 
-    # Convert that list to a set of n-gram tuples for quick membership checks
-    top_ngrams_set = set(ng for ng, _freq in top_ngrams)
-    logger.info(f"Created set of {len(top_ngrams_set)} top n-gram tuples.")
-
-    # Step 2: Use multiprocessing to process texts
-    process_func = partial(
-        process_one_text_for_substrings,
-        top_ngrams_set=top_ngrams_set,
-        n=n
-    )
-
-    num_procs = min(os.cpu_count() or 1, config.SLOP_PHRASES_MAX_PROCESSES)
-    logger.info(f"Spawning up to {num_procs} worker processes for phrase extraction...")
-
-    with Pool(processes=num_procs) as p:
-        partial_counters = list(
-            tqdm(
-                p.imap_unordered(process_func, texts, chunksize=chunksize),
-                desc="MP substring extraction",
-                total=len(texts)
-            )
-        )
-
-    # Merge counters
-    combined_substring_counter = Counter()
-    for c in partial_counters:
-        combined_substring_counter.update(c)
-
     logger.info(f"Merged counters: {len(combined_substring_counter)} unique substrings found.")
 
     # Step 3: Filter out phrases with mid-phrase punctuation
@@ -243,14 +372,43 @@ def extract_and_save_slop_phrases(
 ###############################################################################
 
 
+class DatasetTexts:
+    """
+    The string 'output' fields of one or more generated-dataset JSONL files, read
+    lazily: each iteration re-opens the files and reads up to max_items lines of
+    each, so the texts are never held in memory together.
+    """
+
+    def __init__(self, filenames: List[str], max_items: int = -1):
+        self.filenames = filenames
+        self.max_items = max_items
+
+    def __iter__(self) -> Iterator[str]:
+        for filename in self.filenames:
+            for item in iter_jsonl_file(filename, max_items=self.max_items):
+                if isinstance(item.get('output'), str):
+                    yield item['output']
+
+
 def create_slop_lists(
     analysis_files_dir: str = config.ANALYSIS_OUTPUT_DIR,
     output_dir: str = config.SLOP_LIST_OUTPUT_DIR,
-    max_items_per_model: int = config.ANALYSIS_MAX_ITEMS_PER_MODEL
+    max_items_per_model: int = config.ANALYSIS_MAX_ITEMS_PER_MODEL,
+    memory_budget: Optional[int] = None,
+    approximate_ngrams: bool = config.APPROX_NGRAM_COUNTS
 ):
     """
     Combines analysis results from multiple models to create final slop lists.
     Also extracts and saves top slop phrases (multi-word substrings) in JSONL.
+    Word counts come from the per-model tables saved next to the analysis files
+    (see analysis.save_word_counts) where present and built from the same sample
+    (number of texts and max_items) this call reads; other models are re-counted
+    from their datasets. The datasets (max_items_per_model items each) are streamed
+    from their JSONL files on every pass (see DatasetTexts), never loaded whole.
+    memory_budget (bytes) bounds the word and phrase-stage n-gram counts kept in
+    memory while counting, spilling the rest to disk (see SpillingCounter and
+    extract_and_save_slop_phrases); approximate_ngrams counts the n-grams in
+    fixed-size sketches instead.
     """
     logger.info("Starting combined slop list generation...")
     all_model_data = []
@@ -261,10 +419,12 @@ def create_slop_lists(
         return
 
     logger.info(f"Found {len(analysis_files)} analysis files. Loading data...")
+    analyses = []
     for filename in tqdm(analysis_files, desc="Loading analysis files"):
         filepath = os.path.join(analysis_files_dir, filename)
         data = load_json_file(filepath)
         if data and isinstance(data, dict) and "model_name" in data:
+            analyses.append(data)
             model_name = data["model_name"]
             sanitized_name = sanitize_filename(model_name)
             dataset_filename = os.path.join(
@@ -272,15 +432,17 @@ def create_slop_lists(
                 f"generated_{sanitized_name}.jsonl"
             )
             if os.path.exists(dataset_filename):
-                logger.debug(f"Reloading dataset for {model_name} from {dataset_filename}")
-                model_dataset = load_jsonl_file(dataset_filename, max_items=max_items_per_model)
-                texts = [
-                    item['output']
-                    for item in model_dataset
-                    if 'output' in item and isinstance(item['output'], str)
-                ]
-                if texts:
-                    all_model_data.append({"model_name": model_name, "texts": texts})
+                logger.debug(f"Scanning dataset for {model_name} in {dataset_filename}")
+                texts = DatasetTexts([dataset_filename], max_items=max_items_per_model)
+                num_texts = sum(1 for text in texts if text)
+                if num_texts:
+                    all_model_data.append({
+                        "model_name": model_name,
+                        "dataset_filename": dataset_filename,
+                        "texts": texts,
+                        "num_texts": num_texts,
+                        "word_counts_file": word_counts_path(filepath),
+                    })
                 else:
                     logger.warning(f"No text found in dataset file for {model_name}")
             else:
@@ -294,28 +456,36 @@ def create_slop_lists(
 
     logger.info(f"Processing combined text data from {len(all_model_data)} models...")
 
-    # Aggregate text from all models
-    all_texts_flat = []
-    for model_data in all_model_data:
-        all_texts_flat.extend(model_data.get("texts", []))
-
-    if not all_texts_flat:
-        logger.error("No text data available after combining models.")
-        return
+    # All models' texts, streamed from their datasets
+    all_texts_flat = DatasetTexts(
+        [model_data["dataset_filename"] for model_data in all_model_data], max_items=max_items_per_model
+    )
 
     # =======================
     # 1) WORD-BASED SLOP LIST
     # =======================
 
     logger.info("Counting combined words...")
-    raw_combined_counts = Counter()
-    for text in tqdm(all_texts_flat, desc="Counting words"):
-        normalized = normalize_text(text)
-        words = extract_words(normalized, config.WORD_MIN_LENGTH)
-        raw_combined_counts.update(words)
+    raw_combined_counts = SpillingCounter(memory_budget) if memory_budget else Counter()
+    for model_data in tqdm(all_model_data, desc="Counting words"):
+        # Only reused if counted from the same sample this run reads
+        word_counts = load_word_counts(
+            model_data["word_counts_file"], num_texts=model_data["num_texts"], max_items=max_items_per_model
+        )
+        if word_counts is not None:
+            raw_combined_counts.update(word_counts)
+            continue
+        logger.debug(f"No word count table for {model_data['model_name']}; counting words from its texts.")
+        for text in model_data["texts"]:
+            normalized = normalize_text(text)
+            words = extract_words(normalized, config.WORD_MIN_LENGTH)
+            raw_combined_counts.update(words)
 
     logger.info("Filtering combined counts...")
+    # Streams the spilled counts back in word order; the filtered vocabulary is kept in memory
     filtered_numeric = filter_mostly_numeric(raw_combined_counts)
+    if memory_budget:
+        raw_combined_counts.close()
     merged_counts = merge_plural_possessive_s(filtered_numeric)
     filtered_stopwords = filter_stopwords(merged_counts)
 
@@ -389,23 +559,20 @@ def create_slop_lists(
     combined_bigrams = defaultdict(lambda: {'total_freq': 0, 'models': set()})
     combined_trigrams = defaultdict(lambda: {'total_freq': 0, 'models': set()})
 
-    for filename in tqdm(analysis_files, desc="Aggregating N-grams"):
-        filepath = os.path.join(analysis_files_dir, filename)
-        data = load_json_file(filepath)
-        if data and isinstance(data, dict):
-            model_name = data.get("model_name", "unknown")
-            for bg_data in data.get("top_bigrams", []):
-                ngram = bg_data.get("ngram")
-                freq = bg_data.get("frequency", 0)
-                if ngram and freq > 0:
-                    combined_bigrams[ngram]['total_freq'] += freq
-                    combined_bigrams[ngram]['models'].add(model_name)
-            for tg_data in data.get("top_trigrams", []):
-                ngram = tg_data.get("ngram")
-                freq = tg_data.get("frequency", 0)
-                if ngram and freq > 0:
-                    combined_trigrams[ngram]['total_freq'] += freq
-                    combined_trigrams[ngram]['models'].add(model_name)
+    for data in analyses:
+        model_name = data.get("model_name", "unknown")
+        for bg_data in data.get("top_bigrams", []):
+            ngram = bg_data.get("ngram")
+            freq = bg_data.get("frequency", 0)
+            if ngram and freq > 0:
+                combined_bigrams[ngram]['total_freq'] += freq
+                combined_bigrams[ngram]['models'].add(model_name)
+        for tg_data in data.get("top_trigrams", []):
+            ngram = tg_data.get("ngram")
+            freq = tg_data.get("frequency", 0)
+            if ngram and freq > 0:
+                combined_trigrams[ngram]['total_freq'] += freq
+                combined_trigrams[ngram]['models'].add(model_name)
 
     min_models_for_ngram_slop = 2
     filtered_bigrams = {
@@ -437,7 +604,7 @@ def create_slop_lists(
     # 3) EXACT PHRASE EXTRACTION
     # =======================
     # Uses multi-processing and substring matching for the top n-grams in the *combined* data.
-    # This step is not reliant on the analysis JSON files; it re-processes all_texts_flat.
+    # This step is not reliant on the analysis JSON files; it re-reads the datasets through all_texts_flat.
     logger.info("Extracting and saving slop phrases from combined data...")
     extract_and_save_slop_phrases(
         texts=all_texts_flat,
@@ -445,7 +612,9 @@ def create_slop_lists(
         n=config.SLOP_PHRASES_NGRAM_SIZE,
         top_k_ngrams=config.SLOP_PHRASES_TOP_NGRAMS,
         top_phrases_to_save=config.SLOP_PHRASES_TOP_PHRASES_TO_SAVE,
-        chunksize=config.SLOP_PHRASES_CHUNKSIZE
+        chunksize=config.SLOP_PHRASES_CHUNKSIZE,
+        memory_budget=memory_budget,
+        approximate=approximate_ngrams
     )
 
     logger.info("Slop list + phrase generation finished.")
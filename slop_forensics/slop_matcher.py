@@ -0,0 +1,72 @@
+from typing import Dict, List, Sequence
+
+# Key under which a trie node lists the categories of the phrases ending there (tokens are strings)
+_END = None
+
+
+class SlopMatcher:
+    """
+    Token trie over slop phrases of any length, each tagged with a category such
+    as 'word', 'bigram', 'trigram' or 'phrase'. count_hits walks the trie from
+    every position of a token stream, so a single pass counts every occurrence of
+    every phrase (overlapping ones included, as a sliding window would) without
+    building a string per window. Nodes are plain dicts keyed by token.
+    """
+
+    def __init__(self, categories: Sequence[str] = ()):
+        self.categories: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+        self._root: Dict = {}
+        self.num_phrases = 0
+        self.max_length = 0
+        for category in categories:
+            self._category_id(category)
+
+    def __len__(self) -> int:
+        return self.num_phrases
+
+    def _category_id(self, category: str) -> int:
+        category_id = self._category_ids.get(category)
+        if category_id is None:
+            category_id = self._category_ids[category] = len(self.categories)
+            self.categories.append(category)
+        return category_id
+
+    def add(self, tokens: Sequence[str], category: str) -> bool:
+        """Adds a phrase given as its tokens; returns False if it is empty or already in category."""
+        if not tokens:
+            return False
+        category_id = self._category_id(category)
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        ends = node.get(_END, ())
+        if category_id in ends:
+            return False
+        node[_END] = ends + (category_id,)
+        self.num_phrases += 1
+        self.max_length = max(self.max_length, len(tokens))
+        return True
+
+    def count_hits(self, tokens: Sequence[str]) -> List[int]:
+        """Occurrences of each category's phrases in tokens, in the order of self.categories."""
+        hits = [0] * len(self.categories)
+        root = self._root
+        num_tokens = len(tokens)
+        for start, token in enumerate(tokens):
+            node = root.get(token)
+            position = start + 1
+            while node is not None:
+                ends = node.get(_END)
+                if ends is not None:
+                    for category_id in ends:
+                        hits[category_id] += 1
+                if position == num_tokens:
+                    break
+                node = node.get(tokens[position])
+                position += 1
+        return hits
+
+    def count_hits_by_category(self, tokens: Sequence[str]) -> Dict[str, int]:
+        """count_hits as a {category: hits} dict."""
+        return dict(zip(self.categories, self.count_hits(tokens)))
@@ -0,0 +1,138 @@
+import os
+import heapq
+import pickle
+import shutil
+import logging
+import tempfile
+from collections import Counter
+from typing import Any, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Items pickled per block in a run file; reading a run holds one block in memory
+_RUN_BLOCK_SIZE = 65536
+_UNITS = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+
+
+def parse_memory_size(value: Union[str, int]) -> int:
+    """Parses a byte count such as 500000, '512M' or '8G' (binary units)."""
+    if isinstance(value, int):
+        return value
+    text = value.strip().lower().rstrip("b")
+    if text and text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+class SpillingCounter:
+    """
+    Counter that keeps at most roughly memory_budget bytes of counts in memory.
+    Once the in-memory Counter reaches memory_budget / bytes_per_entry keys, it is
+    written to a temporary file as a run sorted by key and cleared. items() then
+    k-way merges the runs and what is still in memory into (key, total) pairs in
+    key order, and most_common keeps only a top-k heap while streaming them.
+
+    Keys must be mutually orderable and picklable (str, or tuples of str).
+    Ties in most_common are broken by key, not by first insertion as in Counter.
+    bytes_per_entry is a rough per-key cost (dict slot, key object and count);
+    the default suits short strings and tuples of up to three words.
+    With memory_budget=None nothing is ever spilled.
+    """
+
+    def __init__(self, memory_budget: Optional[int] = None, bytes_per_entry: int = 256, temp_dir: Optional[str] = None):
+        self.max_entries = max(1, memory_budget // bytes_per_entry) if memory_budget else None
+        self.temp_dir = temp_dir
+        self._counts: Counter = Counter()
+        self._runs: List[str] = []
+        self._run_dir: Optional[str] = None
+
+    def __enter__(self) -> "SpillingCounter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def num_runs(self) -> int:
+        return len(self._runs)
+
+    def update(self, counts: Union[Mapping[Hashable, int], Iterable[Hashable]]):
+        """Adds counts (a mapping of key -> count, or an iterable of keys) as Counter.update does."""
+        self._counts.update(counts)
+        if self.max_entries is not None and len(self._counts) >= self.max_entries:
+            self._spill()
+
+    def _spill(self):
+        if not self._counts:
+            return
+        if self._run_dir is None:
+            self._run_dir = tempfile.mkdtemp(prefix="slop_counts_", dir=self.temp_dir)
+        run_file = os.path.join(self._run_dir, f"run_{len(self._runs):05d}.pkl")
+        items = sorted(self._counts.items())
+        with open(run_file, 'wb') as f:
+            for start in range(0, len(items), _RUN_BLOCK_SIZE):
+                pickle.dump(items[start:start + _RUN_BLOCK_SIZE], f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._runs.append(run_file)
+        logger.debug(f"Spilled {len(items)} counts to {run_file} (run {len(self._runs)}).")
+        self._counts = Counter()
+
+    @staticmethod
+    def _read_run(run_file: str) -> Iterator[Tuple[Any, int]]:
+        with open(run_file, 'rb') as f:
+            while True:
+                try:
+                    block = pickle.load(f)
+                except EOFError:
+                    return
+                yield from block
+
+    def items(self) -> Iterator[Tuple[Any, int]]:
+        """Yields (key, total count) for every key, in key order."""
+        sources = [self._read_run(run_file) for run_file in self._runs]
+        sources.append(iter(sorted(self._counts.items())))
+        current_key, current_count = None, 0
+        for key, count in heapq.merge(*sources, key=lambda item: item[0]):
+            if current_count and key == current_key:
+                current_count += count
+                continue
+            if current_count:
+                yield current_key, current_count
+            current_key, current_count = key, count
+        if current_count:
+            yield current_key, current_count
+
+    def most_common(self, n: int) -> List[Tuple[Any, int]]:
+        """The n keys with the highest totals, most common first."""
+        if not self._runs:
+            return sorted(self._counts.items(), key=lambda item: (-item[1], item[0]))[:n]
+        heap: List[Tuple[int, Any]] = []
+        for key, count in self.items():
+            if len(heap) < n:
+                heapq.heappush(heap, (count, _ReverseKey(key)))
+            elif count > heap[0][0] or (count == heap[0][0] and key < heap[0][1].key):
+                heapq.heapreplace(heap, (count, _ReverseKey(key)))
+        return [(entry.key, count) for count, entry in sorted(heap, reverse=True)]
+
+    def close(self):
+        """Deletes the run files."""
+        if self._run_dir is not None:
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+            self._run_dir = None
+        self._runs = []
+
+
+class _ReverseKey:
+    """Orders keys in reverse, so that on equal counts the min-heap evicts the largest key first."""
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other: "_ReverseKey") -> bool:
+        return other.key < self.key
+
+    def __eq__(self, other: "_ReverseKey") -> bool:
+        return self.key == other.key
@@ -0,0 +1,127 @@
+import os
+import hashlib
+import logging
+from importlib.metadata import version, PackageNotFoundError
+from typing import Dict, Optional
+
+import numpy as np
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Process-wide table, loaded on first use by get_syllable_table()
+_syllable_table: Optional[Dict[str, int]] = None
+
+
+def _nltk_version() -> str:
+    try:
+        return version("nltk")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def compile_cmudict() -> Dict[str, int]:
+    """
+    Reduces the CMU Pronouncing Dictionary to {word: syllables}, taking the
+    maximum over a word's pronunciations (a syllable is a phoneme carrying a
+    stress digit). Raises LookupError if the cmudict corpus is not installed.
+    """
+    from nltk.corpus import cmudict
+    return {
+        word: max(sum(1 for phoneme in phonetic if phoneme[-1].isdigit()) for phonetic in pronunciations)
+        for word, pronunciations in cmudict.dict().items()
+    }
+
+
+def save_syllable_table(filename: str, table: Dict[str, int]):
+    """
+    Saves a {word: syllables} table compactly: the words newline-joined into one
+    UTF-8 byte array plus a uint8 count per word, tagged with the NLTK version.
+    """
+    words = "\n".join(table).encode("utf-8")
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    tmp_file = f"{filename}.tmp"
+    with open(tmp_file, 'wb') as f:
+        np.savez_compressed(
+            f, words=np.frombuffer(words, dtype=np.uint8),
+            syllables=np.fromiter(table.values(), dtype=np.uint8, count=len(table)),
+            nltk_version=np.array(_nltk_version())
+        )
+    os.replace(tmp_file, filename)
+    logger.info(f"Saved syllable counts for {len(table)} words to {filename}")
+
+
+def load_syllable_table(filename: str, check_version: bool = True) -> Optional[Dict[str, int]]:
+    """
+    Loads a table written by save_syllable_table, or returns None if it is missing,
+    unreadable, or (with check_version) was compiled under a different NLTK version,
+    whose cmudict may differ.
+    """
+    if not os.path.exists(filename):
+        return None
+    try:
+        with np.load(filename, allow_pickle=False) as table:
+            saved_version = str(table["nltk_version"])
+            if check_version and saved_version != _nltk_version():
+                logger.info(f"Syllable table {filename} was built with NLTK {saved_version}, not {_nltk_version()}; ignoring it.")
+                return None
+            words = table["words"].tobytes().decode("utf-8")
+            syllables = table["syllables"].tolist()
+    except Exception as e:
+        logger.warning(f"Could not load syllable table {filename}: {e}")
+        return None
+    return dict(zip(words.split("\n"), syllables)) if syllables else {}
+
+
+def build_syllable_table(filename: str = config.SYLLABLE_TABLE_FILE) -> Dict[str, int]:
+    """Compiles cmudict and saves the result to filename. Raises LookupError without cmudict."""
+    table = compile_cmudict()
+    save_syllable_table(filename, table)
+    return table
+
+
+def get_syllable_table(filename: Optional[str] = config.SYLLABLE_TABLE_FILE) -> Dict[str, int]:
+    """
+    The {word: syllables} table used by metrics.syllable_count, loaded once per
+    process. It is read from filename if present and built with the installed NLTK
+    version; otherwise cmudict is compiled and saved there (see
+    scripts/build_syllable_table.py). Without cmudict, a table from another NLTK
+    version is used if there is one; else the table is empty and every word counts
+    as one syllable.
+    Set filename to None to compile cmudict without touching the disk.
+    """
+    global _syllable_table
+    if _syllable_table is not None:
+        return _syllable_table
+
+    table = load_syllable_table(filename) if filename else None
+    if table is None:
+        try:
+            table = compile_cmudict()
+        except (LookupError, ImportError):
+            table = load_syllable_table(filename, check_version=False) if filename else None
+            if table is not None:
+                logger.warning(f"NLTK 'cmudict' not found; using the syllable table in {filename} from another NLTK version.")
+            else:
+                logger.warning("NLTK 'cmudict' not found; counting every word as one syllable. Run: nltk.download('cmudict')")
+                table = {}
+        else:
+            if filename:
+                try:
+                    save_syllable_table(filename, table)
+                except OSError as e:
+                    logger.warning(f"Could not save syllable table {filename}: {e}")
+    _syllable_table = table
+    return table
+
+
+def syllable_table_fingerprint() -> str:
+    """
+    Digest of the table get_syllable_table() uses, for cache keys: it changes with
+    the cmudict it was compiled from, or when cmudict (and a saved table) is missing.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for word, syllables in get_syllable_table().items():
+        digest.update(f"{word}\t{syllables}\n".encode("utf-8"))
+    return digest.hexdigest()
@@ -0,0 +1,434 @@
+import re
+import random
+import string
+import difflib
+import logging
+from functools import lru_cache
+from importlib.metadata import version, PackageNotFoundError
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from . import config
+from .utils import normalize_text, extract_words
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_BACKENDS = ("nltk", "regex")
+
+
+class TokenizedText(NamedTuple):
+    """All token views of a single text that the analysis pipeline needs."""
+    words: List[str]          # WORD_PATTERN words for repetition counting (see extract_words)
+    ngram_tokens: List[str]   # Alphabetic, non-stopword tokens for n-gram counting
+    metric_tokens: List[str]  # Alphanumeric tokens of the raw text, for the complexity index
+    slop_tokens: List[str]    # Alphanumeric tokens of the lowercased text, for slop scoring
+    sentence_count: int
+    char_count: int
+
+
+# --- Regex backend ---
+# The NLTKWordTokenizer rules nltk.word_tokenize applies to each sentence, as of
+# NLTK_RULES_VERSION. They are applied per whitespace-separated chunk instead of per
+# sentence; the rules anchored at the sentence start only match a sentence's first
+# chunk, and those anchored at its end (_SENTENCE_FINAL) only run on its last chunk,
+# see _is_sentence_break.
+
+NLTK_RULES_VERSION = "3.10.3"
+
+_STARTING_QUOTES = [
+    (re.compile(r"([«“‘„]|[`]+)"), r" \1 "),
+    (re.compile(r"^\""), r"``"),
+    (re.compile(r"(``)"), r" \1 "),
+    (re.compile(r"([ \(\[{<])(\"|\'{2})"), r"\1 `` "),
+    (re.compile(r"(?i)(?<!\w)(\')(?!(?:re|ve|ll|m|t|s|d|n)\b)(?=\w)"), r"\1 "),
+]
+_FINAL_CLOSERS = "])}>\"'»”’" # May follow the final period of a sentence, also in later chunks
+_SENTENCE_FINAL = [
+    (re.compile(r'([^\.])(\.)([\]\)}>"\'»”’]*)\s*$'), r"\1 \2 \3 "),
+    (re.compile(r"([:,])$"), r" \1 "),
+]
+_PUNCTUATION = [
+    (re.compile(r"([:,])([^\d])"), r" \1 \2"),
+    (re.compile(r"\.{2,}"), r" \g<0> "),
+    (re.compile(r"[;@#$%&]"), r" \g<0> "),
+    (re.compile(r"[\u2012-\u2015]"), r" \g<0> "),
+    (re.compile(r"[?!]"), r" \g<0> "),
+    (re.compile(r"([^'])' "), r"\1 ' "),
+    (re.compile(r"[*]"), r" \g<0> "),
+    (re.compile(r"[\]\[\(\)\{\}\<\>]"), r" \g<0> "),
+    (re.compile(r"--"), r" -- "),
+]
+_ENDING_QUOTES = [
+    (re.compile(r"([»”’])"), r" \1 "),
+    (re.compile(r"''"), " '' "),
+    (re.compile(r'"'), " '' "),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"([^' ])('[sS]|'[mM]|'[dD]|') "), r"\1 \2 "),
+    (re.compile(r"([^' ])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T) "), r"\1 \2 "),
+]
+_CONTRACTIONS = [
+    re.compile(pattern) for pattern in (
+        r"(?i)\b(can)(not)\b", r"(?i)\b(d)('ye)\b", r"(?i)\b(gim)(me)\b", r"(?i)\b(gon)(na)\b",
+        r"(?i)\b(got)(ta)\b", r"(?i)\b(lem)(me)\b", r"(?i)\b(more)('n)\b", r"(?i)\b(wan)(na)(?=\s)",
+        r"(?i) ('t)(is)\b", r"(?i) ('t)(was)\b",
+    )
+]
+# Alphanumeric chunks _CONTRACTIONS splits, with the split position
+_ALNUM_CONTRACTIONS = {"cannot": 3, "gimme": 3, "gonna": 3, "gotta": 3, "lemme": 3, "wanna": 3}
+
+# Punkt treats a period after one of these (lowercased) as an abbreviation, not a sentence end.
+# A subset of the abbreviations in NLTK's English Punkt model.
+PUNKT_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "jr", "sr", "st", "prof", "rev", "gen", "col", "lt", "sgt", "capt",
+    "gov", "sen", "rep", "mt", "ft", "vs", "inc", "corp", "ltd", "co", "no", "jan", "feb",
+    "aug", "sept", "oct", "nov", "dec", "a.m", "p.m", "u.s", "u.k", "e.g", "i.e", "etc",
+})
+_SENTENCE_CLOSERS = "\"')]}"  # May follow the sentence-ending punctuation within a chunk
+_PUNKT_NON_WORD = re.compile(r"[?!)\";}\]\*:@\'\({\[]")
+_PUNKT_NUMBER = re.compile(r"^-?[\.,]?\d[\d,\.-]*\.?$")
+_CHUNK = re.compile(r"\S+")
+_QUOTE_TOKENS = ("``", "''")  # What Treebank turns a double quote into
+
+
+@lru_cache(maxsize=1 << 16)
+def _split_chunk(chunk: str, sentence_final: bool, sentence_initial: bool = False) -> Tuple[str, ...]:
+    """
+    NLTKWordTokenizer tokens of one whitespace-free chunk. sentence_final applies the
+    rules anchored at the end of a sentence (final period, trailing comma or colon);
+    with sentence_initial nothing precedes the chunk (a leading double quote or '').
+    """
+    # Otherwise the whitespace that precedes the chunk within its sentence
+    text = chunk if sentence_initial else " " + chunk
+    for regexp, substitution in _STARTING_QUOTES:
+        text = regexp.sub(substitution, text)
+    if sentence_final:
+        for regexp, substitution in _SENTENCE_FINAL:
+            text = regexp.sub(substitution, text)
+    else:
+        text += " " # The whitespace that follows the chunk within its sentence
+    for regexp, substitution in _PUNCTUATION:
+        text = regexp.sub(substitution, text)
+    text = " " + text + " "
+    for regexp, substitution in _ENDING_QUOTES:
+        text = regexp.sub(substitution, text)
+    for regexp in _CONTRACTIONS:
+        text = regexp.sub(r" \1 \2 ", text)
+    return tuple(text.split())
+
+
+def _starts_lower(chunk: str) -> bool:
+    word = chunk.lstrip("\"'([{`")
+    return bool(word) and word[0].islower()
+
+
+def _is_sentence_break(chunk: str, next_chunk: str) -> bool:
+    """
+    Approximates Punkt's decision whether a sentence ends after chunk: after ? and !,
+    and after a period unless it ends an ellipsis, a known abbreviation, an initial
+    or a number followed by a lowercase word.
+    """
+    stripped = chunk.rstrip(_SENTENCE_CLOSERS)
+    if not stripped:
+        return False
+    last = stripped[-1]
+    if last in "?!":
+        return True
+    if last != ".":
+        return False
+    if stripped.endswith(".."):
+        word = next_chunk.lstrip("\"'([{`")
+        return bool(word) and word[0].isupper()
+    word = _PUNKT_NON_WORD.split(stripped[:-1])[-1].lower()
+    if word in PUNKT_ABBREVIATIONS or word.split("-")[-1] in PUNKT_ABBREVIATIONS:
+        return False
+    if len(word) == 1 and word.isalpha():
+        return word == "i" and not _starts_lower(next_chunk)
+    if _PUNKT_NUMBER.match(word):
+        return not _starts_lower(next_chunk)
+    return True
+
+
+def _is_closing_chunk(chunk: str) -> bool:
+    """
+    True if chunk only holds _FINAL_CLOSERS, so that the sentence's final period rule
+    reaches past it (a leading double quote or '' becomes an opening `` instead).
+    """
+    return not chunk.strip(_FINAL_CLOSERS) and not chunk.startswith(('"', "''"))
+
+
+def _regex_tokenize(text: str) -> Tuple[int, List[str]]:
+    """(sentence count, word tokens) of text, without sentence splitting or NLTK data."""
+    chunks = text.split()
+    tokens = []
+    sentence_count = 1 if chunks else 0
+    last_index = len(chunks) - 1
+    while last_index > 0 and _is_closing_chunk(chunks[last_index]):
+        last_index -= 1
+    sentence_initial = True
+    for i, chunk in enumerate(chunks):
+        if chunk.isalnum():
+            split = _ALNUM_CONTRACTIONS.get(chunk.lower())
+            if split:
+                tokens.append(chunk[:split])
+                tokens.append(chunk[split:])
+            else:
+                tokens.append(chunk)
+            sentence_initial = False
+            continue
+        sentence_break = i < last_index and _is_sentence_break(chunk, chunks[i + 1])
+        sentence_count += sentence_break
+        tokens.extend(_split_chunk(chunk, sentence_break or i == last_index, sentence_initial))
+        sentence_initial = sentence_break
+    return sentence_count, tokens
+
+
+@lru_cache(maxsize=1 << 16)
+def _split_chunk_spans(chunk: str, sentence_final: bool, sentence_initial: bool) -> Tuple[Tuple[str, int, int], ...]:
+    """_split_chunk tokens with their (start, end) offsets in chunk."""
+    return tuple(_align_tokens(chunk, _split_chunk(chunk, sentence_final, sentence_initial)))
+
+
+def _regex_span_tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """_regex_tokenize tokens as (token, start, end) spans of text, in one pass over its chunks."""
+    matches = list(_CHUNK.finditer(text))
+    spans = []
+    last_index = len(matches) - 1
+    while last_index > 0 and _is_closing_chunk(matches[last_index].group()):
+        last_index -= 1
+    sentence_initial = True
+    for i, match in enumerate(matches):
+        chunk = match.group()
+        start = match.start()
+        if chunk.isalnum():
+            split = _ALNUM_CONTRACTIONS.get(chunk.lower())
+            if split:
+                spans.append((chunk[:split], start, start + split))
+                spans.append((chunk[split:], start + split, match.end()))
+            else:
+                spans.append((chunk, start, match.end()))
+            sentence_initial = False
+            continue
+        sentence_break = i < last_index and _is_sentence_break(chunk, matches[i + 1].group())
+        spans.extend(
+            (token, start + token_start, start + token_end)
+            for token, token_start, token_end in _split_chunk_spans(chunk, sentence_break or i == last_index, sentence_initial)
+        )
+        sentence_initial = sentence_break
+    return spans
+
+
+def _align_tokens(text: str, tokens: Sequence[str]) -> List[Tuple[str, int, int]]:
+    """
+    Locates word tokens in the text they came from. Treebank only inserts spaces,
+    except that it rewrites double quotes as `` or '', so each token starts at the
+    next non-space character. Tokens that cannot be located are dropped.
+    """
+    spans = []
+    position = 0
+    length = len(text)
+    for token in tokens:
+        while position < length and text[position].isspace():
+            position += 1
+        if text.startswith(token, position):
+            end = position + len(token)
+        elif token in _QUOTE_TOKENS and text.startswith('"', position):
+            end = position + 1
+        elif token == "``" and text.startswith("''", position):
+            end = position + 2
+        else:
+            found = text.find(token, position)
+            if found == -1:
+                continue
+            position, end = found, found + len(token)
+        spans.append((token, position, end))
+        position = end
+    return spans
+
+
+# --- Backend dispatch ---
+
+def _nltk_version() -> Optional[str]:
+    try:
+        return version("nltk")
+    except PackageNotFoundError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _check_nltk_rules_version():
+    """Warns once if the installed NLTK is not the version the regex rules mirror."""
+    installed = _nltk_version()
+    if installed is not None and installed != NLTK_RULES_VERSION:
+        logger.warning(
+            f"The regex tokenizer mirrors the NLTK {NLTK_RULES_VERSION} word rules, but NLTK {installed} is "
+            "installed; tokens may differ from the 'nltk' backend (see scripts/verify_tokenizer.py)."
+        )
+
+
+def _resolve_backend(backend: Optional[str]) -> str:
+    backend = backend or config.TOKENIZER_BACKEND
+    if backend not in TOKENIZER_BACKENDS:
+        raise ValueError(f"Unknown tokenizer backend '{backend}'; expected one of {TOKENIZER_BACKENDS}.")
+    if backend == "regex":
+        _check_nltk_rules_version()
+    return backend
+
+
+def sentence_word_tokenize(text: str, backend: Optional[str] = None) -> Tuple[int, List[str]]:
+    """
+    Returns (sentence count, word tokens) of text as nltk.sent_tokenize and
+    nltk.word_tokenize would. backend defaults to config.TOKENIZER_BACKEND; the
+    'nltk' backend raises LookupError if the 'punkt' data is missing.
+    """
+    if _resolve_backend(backend) == "regex":
+        return _regex_tokenize(text)
+    import nltk # Imported on first use; it dominates the package's import time
+    sentences = nltk.sent_tokenize(text)
+    # Tokenizing each sentence with preserve_line=True matches nltk.word_tokenize(text)
+    tokens = [
+        token
+        for sentence in sentences
+        for token in nltk.word_tokenize(sentence, preserve_line=True)
+    ]
+    return len(sentences), tokens
+
+
+def word_tokenize(text: str, backend: Optional[str] = None) -> List[str]:
+    """Drop-in for nltk.word_tokenize using the configured backend (see sentence_word_tokenize)."""
+    if _resolve_backend(backend) == "regex":
+        return _regex_tokenize(text)[1]
+    import nltk
+    return nltk.word_tokenize(text)
+
+
+def span_tokenize(text: str, backend: Optional[str] = None) -> List[Tuple[str, int, int]]:
+    """
+    word_tokenize tokens as (token, start, end) with text[start:end] the token's surface
+    form (a double quote for `` and ''). The regex backend yields the spans natively;
+    for the nltk backend the tokens are aligned with the text afterwards.
+    """
+    if _resolve_backend(backend) == "regex":
+        return _regex_span_tokenize(text)
+    import nltk
+    return _align_tokens(text, nltk.word_tokenize(text))
+
+
+def compare_tokenizers(
+    texts: Sequence[str],
+    sample_size: Optional[int] = None,
+    seed: int = 0,
+    normalize: bool = False,
+    max_examples: int = 10
+) -> Dict[str, Any]:
+    """
+    Verification mode for the regex backend: tokenizes a random sample of texts with
+    both backends and diffs the alphanumeric tokens (what every caller keeps) and the
+    sentence counts. With normalize=True texts go through normalize_text first, as
+    analyze_texts does. Requires the NLTK 'punkt' data.
+    """
+    indices = list(range(len(texts)))
+    if sample_size is not None and sample_size < len(indices):
+        indices = sorted(random.Random(seed).sample(indices, sample_size))
+
+    report = {
+        "nltk_version": _nltk_version(),
+        "regex_rules_version": NLTK_RULES_VERSION,
+        "texts_compared": 0,
+        "texts_with_token_diffs": 0,
+        "texts_with_sentence_count_diffs": 0,
+        "nltk_tokens": 0,
+        "regex_tokens": 0,
+        "differing_tokens": 0,
+        "examples": [],
+    }
+    for index in indices:
+        text = texts[index]
+        if not isinstance(text, str) or not text.strip():
+            continue
+        if normalize:
+            text = normalize_text(text)
+        nltk_sentences, nltk_tokens = sentence_word_tokenize(text, "nltk")
+        regex_sentences, regex_tokens = sentence_word_tokenize(text, "regex")
+        nltk_tokens = [token for token in nltk_tokens if token.isalnum()]
+        regex_tokens = [token for token in regex_tokens if token.isalnum()]
+
+        report["texts_compared"] += 1
+        report["nltk_tokens"] += len(nltk_tokens)
+        report["regex_tokens"] += len(regex_tokens)
+        report["texts_with_sentence_count_diffs"] += nltk_sentences != regex_sentences
+        if nltk_tokens == regex_tokens:
+            continue
+        report["texts_with_token_diffs"] += 1
+        matcher = difflib.SequenceMatcher(None, nltk_tokens, regex_tokens, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            report["differing_tokens"] += max(i2 - i1, j2 - j1)
+            if len(report["examples"]) < max_examples:
+                report["examples"].append({
+                    "text_index": index,
+                    "nltk": nltk_tokens[max(0, i1 - 3):i2 + 3],
+                    "regex": regex_tokens[max(0, j1 - 3):j2 + 3],
+                })
+
+    report["token_agreement"] = (
+        round(1 - report["differing_tokens"] / report["nltk_tokens"], 6) if report["nltk_tokens"] else 1.0
+    )
+    return report
+
+
+def tokenize_text(
+    text: str,
+    stop_words: Set[str],
+    min_length: int = config.WORD_MIN_LENGTH
+) -> TokenizedText:
+    """
+    Derives every token stream used by analyze_texts from one call per text.
+    The word list and n-gram tokens come from the normalized text. The complexity
+    tokens and sentence count come from the raw text, and the slop tokens from
+    text.lower(), as calculate_complexity_index and calculate_slop_index_new
+    tokenize them: Punkt's sentence splitting depends on capitalization, so the
+    scores would otherwise shift from earlier runs. The slop tokens reuse the
+    normalized tokens when lowercasing alone gives the normalized text.
+    """
+    if not isinstance(text, str):
+        return TokenizedText([], [], [], [], 0, 0)
+
+    normalized_text = normalize_text(text)
+    words = extract_words(normalized_text, min_length)
+    lower_text = text.lower()
+
+    try:
+        raw_tokens = word_tokenize(normalized_text)
+        sentence_count, text_tokens = sentence_word_tokenize(text)
+        lower_tokens = raw_tokens if lower_text == normalized_text else word_tokenize(lower_text)
+        metric_tokens = [token for token in text_tokens if token.isalnum()]
+        slop_tokens = [token for token in lower_tokens if token.isalnum()]
+    except LookupError:
+        logger.warning("NLTK 'punkt' tokenizer not found. Using basic splitting for tokenization.")
+        raw_tokens = normalized_text.split()
+        sentence_count = len([s for s in text.split('.') if s])
+        metric_tokens = [w.strip(string.punctuation) for w in text.split() if w.strip(string.punctuation)]
+        slop_tokens = re.findall(r'\b\w+\b', lower_text)
+
+    ngram_tokens = _ngram_filter(raw_tokens, stop_words)
+
+    return TokenizedText(words, ngram_tokens, metric_tokens, slop_tokens, sentence_count, len(text))
+
+
+def _ngram_filter(tokens: List[str], stop_words: Set[str]) -> List[str]:
+    return [token for token in tokens if token.isalpha() and token not in stop_words]
+
+
+def tokenize_ngrams(text: str, stop_words: Set[str]) -> List[str]:
+    """
+    The ngram_tokens of tokenize_text(text) alone: one word tokenization of the
+    normalized text, without the word list, sentence count or metric tokens.
+    """
+    if not isinstance(text, str):
+        return []
+    normalized_text = normalize_text(text)
+    try:
+        raw_tokens = word_tokenize(normalized_text)
+    except LookupError:
+        raw_tokens = normalized_text.split()
+    return _ngram_filter(raw_tokens, stop_words)
@@ -1,9 +1,10 @@
 import json
+import hashlib
 import logging
 import os
 import re
 import unicodedata
-from typing import List, Dict, Any, Set, Tuple, Union, Counter as TypingCounter
+from typing import List, Dict, Any, Set, Tuple, Union, Iterator, Counter as TypingCounter
 from collections import Counter
 
 from .constants import WORD_PATTERN
@@ -40,12 +41,11 @@ def save_json_file(data: Union[Dict, List], filename: str, indent: int = 2):
         logger.error(f"Data is not JSON serializable for file {filename}: {e}", exc_info=True)
 
 
-def load_jsonl_file(filename: str, max_items: int = -1) -> List[Dict]:
-    """Loads data from a JSON Lines file."""
-    data = []
+def iter_jsonl_file(filename: str, max_items: int = -1) -> Iterator[Dict]:
+    """Lazily yields items from a JSON Lines file, one line at a time."""
     if not os.path.exists(filename):
         logger.warning(f"JSONL file not found: {filename}")
-        return data
+        return
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             for i, line in enumerate(f):
@@ -55,12 +55,71 @@ def load_jsonl_file(filename: str, max_items: int = -1) -> List[Dict]:
                 line = line.strip()
                 if line:
                     try:
-                        data.append(json.loads(line))
+                        yield json.loads(line)
                     except json.JSONDecodeError:
                         logger.warning(f"Skipping invalid JSON line {i+1} in {filename}: {line}")
-        logger.debug(f"Loaded {len(data)} items from {filename}.")
     except IOError as e:
         logger.error(f"Error reading JSONL file {filename}: {e}", exc_info=True)
+
+class JsonlTailReader:
+    """
+    Iterates the items of a JSON Lines file starting at a byte offset, for
+    append-only files that are read incrementally. Only newline-terminated lines
+    are consumed, so a line still being written is left for the next read.
+    After iteration, `offset` is the byte offset to resume from and `lines_read`
+    the number of lines consumed (blank and invalid lines included).
+    """
+
+    def __init__(self, filename: str, start_offset: int = 0, max_lines: int = -1):
+        self.filename = filename
+        self.offset = start_offset
+        self.max_lines = max_lines
+        self.lines_read = 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        if not os.path.exists(self.filename):
+            logger.warning(f"JSONL file not found: {self.filename}")
+            return
+        try:
+            with open(self.filename, 'rb') as f:
+                f.seek(self.offset)
+                for raw_line in f:
+                    if self.max_lines >= 0 and self.lines_read >= self.max_lines:
+                        break
+                    if not raw_line.endswith(b'\n'):
+                        logger.debug(f"Leaving incomplete last line of {self.filename} for a later read.")
+                        break
+                    self.offset += len(raw_line)
+                    self.lines_read += 1
+                    try:
+                        # A start offset inside a multibyte character leaves a partial first line that does not decode
+                        line = raw_line.decode('utf-8').strip()
+                        item = json.loads(line) if line else None
+                    except (UnicodeDecodeError, json.JSONDecodeError):
+                        logger.warning(f"Skipping invalid JSON line at byte {self.offset - len(raw_line)} in {self.filename}: {raw_line.decode('utf-8', errors='replace').strip()}")
+                        continue
+                    if line:
+                        yield item
+        except IOError as e:
+            logger.error(f"Error reading JSONL file {self.filename}: {e}", exc_info=True)
+
+def file_fingerprint(filename: str, sample_size: int = 65536) -> str:
+    """
+    Cheap change detector for large files: hashes the size, mtime and three
+    sample_size blocks (start, middle, end) instead of the whole content.
+    """
+    stat = os.stat(filename)
+    digest = hashlib.blake2b(f"{stat.st_size}:{stat.st_mtime_ns}".encode(), digest_size=16)
+    with open(filename, 'rb') as f:
+        for position in sorted({0, max(stat.st_size // 2 - sample_size // 2, 0), max(stat.st_size - sample_size, 0)}):
+            f.seek(position)
+            digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+def load_jsonl_file(filename: str, max_items: int = -1) -> List[Dict]:
+    """Loads data from a JSON Lines file."""
+    data = list(iter_jsonl_file(filename, max_items))
+    logger.debug(f"Loaded {len(data)} items from {filename}.")
     return data
 
 def save_jsonl_file(data: List[Dict], filename: str):
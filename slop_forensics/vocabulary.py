@@ -0,0 +1,417 @@
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# N-grams of up to MAX_PACKED_N token IDs are packed into one int64 key,
+# NGRAM_ID_BITS bits per token (2,097,152 distinct tokens; 63 bits for a trigram).
+NGRAM_ID_BITS = 21
+MAX_NGRAM_VOCAB = 1 << NGRAM_ID_BITS
+MAX_PACKED_N = 3
+_ID_MASK = MAX_NGRAM_VOCAB - 1
+
+
+class Vocabulary:
+    """Interns tokens to dense int IDs (0, 1, 2, ... in first-seen order)."""
+
+    def __init__(self, tokens: Iterable[str] = ()):
+        self._ids: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        for token in tokens:
+            self.intern(token)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._ids
+
+    @property
+    def tokens(self) -> List[str]:
+        return self._tokens
+
+    def intern(self, token: str) -> int:
+        token_id = self._ids.get(token)
+        if token_id is None:
+            token_id = len(self._tokens)
+            self._ids[token] = token_id
+            self._tokens.append(token)
+        return token_id
+
+    def get(self, token: str, default: int = -1) -> int:
+        return self._ids.get(token, default)
+
+    def encode(self, tokens: Iterable[str]) -> np.ndarray:
+        """Interns a token sequence and returns its IDs as an int32 array."""
+        intern = self.intern
+        return np.fromiter((intern(token) for token in tokens), dtype=np.int32)
+
+    def lookup(self, tokens: Iterable[str]) -> np.ndarray:
+        """IDs of a token sequence as an int32 array, without interning: unknown tokens get -1."""
+        get = self._ids.get
+        return np.fromiter((get(token, -1) for token in tokens), dtype=np.int32)
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        tokens = self._tokens
+        return [tokens[i] for i in ids]
+
+    def remap_from(self, other: "Vocabulary") -> np.ndarray:
+        """
+        Interns every token of other (in its ID order) and returns an array mapping
+        other's IDs to IDs in this vocabulary.
+        """
+        return np.fromiter((self.intern(token) for token in other.tokens), dtype=np.int64, count=len(other))
+
+
+# --- N-gram packing ---
+
+def pack_ngrams(ids: np.ndarray, n: int) -> np.ndarray:
+    """Packs every length-n window of a token-ID sequence into one int64 key."""
+    if n > MAX_PACKED_N:
+        raise ValueError(f"Cannot pack {n}-grams into int64 keys (max {MAX_PACKED_N}).")
+    num_windows = len(ids) - n + 1
+    if num_windows <= 0:
+        return np.empty(0, dtype=np.int64)
+    ids = ids.astype(np.int64, copy=False)
+    keys = ids[:num_windows].copy()
+    for offset in range(1, n):
+        keys <<= NGRAM_ID_BITS
+        keys |= ids[offset:offset + num_windows]
+    return keys
+
+
+def pack_known_ngrams(ids: np.ndarray, n: int) -> np.ndarray:
+    """pack_ngrams over the windows without an unknown (-1) ID, as returned by Vocabulary.lookup."""
+    unknown = ids < 0
+    if not unknown.any():
+        return pack_ngrams(ids, n)
+    if len(ids) < n:
+        return np.empty(0, dtype=np.int64)
+    has_unknown = np.convolve(unknown.astype(np.int32), np.ones(n, dtype=np.int32), mode="valid") > 0
+    return pack_ngrams(np.where(unknown, 0, ids), n)[~has_unknown]
+
+
+def unpack_ngrams(keys: np.ndarray, n: int) -> np.ndarray:
+    """Inverse of pack_ngrams: returns a (len(keys), n) array of token IDs."""
+    keys = np.asarray(keys, dtype=np.int64)
+    columns = [(keys >> (NGRAM_ID_BITS * (n - 1 - position))) & _ID_MASK for position in range(n)]
+    return np.stack(columns, axis=1) if len(keys) else np.empty((0, n), dtype=np.int64)
+
+
+def remap_ngram_keys(keys: np.ndarray, n: int, id_map: np.ndarray) -> np.ndarray:
+    """Re-packs n-gram keys after translating their token IDs through id_map."""
+    if not len(keys):
+        return np.empty(0, dtype=np.int64)
+    remapped = id_map[unpack_ngrams(keys, n)]
+    packed = remapped[:, 0].astype(np.int64)
+    for position in range(1, n):
+        packed <<= NGRAM_ID_BITS
+        packed |= remapped[:, position]
+    return packed
+
+
+# --- Array-backed count stores ---
+
+class DenseCounter:
+    """Counts indexed directly by dense int IDs, stored in a growable int64 array."""
+
+    def __init__(self):
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._counts))
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts
+
+    def _ensure_size(self, size: int):
+        if size > len(self._counts):
+            grown = np.zeros(max(size, 2 * len(self._counts)), dtype=np.int64)
+            grown[:len(self._counts)] = self._counts
+            self._counts = grown
+
+    def add(self, ids: np.ndarray, weights: Optional[np.ndarray] = None):
+        if not len(ids):
+            return
+        self._ensure_size(int(ids.max()) + 1)
+        np.add.at(self._counts, ids, 1 if weights is None else weights)
+
+    def items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, counts) for every ID with a non-zero count, in ID order."""
+        ids = np.flatnonzero(self._counts)
+        return ids, self._counts[ids]
+
+
+def _locate(sorted_keys: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Insertion points of keys in sorted_keys, and whether each key is already there."""
+    positions = np.searchsorted(sorted_keys, keys)
+    found = np.zeros(len(keys), dtype=bool)
+    inside = positions < len(sorted_keys)
+    found[inside] = sorted_keys[positions[inside]] == keys[inside]
+    return positions, found
+
+
+class ArrayCounter:
+    """
+    Counts sparse int64 keys (e.g. packed n-grams) in bulk.
+    Keys are kept as a sorted unique array with parallel counts; incoming keys
+    are buffered, and once flush_threshold is reached the buffer alone is
+    counted with np.unique and merged into the table by position, so the table
+    itself is never re-sorted.
+    """
+
+    def __init__(self, flush_threshold: int = 1 << 20):
+        self.flush_threshold = flush_threshold
+        self._keys = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._pending_keys: List[np.ndarray] = []
+        self._pending_counts: List[np.ndarray] = []
+        self._pending_size = 0
+
+    def __len__(self) -> int:
+        self._compact()
+        return len(self._keys)
+
+    def __getstate__(self):
+        self._compact()
+        return self.__dict__
+
+    def add(self, keys: np.ndarray, counts: Optional[np.ndarray] = None):
+        if not len(keys):
+            return
+        self._pending_keys.append(keys)
+        self._pending_counts.append(np.ones(len(keys), dtype=np.int64) if counts is None else counts)
+        self._pending_size += len(keys)
+        if self._pending_size >= self.flush_threshold:
+            self._compact()
+
+    def _compact(self):
+        if not self._pending_keys:
+            return
+        run_keys, inverse = np.unique(np.concatenate(self._pending_keys), return_inverse=True)
+        run_counts = np.bincount(
+            inverse, weights=np.concatenate(self._pending_counts), minlength=len(run_keys)
+        ).astype(np.int64)
+        positions, found = _locate(self._keys, run_keys)
+        self._counts[positions[found]] += run_counts[found]
+        new = ~found
+        if new.any():
+            self._keys = np.insert(self._keys, positions[new], run_keys[new])
+            self._counts = np.insert(self._counts, positions[new], run_counts[new])
+        self._pending_keys = []
+        self._pending_counts = []
+        self._pending_size = 0
+
+    def items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(keys, counts), sorted by key."""
+        self._compact()
+        return self._keys, self._counts
+
+    def get(self, keys: np.ndarray) -> np.ndarray:
+        """Counts for the given keys (0 for unseen keys)."""
+        self._compact()
+        positions, found = _locate(self._keys, keys)
+        counts = np.zeros(len(keys), dtype=np.int64)
+        counts[found] = self._counts[positions[found]]
+        return counts
+
+    def merge(self, other: "ArrayCounter"):
+        keys, counts = other.items()
+        self.add(keys, counts)
+
+
+class UngroupedDocumentsError(ValueError):
+    """A grouped DocumentFrequency was given a document after a later one had started."""
+
+
+def _unique_pairs(keys: np.ndarray, doc_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct (key, doc_id) pairs, sorted by key then doc_id."""
+    order = np.lexsort((doc_ids, keys))
+    keys = keys[order]
+    doc_ids = doc_ids[order]
+    distinct = np.ones(len(keys), dtype=bool)
+    distinct[1:] = (keys[1:] != keys[:-1]) | (doc_ids[1:] != doc_ids[:-1])
+    return keys[distinct], doc_ids[distinct]
+
+
+class DocumentFrequency:
+    """
+    Exact document frequency (e.g. number of distinct prompts) per int64 key.
+
+    With grouped=True, each document's keys must arrive together: doc IDs never
+    decrease from one add to the next (true when documents are interned in
+    first-seen order and their texts are contiguous; anything else raises
+    UngroupedDocumentsError). A key then only needs its count and the last doc
+    it was seen in, plus the first one so tables over consecutive stretches of
+    input can be merged: 20 bytes per key, however many documents it is in. Keys
+    are one sorted array with parallel arrays; each flushed buffer is sorted on
+    its own and merged in by position.
+
+    With grouped=False any order works, at the cost of storing every distinct
+    (key, doc_id) pair (12 bytes each). Pairs are kept in sorted runs; a flushed
+    buffer becomes a new run, and runs are merged only with runs of similar size,
+    so each pair is re-sorted O(log n) times rather than on every flush.
+    """
+
+    def __init__(self, grouped: bool = True, flush_threshold: int = 1 << 20):
+        self.grouped = grouped
+        self.flush_threshold = flush_threshold
+        # Grouped mode
+        self._keys = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int32)
+        self._first_docs = np.empty(0, dtype=np.int32)
+        self._last_docs = np.empty(0, dtype=np.int32)
+        self._last_doc = -1 # Latest doc ID added, to enforce grouping
+        # Ungrouped mode: sorted (keys, doc_ids) runs, largest first
+        self._runs: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._pending_keys: List[np.ndarray] = []
+        self._pending_doc_ids: List[np.ndarray] = []
+        self._pending_size = 0
+
+    def __len__(self) -> int:
+        """Number of distinct keys."""
+        return len(self.counts()[0])
+
+    def __getstate__(self):
+        self._compact()
+        return self.__dict__
+
+    def add(self, keys: np.ndarray, doc_id: int):
+        """Records that every key in keys occurs in document doc_id."""
+        if not len(keys):
+            return
+        self.add_pairs(keys, np.full(len(keys), doc_id, dtype=np.int32))
+
+    def add_pairs(self, keys: np.ndarray, doc_ids: np.ndarray):
+        """Records (key, doc_id) pairs; in grouped mode doc_ids must be non-decreasing and continue from the last add."""
+        if not len(keys):
+            return
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        if self.grouped:
+            if doc_ids[0] < self._last_doc or (len(doc_ids) > 1 and np.any(doc_ids[1:] < doc_ids[:-1])):
+                raise UngroupedDocumentsError("Documents must arrive grouped (non-decreasing doc IDs) in grouped mode.")
+            self._last_doc = int(doc_ids[-1])
+        self._pending_keys.append(np.asarray(keys, dtype=np.int64))
+        self._pending_doc_ids.append(doc_ids)
+        self._pending_size += len(keys)
+        if self._pending_size >= self.flush_threshold:
+            self._compact()
+
+    def _compact(self):
+        if not self._pending_keys:
+            return
+        keys = np.concatenate(self._pending_keys)
+        doc_ids = np.concatenate(self._pending_doc_ids)
+        self._pending_keys = []
+        self._pending_doc_ids = []
+        self._pending_size = 0
+        if not self.grouped:
+            self._push_run(*_unique_pairs(keys, doc_ids))
+            return
+        # Docs are non-decreasing in arrival order, so a stable sort by key keeps each key's docs in order
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        doc_ids = doc_ids[order]
+        new_key = np.ones(len(keys), dtype=bool)
+        new_key[1:] = keys[1:] != keys[:-1]
+        new_doc = new_key.copy()
+        new_doc[1:] |= doc_ids[1:] != doc_ids[:-1]
+        starts = np.flatnonzero(new_key)
+        ends = np.append(starts[1:], len(keys)) - 1
+        self._merge_table(
+            keys[starts], np.add.reduceat(new_doc.astype(np.int32), starts), doc_ids[starts], doc_ids[ends]
+        )
+
+    def _merge_table(self, keys: np.ndarray, counts: np.ndarray, first_docs: np.ndarray, last_docs: np.ndarray):
+        """Grouped mode: folds in per-key stats of documents that come at or after this table's last doc."""
+        positions, found = _locate(self._keys, keys)
+        at = positions[found]
+        # A key whose last doc continues into the new stretch would otherwise count that doc twice
+        self._counts[at] += counts[found] - (self._last_docs[at] == first_docs[found])
+        self._last_docs[at] = last_docs[found]
+        new = ~found
+        if new.any():
+            insert_at = positions[new]
+            self._keys = np.insert(self._keys, insert_at, keys[new])
+            self._counts = np.insert(self._counts, insert_at, counts[new])
+            self._first_docs = np.insert(self._first_docs, insert_at, first_docs[new])
+            self._last_docs = np.insert(self._last_docs, insert_at, last_docs[new])
+
+    def _push_run(self, keys: np.ndarray, doc_ids: np.ndarray):
+        """Ungrouped mode: adds a sorted run, merging while the previous run is not much larger."""
+        self._runs.append((keys, doc_ids))
+        while len(self._runs) > 1 and len(self._runs[-2][0]) <= 2 * len(self._runs[-1][0]):
+            (keys_a, docs_a), (keys_b, docs_b) = self._runs.pop(), self._runs.pop()
+            self._runs.append(_unique_pairs(np.concatenate([keys_b, keys_a]), np.concatenate([docs_b, docs_a])))
+
+    def _merged_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Ungrouped mode: all runs merged into one."""
+        self._compact()
+        if not self._runs:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        if len(self._runs) > 1:
+            keys, doc_ids = zip(*self._runs)
+            self._runs = [_unique_pairs(np.concatenate(keys), np.concatenate(doc_ids))]
+        return self._runs[0]
+
+    def counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(keys, document frequencies), sorted by key."""
+        if self.grouped:
+            self._compact()
+            return self._keys, self._counts
+        return np.unique(self._merged_pairs()[0], return_counts=True)
+
+    def get(self, keys: np.ndarray) -> np.ndarray:
+        """Document frequency for each of keys (0 for unseen keys)."""
+        keys = np.asarray(keys, dtype=np.int64)
+        if self.grouped:
+            self._compact()
+            positions, found = _locate(self._keys, keys)
+            frequencies = np.zeros(len(keys), dtype=np.int64)
+            frequencies[found] = self._counts[positions[found]]
+            return frequencies
+        pair_keys = self._merged_pairs()[0]
+        return np.searchsorted(pair_keys, keys, side='right') - np.searchsorted(pair_keys, keys, side='left')
+
+    def merge(
+        self,
+        other: "DocumentFrequency",
+        map_keys: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        doc_map: Optional[np.ndarray] = None
+    ):
+        """
+        Folds in another table of the same mode, translating its keys with map_keys
+        (which must not merge distinct keys) and its doc IDs through doc_map. In
+        grouped mode other must cover the input that follows this table's: its docs
+        start no earlier than this table's last doc.
+        """
+        if self.grouped != other.grouped:
+            raise ValueError("Cannot merge grouped and ungrouped document frequency tables.")
+        other._compact()
+        if not self.grouped:
+            keys, doc_ids = other._merged_pairs()
+            keys = map_keys(keys) if map_keys is not None else keys
+            doc_ids = doc_map[doc_ids].astype(np.int32) if doc_map is not None else doc_ids
+            self._compact()
+            if len(keys):
+                self._push_run(*_unique_pairs(keys, doc_ids))
+            return
+
+        keys, counts, first_docs, last_docs = other._keys, other._counts, other._first_docs, other._last_docs
+        other_last_doc = other._last_doc
+        if doc_map is not None:
+            first_docs = doc_map[first_docs].astype(np.int32)
+            last_docs = doc_map[last_docs].astype(np.int32)
+            other_last_doc = int(doc_map[other_last_doc]) if other_last_doc >= 0 else -1
+        if len(first_docs) and int(first_docs.min()) < self._last_doc:
+            raise UngroupedDocumentsError("Merged table has documents from before this table's last document.")
+        if map_keys is not None:
+            keys = map_keys(keys)
+            order = np.argsort(keys)
+            keys, counts, first_docs, last_docs = keys[order], counts[order], first_docs[order], last_docs[order]
+        self._compact()
+        self._merge_table(keys, counts, first_docs, last_docs)
+        self._last_doc = max(self._last_doc, other_last_doc)
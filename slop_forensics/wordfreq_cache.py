@@ -0,0 +1,122 @@
+import os
+import logging
+import sqlite3
+from importlib.metadata import version, PackageNotFoundError
+from typing import Dict, Iterable, List, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_QUERY_CHUNK_SIZE = 500
+
+# In-process layer on top of the on-disk cache: {(lang, word): freq}
+_memory_cache: Dict[tuple, float] = {}
+
+
+def _wordfreq_version() -> str:
+    try:
+        return version("wordfreq")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+WORDFREQ_VERSION = _wordfreq_version()
+
+
+def _connect(cache_file: str) -> sqlite3.Connection:
+    """Opens (creating if needed) the frequency cache database."""
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir: # A bare filename lives in the working directory
+        os.makedirs(cache_dir, exist_ok=True)
+    conn = sqlite3.connect(cache_file, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS word_frequencies ("
+        " word TEXT NOT NULL, lang TEXT NOT NULL, version TEXT NOT NULL, freq REAL NOT NULL,"
+        " PRIMARY KEY (word, lang, version)) WITHOUT ROWID"
+    )
+    return conn
+
+
+def _lookup_cached(conn: sqlite3.Connection, words: List[str], lang: str) -> Dict[str, float]:
+    found = {}
+    for i in range(0, len(words), _QUERY_CHUNK_SIZE):
+        chunk = words[i:i + _QUERY_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT word, freq FROM word_frequencies WHERE lang = ? AND version = ? AND word IN ({placeholders})",
+            [lang, WORDFREQ_VERSION, *chunk]
+        )
+        found.update(rows)
+    return found
+
+
+def get_word_frequencies(
+    words: Iterable[str],
+    lang: str = 'en',
+    cache_file: Optional[str] = config.WORDFREQ_CACHE_FILE
+) -> Dict[str, float]:
+    """
+    Bulk wordfreq lookup backed by a persistent SQLite cache.
+    Entries are keyed by (word, lang, wordfreq version), so upgrading wordfreq
+    invalidates them. Only words missing from the cache are passed to wordfreq.
+    Words whose lookup raises are reported as 0.0 and not cached.
+    Set cache_file to None to use the in-process cache only.
+    """
+    result = {}
+    missing = []
+    for word in set(words):
+        key = (lang, word)
+        if key in _memory_cache:
+            result[word] = _memory_cache[key]
+        else:
+            missing.append(word)
+
+    if not missing:
+        return result
+
+    conn = None
+    if cache_file:
+        try:
+            conn = _connect(cache_file)
+            cached = _lookup_cached(conn, missing, lang)
+            for word, freq in cached.items():
+                _memory_cache[(lang, word)] = freq
+            result.update(cached)
+            missing = [word for word in missing if word not in cached]
+            logger.debug(f"wordfreq cache: {len(cached)} hits, {len(missing)} misses ({cache_file})")
+        except (sqlite3.Error, OSError) as e:
+            # e.g. a corrupt database or a read-only / missing cache directory
+            logger.warning(f"Could not read wordfreq cache {cache_file}: {e}. Falling back to wordfreq.")
+            if conn is not None:
+                conn.close()
+            conn = None
+
+    from wordfreq import word_frequency # Imported on first miss; loading wordfreq is slow
+    new_entries = []
+    for word in missing:
+        try:
+            freq = word_frequency(word, lang)
+        except Exception as e:
+            logger.warning(f"Error fetching word frequency for '{word}': {e}")
+            result[word] = 0.0 # Assign 0 if error
+            continue
+        result[word] = freq
+        _memory_cache[(lang, word)] = freq
+        new_entries.append((word, lang, WORDFREQ_VERSION, freq))
+
+    if conn is not None:
+        try:
+            if new_entries:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO word_frequencies (word, lang, version, freq) VALUES (?, ?, ?, ?)",
+                        new_entries
+                    )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not write wordfreq cache {cache_file}: {e}")
+        finally:
+            conn.close()
+
+    return result
@@ -0,0 +1,96 @@
+import os
+import sys
+import logging
+
+import numpy as np
+import pytest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "benchmarks"))
+
+from slop_forensics import analysis, config
+from slop_forensics.vocabulary import Vocabulary, pack_known_ngrams, pack_ngrams
+from synthetic_corpus import generate_texts
+
+
+@pytest.fixture(autouse=True)
+def offline_analysis(monkeypatch):
+    # The regex backend and no cache files need no NLTK data or results dir
+    monkeypatch.setattr(config, "TOKENIZER_BACKEND", "regex")
+    monkeypatch.setattr(config, "WORDFREQ_CACHE_FILE", None)
+    monkeypatch.setattr(config, "SYLLABLE_TABLE_FILE", None)
+
+
+@pytest.fixture(scope="module")
+def texts_with_ids():
+    return generate_texts(200, 20, seed=1)
+
+
+def test_two_pass_matches_single_pass(texts_with_ids):
+    single_pass = analysis.analyze_texts("m", texts_with_ids, two_pass_ngrams=False)
+    two_pass = analysis.analyze_texts("m", texts_with_ids, two_pass_ngrams=True)
+    assert two_pass["top_bigrams"] == single_pass["top_bigrams"]
+    assert two_pass["top_trigrams"] == single_pass["top_trigrams"]
+
+
+def test_two_pass_verify_does_not_intern_tokens(texts_with_ids):
+    state = analysis.build_analysis_state(texts_with_ids, two_pass_ngrams=True)
+    state.text_source = lambda: texts_with_ids
+    expected = state.top_ngrams(2, 50, 2)
+    vocab_size = len(state.token_vocab)
+    # The source changed since counting: new words must not grow the vocabulary or form n-grams
+    state.text_source = lambda: [(f"zyxwv qutsr {text} ponml", prompt_id) for text, prompt_id in texts_with_ids]
+    state._verified_ngrams = {}
+    assert state.top_ngrams(2, 50, 2) == expected
+    assert len(state.token_vocab) == vocab_size
+
+
+def test_two_pass_warns_for_one_shot_iterables(texts_with_ids, caplog):
+    with caplog.at_level(logging.WARNING, logger=analysis.logger.name):
+        analysis.analyze_texts("m", iter(texts_with_ids), two_pass_ngrams=True)
+    assert "Two-pass n-gram selection re-reads the texts" in caplog.text
+
+
+def test_pack_known_ngrams_skips_windows_with_unknown_tokens():
+    vocab = Vocabulary(["a", "b", "c"])
+    ids = vocab.lookup(["a", "b", "x", "c", "a", "b"])
+    assert ids.tolist() == [0, 1, -1, 2, 0, 1]
+    assert "x" not in vocab
+    expected = pack_ngrams(np.array([2, 0, 1], dtype=np.int32), 2).tolist()
+    assert pack_known_ngrams(ids, 2).tolist() == pack_ngrams(np.array([0, 1], dtype=np.int32), 2).tolist() + expected
+    assert pack_known_ngrams(ids, 3).tolist() == pack_ngrams(np.array([2, 0, 1], dtype=np.int32), 3).tolist()
+
+
+def test_text_metrics_tokenize_like_the_original_scores(texts_with_ids):
+    from slop_forensics.metrics import calculate_complexity_index, slop_tokens
+    texts = [
+        text.replace(". ", ".\n\n", 3).title() for text, _prompt_id in texts_with_ids[:20]
+    ] + ["Mr. Smith’s  HAT. It was   gone!\nWas it?"]
+    state = analysis.AnalysisState(per_text_metrics=True, prompts_grouped=False)
+    for index, text in enumerate(texts):
+        state.add_text(text, str(index))
+        # The complexity metric reads the raw text and the slop index the lowercased text, not the normalized one
+        assert state.text_complexity[-1] == calculate_complexity_index(text)
+        tokenized = analysis.tokenize_text(text, frozenset())
+        assert tokenized.slop_tokens == slop_tokens(text)
+
+
+def test_sentences_are_split_on_the_raw_text(monkeypatch):
+    from slop_forensics import tokenization
+    split_texts = []
+    sentence_word_tokenize = tokenization.sentence_word_tokenize
+
+    def recording_sentence_word_tokenize(text, backend=None):
+        split_texts.append(text)
+        return sentence_word_tokenize(text, backend)
+
+    monkeypatch.setattr(tokenization, "sentence_word_tokenize", recording_sentence_word_tokenize)
+    text = "Mr. Smith’s  HAT. It was   gone!\nWas it?"
+    tokenized = tokenization.tokenize_text(text, frozenset())
+    # Punkt relies on capitalization, so it must see the text before normalize_text lowercases it
+    assert split_texts == [text]
+    assert tokenized.metric_tokens == ["Smith", "s", "HAT", "It", "was", "gone", "Was", "it"]
+    assert tokenized.slop_tokens == ["smith", "s", "hat", "it", "was", "gone", "was", "it"]
+    assert tokenized.ngram_tokens == ["smith", "hat", "it", "was", "gone", "was", "it"]
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "benchmarks"))
+
+from slop_forensics import config, slop_lists
+from slop_forensics.spill import SpillingCounter
+from slop_forensics.utils import save_json_file, sanitize_filename
+from synthetic_corpus import write_model_datasets
+
+OUTPUT_FILES = ["slop_list.json", "slop_list_phrases.jsonl", "slop_list_bigrams.json", "slop_list_trigrams.json"]
+
+
+@pytest.fixture
+def analysis_dir(tmp_path, monkeypatch):
+    # The regex backend, a fixed stopword list and no wordfreq cache file need no NLTK data or results dir
+    monkeypatch.setattr(config, "TOKENIZER_BACKEND", "regex")
+    monkeypatch.setattr(config, "WORDFREQ_CACHE_FILE", None)
+    monkeypatch.setattr(config, "SLOP_PHRASES_MAX_PROCESSES", 1)
+    monkeypatch.setattr(slop_lists, "_phrase_stop_words", lambda: frozenset({"the", "a", "of", "and", "to", "in"}))
+    dataset_dir = tmp_path / "datasets"
+    monkeypatch.setattr(config, "DATASET_OUTPUT_DIR", str(dataset_dir))
+    analysis_dir = tmp_path / "analysis"
+    # No word count tables, so the words are counted from the datasets
+    for model_name in write_model_datasets(str(dataset_dir), 3, 80, 10, seed=5):
+        save_json_file({"model_name": model_name}, str(analysis_dir / f"slop_profile__{sanitize_filename(model_name)}.json"))
+    return analysis_dir
+
+
+def _create(analysis_dir, output_dir, **kwargs):
+    os.makedirs(output_dir)
+    slop_lists.create_slop_lists(str(analysis_dir), str(output_dir), max_items_per_model=60, **kwargs)
+    outputs = {}
+    for filename in OUTPUT_FILES:
+        with open(os.path.join(output_dir, filename), encoding="utf-8") as f:
+            outputs[filename] = f.read()
+    return outputs
+
+
+def test_small_memory_budget_spills_and_matches(analysis_dir, tmp_path, monkeypatch):
+    # Spilled counts break ties by key, so keep every n-gram rather than a top k cut inside a tie
+    monkeypatch.setattr(config, "SLOP_PHRASES_TOP_NGRAMS", 10 ** 6)
+    unbounded = _create(analysis_dir, tmp_path / "unbounded")
+
+    spilling_counters = []
+    spill = SpillingCounter._spill
+
+    def recording_spill(self):
+        # Holding the counters keeps their ids unique
+        spilling_counters.append(self)
+        spill(self)
+
+    monkeypatch.setattr(SpillingCounter, "_spill", recording_spill)
+    bounded = _create(analysis_dir, tmp_path / "bounded", memory_budget=32 * 1024)
+    # Both the word counts and the phrase n-gram counts spilled to disk
+    assert len(set(map(id, spilling_counters))) == 2
+    assert bounded == unbounded
+    assert unbounded["slop_list_phrases.jsonl"]
+
+
+def test_texts_are_streamed_from_the_datasets(analysis_dir, tmp_path, monkeypatch):
+    phrase_texts = []
+    monkeypatch.setattr(slop_lists, "extract_and_save_slop_phrases", lambda texts, **kwargs: phrase_texts.append(texts))
+    slop_lists.create_slop_lists(str(analysis_dir), str(tmp_path), max_items_per_model=60)
+    texts, = phrase_texts
+    assert isinstance(texts, slop_lists.DatasetTexts)
+    # Re-iterable, reading max_items_per_model texts from each dataset per pass
+    assert len(list(texts)) == len(list(texts)) == 3 * 60
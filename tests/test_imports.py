@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "benchmarks"))
+
+from run_benchmarks import IMPORT_MODULES, LAZY_DEPENDENCIES, time_import
+
+# Far above the benchmark's --import-budget default, so only a regression (not a slow CI machine) fails
+IMPORT_BUDGET_S = 5.0
+
+
+@pytest.mark.parametrize("module", IMPORT_MODULES)
+def test_import_is_fast_and_lazy(module):
+    # Each import runs in a fresh interpreter, so nothing is cached from this process
+    timing = time_import(module, repeat=1)
+    assert timing["eager_dependencies"] == [], f"{module} loaded {timing['eager_dependencies']} (see LAZY_DEPENDENCIES: {LAZY_DEPENDENCIES})"
+    assert timing["min_s"] < IMPORT_BUDGET_S
@@ -0,0 +1,31 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slop_forensics.sketches import NgramHeavyHitters
+
+
+def _sketch(batch_size=200000):
+    return NgramHeavyHitters(2, 100, 1 << 10, 4, hll_precision=6, batch_size=batch_size)
+
+
+def test_texts_without_doc_id_only_skip_their_own_document_counts():
+    sketch = _sketch()
+    for doc_id in ["p1", None, "p2", None]:
+        sketch.add_tokens(["red", "fox", "jumps"], doc_id)
+    # All four texts count towards the frequency, but only the two with an id are documents
+    assert sketch.top(5, min_docs=2) == [(("fox", "jumps"), 4), (("red", "fox"), 4)]
+    assert sketch.top(5, min_docs=3) == []
+
+
+def test_mixed_batch_matches_batch_with_ids_only():
+    mixed, with_ids = _sketch(), _sketch()
+    for index in range(20):
+        tokens = ["slow", "brown", "bear", f"word{index}"]
+        mixed.add_tokens(tokens, f"p{index}" if index % 3 else None)
+        if index % 3:
+            with_ids.add_tokens(tokens, f"p{index}")
+    for min_docs in (5, 13, 14):
+        assert [ngram for ngram, _count in mixed.top(5, min_docs)] == [ngram for ngram, _count in with_ids.top(5, min_docs)]
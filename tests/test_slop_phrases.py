@@ -0,0 +1,81 @@
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "benchmarks"))
+
+from slop_forensics import config, slop_lists
+from slop_forensics.tokenization import word_tokenize
+from synthetic_corpus import generate_texts
+
+STOP_WORDS = frozenset({"the", "a", "of", "and", "to", "in"})
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenization(monkeypatch):
+    # The regex backend and a fixed stopword list need no NLTK data
+    monkeypatch.setattr(config, "TOKENIZER_BACKEND", "regex")
+    monkeypatch.setattr(slop_lists, "_phrase_stop_words", lambda: STOP_WORDS)
+
+
+@pytest.fixture(scope="module")
+def texts():
+    return [text for text, _prompt_id in generate_texts(300, 20, seed=3)] + ["", "   "]
+
+
+def _reference_phrases(texts, n, top_k, stop_words):
+    """Serial count of the cleaned n-grams and of the substrings of the top ones."""
+    ngram_counts = Counter()
+    for text in texts:
+        tokens = [w.lower() for w in word_tokenize(text) if w.isalpha() and w.lower() not in stop_words]
+        ngram_counts.update(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    top_ngrams = ngram_counts.most_common(top_k)
+    top_ngrams_set = {ngram for ngram, _count in top_ngrams}
+    substrings = Counter()
+    for text in texts:
+        substrings.update(slop_lists.process_one_text_for_substrings(text, top_ngrams_set, n))
+    return top_ngrams, substrings
+
+
+@pytest.mark.parametrize("stop_words", [STOP_WORDS, frozenset()])
+@pytest.mark.parametrize("n", [2, 3, 4])
+@pytest.mark.parametrize("num_procs", [1, 2])
+def test_two_pass_matches_serial_reference(texts, monkeypatch, stop_words, n, num_procs):
+    monkeypatch.setattr(slop_lists, "_phrase_stop_words", lambda: stop_words)
+    top_ngrams, substrings = slop_lists._count_phrases_two_pass(texts, n, 50, 25, num_procs)
+    reference_ngrams, reference_substrings = _reference_phrases(texts, n, 50, stop_words)
+    assert top_ngrams == reference_ngrams
+    # Same counts, and equal counts in the same order
+    assert list(substrings.items()) == list(reference_substrings.items())
+
+
+def _save_phrases(texts, output_dir, **kwargs):
+    slop_lists.extract_and_save_slop_phrases(
+        texts, str(output_dir), n=3, top_k_ngrams=100, top_phrases_to_save=500, chunksize=25, **kwargs
+    )
+    with open(os.path.join(output_dir, "slop_list_phrases.jsonl"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_process_pool_matches_serial(texts, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SLOP_PHRASES_MAX_PROCESSES", 1)
+    serial = _save_phrases(texts, tmp_path)
+    monkeypatch.setattr(config, "SLOP_PHRASES_MAX_PROCESSES", 2)
+    monkeypatch.setattr(slop_lists.os, "cpu_count", lambda: 2)
+    assert serial
+    assert _save_phrases(texts, tmp_path) == serial
+
+
+def test_memory_budget_keeps_the_top_ngrams(texts):
+    budget = 64 * 1024 # Small enough to spill
+    all_counts = dict(slop_lists.extract_ngrams_cleaned(texts, 3, 10 ** 9, chunksize=25))
+    top_ngrams = slop_lists.extract_ngrams_cleaned(texts, 3, 100, chunksize=25)
+    spilled = slop_lists.extract_ngrams_cleaned(texts, 3, 100, memory_budget=budget, chunksize=25)
+    # Ties are broken by key once counts spill, so only the counts line up
+    assert all(all_counts[ngram] == count for ngram, count in spilled)
+    assert [count for _ngram, count in spilled] == [count for _ngram, count in top_ngrams]
@@ -0,0 +1,31 @@
+import os
+import sys
+from argparse import Namespace
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, "scripts"))
+
+import slop_profile
+from slop_forensics import syllables
+
+
+def test_cache_key_covers_tokenizer_rules_and_syllable_table(tmp_path, monkeypatch):
+    dataset = tmp_path / "generated_model.jsonl"
+    dataset.write_text('{"prompt_id": "p1", "output": "It was gone."}\n', encoding="utf-8")
+    args = Namespace(max_items=10, approx_ngrams=False, per_text_metrics=False)
+
+    def cache_key(syllable_table, rules_version="3.10.3", nltk_version="3.10.3"):
+        monkeypatch.setattr(syllables, "_syllable_table", syllable_table)
+        monkeypatch.setattr(slop_profile, "NLTK_RULES_VERSION", rules_version)
+        monkeypatch.setattr(slop_profile, "_nltk_version", lambda: nltk_version)
+        return slop_profile.analysis_cache_key(str(dataset), args)
+
+    key = cache_key({"gone": 1})
+    assert cache_key({"gone": 1}) == key
+    assert cache_key({"gone": 1}, rules_version="3.9.1") != key
+    assert cache_key({"gone": 1}, nltk_version="3.9.1") != key
+    # Another cmudict, or none at all, gives other syllable counts and complexity scores
+    assert cache_key({"gone": 2}) != key
+    assert cache_key({}) != key
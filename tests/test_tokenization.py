@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slop_forensics import tokenization
+from slop_forensics.tokenization import NLTK_RULES_VERSION, sentence_word_tokenize, span_tokenize
+
+nltk = pytest.importorskip("nltk")
+if tokenization._nltk_version() != NLTK_RULES_VERSION:
+    pytest.skip(f"The regex rules mirror NLTK {NLTK_RULES_VERSION}", allow_module_level=True)
+
+from nltk.tokenize.destructive import NLTKWordTokenizer
+
+# Single sentences, so the result does not depend on Punkt (whose data may be missing)
+QUOTE_AND_CONTRACTION_CASES = [
+    "She called it 'single' and left",
+    "'Twas the night before Christmas",
+    "'twas brillig, and the slithy toves",
+    "Music from the '90s was better.",
+    "'Tis the season, isn't it?",
+    "I'm sure you're right, they've said we'll see.",
+    "Don't, can't, won't, shouldn't; cannot gonna wanna gimme lemme gotta.",
+    "D'ye know more'n me?",
+    "The dogs' bowls and John's hat",
+    "He said \"hello\" and 'goodbye'.",
+    "\"Quoted at the start,\" she said.",
+    "'' Two single quotes open this",
+    "``Backticks'' and “curly” quotes, ‘too’.",
+    "It’s rock’n’roll, «en français» and „deutsch“.",
+    "Mr. Smith's hat. ’'",
+    "He stopped at Mr. \"",
+    "Wait... it's over —really– done--finally!",
+    "Prices: $5, 50% off (today) [sic] {x} <y>,",
+    "The time is 3:30, the total 3,000:",
+    "O'Neil said 'ere's 'bout 'em, y'all.",
+    "He asked 'why' and shrugged.)",
+]
+
+
+@pytest.mark.parametrize("text", QUOTE_AND_CONTRACTION_CASES)
+def test_regex_backend_matches_nltk_word_rules(text):
+    sentence_count, tokens = sentence_word_tokenize(text, "regex")
+    assert sentence_count == 1
+    assert tokens == NLTKWordTokenizer().tokenize(text)
+
+
+@pytest.mark.parametrize("text", QUOTE_AND_CONTRACTION_CASES)
+def test_regex_spans_match_tokens(text):
+    spans = span_tokenize(text, "regex")
+    assert [token for token, _start, _end in spans] == sentence_word_tokenize(text, "regex")[1]
+    for token, start, end in spans:
+        assert text[start:end] == token or token in ("``", "''")
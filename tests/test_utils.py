@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from slop_forensics.utils import JsonlTailReader
+
+
+def _line(text):
+    return (json.dumps({"output": text}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def test_tail_reader_skips_a_partial_multibyte_line(tmp_path):
+    path = tmp_path / "data.jsonl"
+    first, second, third = _line("plain"), _line("café ☕ naïve"), _line("after")
+    path.write_bytes(first + second + third)
+    # An offset inside the second line's first multibyte character
+    offset = len(first) + second.index("é".encode("utf-8")) + 1
+    reader = JsonlTailReader(str(path), start_offset=offset)
+    assert list(reader) == [{"output": "after"}]
+    assert reader.offset == len(first + second + third)
+    assert reader.lines_read == 2
+
+
+def test_tail_reader_leaves_a_truncated_utf8_tail_for_later(tmp_path):
+    path = tmp_path / "data.jsonl"
+    first, tail = _line("plain"), _line("café")
+    cut = tail.index("é".encode("utf-8")) + 1
+    path.write_bytes(first + tail[:cut])
+    reader = JsonlTailReader(str(path))
+    assert list(reader) == [{"output": "plain"}]
+    assert reader.offset == len(first)
+
+    with open(path, "ab") as f:
+        f.write(tail[cut:])
+    resumed = JsonlTailReader(str(path), start_offset=reader.offset)
+    assert list(resumed) == [{"output": "café"}]
+    assert resumed.offset == len(first + tail)